@@ -6,14 +6,19 @@ Default mode is dry-run:
 
 Apply writes:
   python backfill_npc_nome.py --apply
+
+Applied runs keep a checkpoint file; if a run dies, re-running the same command
+resumes after the last committed document. Use --restart to ignore it.
 """
 
 from __future__ import annotations
 
 import argparse
-from typing import Dict, Tuple
+import os
+from typing import Dict, Optional, Tuple
 
-from firebase_conn import db
+from firebase_conn import db, pooled_db
+from migrations import DEFAULT_PAGE_SIZE, Migration, clear_checkpoint, run_migration
 
 
 def derive_nome(data: Dict, doc_id: str) -> Tuple[str, bool]:
@@ -31,55 +36,55 @@ def derive_nome(data: Dict, doc_id: str) -> Tuple[str, bool]:
     return f"NPC-{doc_id[:6]}", True
 
 
-def run_backfill(apply_changes: bool) -> None:
-    docs = list(db.collection("echi_npcs").stream())
-    total_docs = len(docs)
-    updates = []
+def derive_nome_patch(doc_id: str, data: Dict) -> Optional[Dict]:
+    nome, needs_update = derive_nome(data, doc_id)
+    return {"nome": nome} if needs_update else None
 
-    for snap in docs:
-        data = snap.to_dict() or {}
-        nome, needs_update = derive_nome(data, snap.id)
-        if needs_update:
-            updates.append((snap.id, nome))
 
-    print(f"Found {total_docs} NPC docs")
-    print(f"Docs needing nome backfill: {len(updates)}")
+NPC_NOME_MIGRATION = Migration(
+    name="echi_npcs.nome",
+    collection="echi_npcs",
+    derive=derive_nome_patch,
+)
 
-    if not updates:
-        print("No updates required.")
-        return
 
-    preview_count = min(20, len(updates))
-    print(f"Preview first {preview_count} updates:")
-    for doc_id, nome in updates[:preview_count]:
-        print(f" - {doc_id}: {nome}")
+DEFAULT_CHECKPOINT_PATH = os.path.join(os.path.dirname(__file__), "backfill_npc_nome.checkpoint.json")
 
-    if not apply_changes:
-        print("Dry-run only. Re-run with --apply to write changes.")
-        return
 
-    batch_size = 400
-    written = 0
-    batch = db.batch()
-    pending = 0
+def run_backfill(
+    apply_changes: bool,
+    checkpoint_path: str = DEFAULT_CHECKPOINT_PATH,
+    restart: bool = False,
+    page_size: int = DEFAULT_PAGE_SIZE,
+    concurrency: int = 1,
+) -> None:
+    if not apply_changes:
+        print("Previewing nome backfill updates:")
+
+    if restart:
+        clear_checkpoint(checkpoint_path)
+
+    summary = run_migration(
+        pooled_db(concurrency) if apply_changes else db,
+        NPC_NOME_MIGRATION,
+        apply_changes=apply_changes,
+        page_size=page_size,
+        checkpoint_path=checkpoint_path,
+        concurrency=concurrency,
+    )
 
-    for doc_id, nome in updates:
-        ref = db.collection("echi_npcs").document(doc_id)
-        batch.update(ref, {"nome": nome})
-        pending += 1
+    print(f"Found {summary['scanned']} NPC docs")
+    print(f"Docs needing nome backfill: {summary['patches']}")
 
-        if pending >= batch_size:
-            batch.commit()
-            written += pending
-            print(f"Committed {written}/{len(updates)} updates")
-            batch = db.batch()
-            pending = 0
+    if not summary["patches"]:
+        print("No updates required.")
+        return
 
-    if pending:
-        batch.commit()
-        written += pending
-        print(f"Committed {written}/{len(updates)} updates")
+    if not apply_changes:
+        print("Dry-run only. Re-run with --apply to write changes.")
+        return
 
+    print(f"Committed {summary['committed']}/{summary['patches']} updates")
     print("Backfill completed successfully.")
 
 
@@ -90,8 +95,36 @@ def main() -> None:
         action="store_true",
         help="Apply updates to Firestore (default is dry-run)",
     )
+    parser.add_argument(
+        "--checkpoint-file",
+        default=DEFAULT_CHECKPOINT_PATH,
+        help="Where applied runs record the last committed document",
+    )
+    parser.add_argument(
+        "--restart",
+        action="store_true",
+        help="Discard any existing checkpoint and scan from the beginning",
+    )
+    parser.add_argument(
+        "--page-size",
+        type=int,
+        default=DEFAULT_PAGE_SIZE,
+        help="Documents fetched per cursor page",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=1,
+        help="Number of 400-write batches kept in flight at once",
+    )
     args = parser.parse_args()
-    run_backfill(apply_changes=args.apply)
+    run_backfill(
+        apply_changes=args.apply,
+        checkpoint_path=args.checkpoint_file,
+        restart=args.restart,
+        page_size=args.page_size,
+        concurrency=args.concurrency,
+    )
 
 
 if __name__ == "__main__":
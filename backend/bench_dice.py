@@ -0,0 +1,134 @@
+"""
+Benchmarks and Monte Carlo balance report for dice.py.
+
+Times parsing (cold and cached), exact distributions and the vectorized sampler,
+then summarizes the damage dice of every item in a backup:
+  python bench_dice.py
+  python bench_dice.py --backup firestore_backup_20251028_000539.json --samples 1000000
+"""
+
+from __future__ import annotations
+
+import argparse
+import glob
+import json
+import os
+import time
+
+import numpy as np
+
+import dice
+
+DAMAGE_PARAMS = ("Danno", "Danno Critico", "Bonus Danno", "Bonus Danno Critico")
+BENCH_EXPRESSIONS = ["1d4", "1d6", "+2d8", "3d6+2", "4d10", "12d6", "100d100"]
+
+
+def timed(fn, repeat: int) -> float:
+    """Best-of-three mean seconds per call."""
+    best = float("inf")
+    for _ in range(3):
+        started = time.perf_counter()
+        for _ in range(repeat):
+            fn()
+        best = min(best, (time.perf_counter() - started) / repeat)
+    return best
+
+
+def bench_parser() -> None:
+    print("Parser")
+    dice.parse_dice.cache_clear()
+    started = time.perf_counter()
+    for text in BENCH_EXPRESSIONS:
+        dice.parse_dice(text)
+    cold = (time.perf_counter() - started) / len(BENCH_EXPRESSIONS)
+    cached = timed(lambda: [dice.parse_dice(text) for text in BENCH_EXPRESSIONS], 2000) / len(BENCH_EXPRESSIONS)
+    print(f"    parse cold   {cold * 1e6:8.2f} us/expr")
+    print(f"    parse cached {cached * 1e6:8.2f} us/expr")
+
+
+def bench_distributions() -> None:
+    print("Exact distributions (first build, then cached)")
+    for text in BENCH_EXPRESSIONS:
+        expr = dice.DiceExpr(text, dice.parse_dice(text).dice, dice.parse_dice(text).constant)
+        started = time.perf_counter()
+        offset, pmf = expr.distribution()
+        build = time.perf_counter() - started
+        cached = timed(expr.distribution, 1000)
+        print(f"    {text:>8}  {len(pmf):6d} outcomes  build {build * 1e6:9.1f} us  cached {cached * 1e9:7.0f} ns")
+
+
+def bench_sampler(samples: int) -> None:
+    print(f"Sampler ({samples:,} rolls)")
+    rng = np.random.default_rng(0)
+    for text in BENCH_EXPRESSIONS:
+        expr = dice.parse_dice(text)
+        expr.sample(1, rng)
+        seconds = timed(lambda: expr.sample(samples, rng), 1)
+        line = f"    {text:>8}  sample() {samples / seconds / 1e6:7.1f} M rolls/s"
+
+        # Naive baseline: roll every die and sum.
+        if all(sign > 0 for sign, _, _ in expr.dice) and sum(count for _, count, _ in expr.dice) <= 12:
+            def naive():
+                total = np.full(samples, expr.constant, dtype=np.int64)
+                for _, count, sides in expr.dice:
+                    total += rng.integers(1, sides + 1, size=(samples, count)).sum(axis=1)
+                return total
+            line += f"   per-die {samples / timed(naive, 1) / 1e6:7.1f} M rolls/s"
+        print(line)
+
+
+def latest_backup() -> str | None:
+    here = os.path.dirname(os.path.abspath(__file__))
+    candidates = sorted(glob.glob(os.path.join(here, "firestore_backup_*.json")))
+    return candidates[-1] if candidates else None
+
+
+def item_damage_report(backup_path: str, samples: int, show: int) -> None:
+    with open(backup_path, encoding="utf-8") as fp:
+        items = json.load(fp).get("items", {})
+
+    rows = []
+    rng = np.random.default_rng(0)
+    started = time.perf_counter()
+    for item_id, data in items.items():
+        special = (data.get("Parametri") or {}).get("Special") or {}
+        for param in DAMAGE_PARAMS:
+            levels = special.get(param)
+            if not isinstance(levels, dict):
+                continue
+            for bracket, value in sorted(levels.items(), key=lambda entry: int(entry[0])):
+                expr = dice.try_parse_dice(value)
+                if expr is None:
+                    continue
+                rolled = expr.sample(samples, rng)
+                rows.append((item_id, param, bracket, expr, float(rolled.mean())))
+    elapsed = time.perf_counter() - started
+
+    print(f"Item damage ({len(items)} items, {len(rows)} dice entries, {samples:,} rolls each, {elapsed:.2f}s)")
+    worst = max((abs(mc_mean - expr.mean) for *_, expr, mc_mean in rows), default=0.0)
+    print(f"    largest |Monte Carlo mean - exact mean|: {worst:.4f}")
+    rows.sort(key=lambda row: row[3].mean, reverse=True)
+    for item_id, param, bracket, expr, _ in rows[:show]:
+        print(
+            f"    {item_id[:28]:28} {param:14} lv{bracket:>2} {expr.text:>8}  "
+            f"mean {expr.mean:6.1f}  p5 {expr.percentile(5):4d}  p95 {expr.percentile(95):4d}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark dice parsing, distributions and sampling")
+    parser.add_argument("--samples", type=int, default=1_000_000, help="Rolls per sampler benchmark")
+    parser.add_argument("--backup", default=latest_backup(), help="Backup JSON whose items are analysed")
+    parser.add_argument("--item-samples", type=int, default=100_000, help="Monte Carlo rolls per item entry")
+    parser.add_argument("--show", type=int, default=10, help="Number of strongest item entries to list")
+    args = parser.parse_args()
+
+    bench_parser()
+    bench_distributions()
+    bench_sampler(args.samples)
+    if args.backup:
+        item_damage_report(args.backup, args.item_samples, args.show)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+# file: ./backend/catalog_snapshot.py
+"""
+In-memory snapshots of read-mostly collections for the read-only catalog API.
+
+Each snapshot is serialized once into canonical JSON, gzip-compressed once and
+hashed into a strong ETag, so serving it is a dictionary lookup plus a header
+comparison. The items snapshot is reloaded from Firestore at most every
+SNAPSHOT_TTL_SECONDS. Schema snapshots are built from the utils cache
+(utils_cache.get_util) and kept until its listener reports a change to the
+document. Clients revalidate with If-None-Match and usually get a 304.
+"""
+import asyncio
+import gzip
+import hashlib
+import json
+import time
+
+from firestore_export import FirestoreEncoder
+from utils_cache import get_util, utils_cache
+
+SNAPSHOT_TTL_SECONDS = 60
+# Default for SnapshotStore.get(ttl=...): use the store's own TTL.
+STORE_TTL = object()
+
+
+class CatalogSnapshot:
+    """
+    Encoded body, precompressed body and ETags for one resource.
+    """
+
+    def __init__(self, data):
+        self.body = json.dumps(
+            data, cls=FirestoreEncoder, sort_keys=True, separators=(",", ":"), ensure_ascii=False
+        ).encode("utf-8")
+        # mtime=0 keeps the compressed bytes identical across reloads of the same data.
+        self.gzip_body = gzip.compress(self.body, compresslevel=9, mtime=0)
+        digest = hashlib.sha256(self.body).hexdigest()[:32]
+        # Strong ETags are per representation, so the gzip variant gets its own tag.
+        self.etag = f'"{digest}"'
+        self.gzip_etag = f'"{digest}-gz"'
+        self.loaded_at = time.monotonic()
+
+    def matches(self, if_none_match: str | None) -> bool:
+        """
+        If-None-Match uses weak comparison: W/ prefixes are ignored.
+        """
+        if not if_none_match:
+            return False
+        tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        return "*" in tags or self.etag in tags or self.gzip_etag in tags
+
+
+class SnapshotStore:
+    """
+    name -> CatalogSnapshot, reloaded lazily once older than the TTL.
+    Concurrent requests for the same expired snapshot share a single reload.
+
+    invalidate() may be called from other threads (listener callbacks); a reload
+    that was in flight when its snapshot was invalidated is returned but not kept.
+    """
+
+    def __init__(self, ttl: float = SNAPSHOT_TTL_SECONDS):
+        self.ttl = ttl
+        self._snapshots = {}
+        self._locks = {}
+        self._generations = {}
+
+    def _fresh(self, snapshot: CatalogSnapshot | None, ttl: float | None) -> bool:
+        return snapshot is not None and (ttl is None or time.monotonic() - snapshot.loaded_at < ttl)
+
+    async def get(self, name: str, loader, ttl=STORE_TTL) -> CatalogSnapshot | None:
+        """
+        `loader` is an async callable returning the data, or None when it does not exist.
+        `ttl` overrides the store's TTL for this lookup; None keeps the snapshot until invalidated.
+        """
+        if ttl is STORE_TTL:
+            ttl = self.ttl
+        snapshot = self._snapshots.get(name)
+        if self._fresh(snapshot, ttl):
+            return snapshot
+
+        lock = self._locks.setdefault(name, asyncio.Lock())
+        async with lock:
+            snapshot = self._snapshots.get(name)
+            if self._fresh(snapshot, ttl):
+                return snapshot
+            generation = self._generations.get(name, 0)
+            data = await loader()
+            if data is None:
+                self._snapshots.pop(name, None)
+                return None
+            snapshot = CatalogSnapshot(data)
+            if self._generations.get(name, 0) == generation:
+                self._snapshots[name] = snapshot
+            return snapshot
+
+    def invalidate(self, name: str | None = None) -> None:
+        names = list(self._snapshots) if name is None else [name]
+        for name in names:
+            self._generations[name] = self._generations.get(name, 0) + 1
+            self._snapshots.pop(name, None)
+
+
+# ---------------------------------------------------------------------------
+#  Loaders (AsyncClient)
+# ---------------------------------------------------------------------------
+async def load_items(db) -> dict:
+    items = {}
+    async for doc in db.collection("items").order_by("__name__").stream():
+        items[doc.id] = doc.to_dict()
+    return items
+
+
+async def load_schema(name: str) -> dict | None:
+    # get_util may fall through to a blocking Firestore read.
+    return await asyncio.to_thread(get_util, f"schema_{name}")
+
+
+def schema_snapshot_ttl() -> float | None:
+    """
+    Schema snapshots live until the utils listener invalidates them; while it is
+    down they are rebuilt from the (TTL-bounded) utils cache on every request.
+    """
+    return None if utils_cache.listening else 0
+
+
+catalog_snapshots = SnapshotStore()
+# Schema snapshot names match their utils doc IDs (schema_<name>).
+utils_cache.subscribe(catalog_snapshots.invalidate)
@@ -0,0 +1,89 @@
+"""
+Cold-start regression check for the local CLI.
+
+Runs a CLI command under `python -X importtime`, sums the cumulative import
+time of every top-level import made after interpreter start-up (`site`) and
+fails when it exceeds the budget:
+  python check_import_time.py
+  python check_import_time.py --budget-ms 250 --show 15
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import subprocess
+import sys
+from typing import List, Tuple
+
+DEFAULT_BUDGET_MS = 150
+DEFAULT_COMMANDS = [
+    ["main.py", "--help"],
+    ["backfill_npc_nome.py", "--help"],
+]
+
+
+def measure_imports(command: List[str]) -> List[Tuple[str, int, int]]:
+    """
+    Return (module, self_us, cumulative_us) for every top-level import made
+    by the command itself.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", *command],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    imports = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        # Nested imports are indented further; only top-level ones add up to the total.
+        if len(name) - len(name.lstrip(" ")) > 1:
+            continue
+        name = name.strip()
+        if name == "site":
+            # Everything up to here is interpreter start-up, not the CLI.
+            imports = []
+            continue
+        imports.append((name, int(self_us), int(cumulative_us)))
+    return imports
+
+
+def check_command(command: List[str], budget_ms: float, show: int) -> bool:
+    imports = measure_imports(command)
+    total_ms = sum(cumulative for _, _, cumulative in imports) / 1000
+
+    status = "OK" if total_ms <= budget_ms else "OVER BUDGET"
+    print(f"[{status}] python {' '.join(command)}: {total_ms:.1f} ms of imports (budget {budget_ms:.0f} ms)")
+    for name, _, cumulative in sorted(imports, key=lambda item: item[2], reverse=True)[:show]:
+        print(f"    {cumulative / 1000:8.1f} ms  {name}")
+    return total_ms <= budget_ms
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Check CLI cold-start import time against a budget")
+    parser.add_argument(
+        "--budget-ms",
+        type=float,
+        default=DEFAULT_BUDGET_MS,
+        help="Maximum cumulative import time per command, in milliseconds",
+    )
+    parser.add_argument(
+        "--show",
+        type=int,
+        default=10,
+        help="Number of slowest top-level imports to list",
+    )
+    args = parser.parse_args()
+
+    results = [check_command(command, args.budget_ms, args.show) for command in DEFAULT_COMMANDS]
+    if not all(results):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,234 @@
+# file: ./backend/compact_backup.py
+"""
+Compact, randomly accessible Firestore backup format.
+
+Layout of a `.fbk` file:
+
+    MAGIC
+    frame, frame, ...      one zlib-compressed msgpack frame per document
+    index                  zlib-compressed msgpack: shared dictionary + offsets
+    footer                 index offset and length (">QQ") followed by MAGIC
+
+Every frame is compressed against a shared zlib dictionary sampled from the
+first documents, so the repeated `Parametri`/`General` keys still compress well
+while any single document can be read with one seek and one decompress.
+"""
+import json
+import os
+import struct
+import zlib
+
+import msgpack
+
+from firestore_export import StreamingBackupWriter
+
+MAGIC = b"FNDBAK01"
+FOOTER = struct.Struct(">QQ")
+ZDICT_SIZE = 32 * 1024
+COMPRESSION_LEVEL = 9
+COMPACT_EXTENSION = "fbk"
+
+
+def _pack_default(obj):
+    # Same datetime handling as FirestoreEncoder.
+    from google.api_core.datetime_helpers import DatetimeWithNanoseconds
+
+    if isinstance(obj, DatetimeWithNanoseconds):
+        return obj.isoformat()
+    raise TypeError(f"Object of type {type(obj).__name__} is not msgpack serializable")
+
+
+def pack_document(data: dict) -> bytes:
+    return msgpack.packb(data, default=_pack_default, use_bin_type=True)
+
+
+def unpack_document(payload: bytes) -> dict:
+    return msgpack.unpackb(payload, raw=False, strict_map_key=False)
+
+
+# ---------------------------------------------------------------------------
+#  Writer
+# ---------------------------------------------------------------------------
+class CompactBackupWriter:
+    """
+    Drop-in alternative to StreamingBackupWriter that writes the `.fbk` layout.
+
+    Documents are buffered only until ZDICT_SIZE bytes have been seen; that sample
+    becomes the shared dictionary and everything after is written straight through.
+    """
+
+    extension = COMPACT_EXTENSION
+    binary = True
+
+    def __init__(self, fp):
+        self.fp = fp
+        self.index = {}
+        self._collection = None
+        self._zdict = None
+        self._pending = []
+        self._pending_size = 0
+
+    def __enter__(self):
+        self.fp.write(MAGIC)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        return False
+
+    def begin_collection(self, name: str):
+        self._collection = name
+        self.index.setdefault(name, {})
+
+    def write_document(self, doc_id: str, data: dict):
+        packed = pack_document(data)
+        if self._zdict is not None:
+            self._write_frame(self._collection, doc_id, packed)
+            return
+
+        self._pending.append((self._collection, doc_id, packed))
+        self._pending_size += len(packed)
+        if self._pending_size >= ZDICT_SIZE:
+            self._flush_pending()
+
+    def end_collection(self):
+        self._collection = None
+
+    def close(self):
+        self._flush_pending()
+        index = zlib.compress(
+            msgpack.packb({"zdict": self._zdict, "collections": self.index}, use_bin_type=True),
+            COMPRESSION_LEVEL,
+        )
+        offset = self.fp.tell()
+        self.fp.write(index)
+        self.fp.write(FOOTER.pack(offset, len(index)))
+        self.fp.write(MAGIC)
+
+    def _flush_pending(self):
+        if self._zdict is None:
+            # zlib favours the end of the dictionary, so keep the most recent bytes.
+            self._zdict = b"".join(packed for _, _, packed in self._pending)[-ZDICT_SIZE:]
+        for collection, doc_id, packed in self._pending:
+            self._write_frame(collection, doc_id, packed)
+        self._pending = []
+        self._pending_size = 0
+
+    def _write_frame(self, collection: str, doc_id: str, packed: bytes):
+        compressor = zlib.compressobj(COMPRESSION_LEVEL, zdict=self._zdict) if self._zdict else zlib.compressobj(COMPRESSION_LEVEL)
+        frame = compressor.compress(packed) + compressor.flush()
+        offset = self.fp.tell()
+        self.fp.write(frame)
+        self.index.setdefault(collection, {})[doc_id] = [offset, len(frame)]
+
+
+# ---------------------------------------------------------------------------
+#  Reader
+# ---------------------------------------------------------------------------
+class CompactBackupReader:
+    """
+    Random access over a `.fbk` backup; only the index is loaded up front.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.fp = open(path, "rb")
+        if self.fp.read(len(MAGIC)) != MAGIC:
+            self.fp.close()
+            raise ValueError(f"{path} is not a compact backup")
+
+        self.fp.seek(-(FOOTER.size + len(MAGIC)), os.SEEK_END)
+        offset, length = FOOTER.unpack(self.fp.read(FOOTER.size))
+        if self.fp.read(len(MAGIC)) != MAGIC:
+            self.fp.close()
+            raise ValueError(f"{path} is truncated")
+
+        self.fp.seek(offset)
+        index = msgpack.unpackb(zlib.decompress(self.fp.read(length)), raw=False)
+        self.zdict = index["zdict"]
+        self.index = index["collections"]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    def close(self):
+        self.fp.close()
+
+    def collections(self) -> list[str]:
+        return list(self.index)
+
+    def document_ids(self, collection: str) -> list[str]:
+        return list(self.index.get(collection, {}))
+
+    def read_document(self, collection: str, doc_id: str) -> dict | None:
+        location = self.index.get(collection, {}).get(doc_id)
+        if location is None:
+            return None
+        offset, length = location
+        self.fp.seek(offset)
+        decompressor = zlib.decompressobj(zdict=self.zdict) if self.zdict else zlib.decompressobj()
+        return unpack_document(decompressor.decompress(self.fp.read(length)) + decompressor.flush())
+
+    def iter_documents(self):
+        """
+        Yield (collection, doc_id, data) in file order.
+        """
+        for collection, documents in self.index.items():
+            for doc_id in documents:
+                yield collection, doc_id, self.read_document(collection, doc_id)
+
+
+# ---------------------------------------------------------------------------
+#  Converters
+# ---------------------------------------------------------------------------
+def json_to_compact(json_path: str, compact_path: str) -> dict:
+    """
+    Convert a legacy pretty-printed JSON backup into the compact format.
+    """
+    with open(json_path, encoding="utf-8") as fp:
+        backup = json.load(fp)
+
+    counts = {}
+    with open(compact_path, "wb") as fp, CompactBackupWriter(fp) as writer:
+        for col_name, documents in backup.items():
+            writer.begin_collection(col_name)
+            for doc_id, data in documents.items():
+                writer.write_document(doc_id, data)
+            counts[col_name] = len(documents)
+    return {"path": compact_path, "collections": counts}
+
+
+def compact_to_json(compact_path: str, json_path: str) -> dict:
+    """
+    Convert a compact backup back into the legacy JSON layout, one document at a time.
+    """
+    counts = {}
+    with CompactBackupReader(compact_path) as reader, open(json_path, "w", encoding="utf-8") as fp, \
+            StreamingBackupWriter(fp) as writer:
+        for col_name in reader.collections():
+            writer.begin_collection(col_name)
+            counts[col_name] = 0
+            for doc_id in reader.document_ids(col_name):
+                writer.write_document(doc_id, reader.read_document(col_name, doc_id))
+                counts[col_name] += 1
+    return {"path": json_path, "collections": counts}
+
+
+def convert_backup(path: str) -> dict:
+    """
+    Convert in whichever direction the file extension implies. An existing
+    file at the target path is never overwritten.
+    """
+    root, extension = os.path.splitext(path)
+    if extension == ".json":
+        target, convert = f"{root}.{COMPACT_EXTENSION}", json_to_compact
+    else:
+        target, convert = f"{root}.json", compact_to_json
+    if os.path.exists(target):
+        raise FileExistsError(f"{target} already exists; move it away before converting {path}")
+    return convert(path, target)
@@ -0,0 +1,163 @@
+# file: ./backend/dice.py
+"""
+Dice expressions used by items and schemas ("1d6", "+2d8", "d20", "2d10 danni").
+
+    expr := ['+'|'-'] term (('+'|'-') term)*
+    term := [count] 'd' sides | integer
+
+Trailing words after a complete expression ("2d10 danni") are ignored; they may
+not contain digits, so a dice term after a label is an error, not dropped.
+Parsed expressions are cached by their text; exact distributions are built by
+convolving single-die distributions (squaring for large counts) and cached on the
+expression, and the sampler draws from the exact CDF, so millions of rolls cost
+one uniform draw and one binary search each regardless of how many dice are rolled.
+"""
+import re
+from dataclasses import dataclass, field
+from functools import lru_cache
+
+import numpy as np
+
+_TERM_RE = re.compile(r"\s*([+-])?\s*(?:(\d*)\s*[dD]\s*(\d+)|(\d+))")
+# Label words are letters only, so "2d6 fuoco 1d4" is rejected rather than read as 2d6.
+_LABEL_RE = re.compile(r"(?:\s+[^\W\d_]+)*\s*$")
+MAX_DICE = 1000
+MAX_SIDES = 1000
+
+
+@dataclass(frozen=True)
+class DiceExpr:
+    text: str
+    # ((sign, count, sides), ...); constants are folded into `constant`.
+    dice: tuple
+    constant: int = 0
+    _cache: dict = field(default_factory=dict, compare=False, hash=False, repr=False)
+
+    # ---------------------------------------------------------------------
+    #  Closed-form statistics
+    # ---------------------------------------------------------------------
+    @property
+    def min(self) -> int:
+        return self.constant + sum(count if sign > 0 else -count * sides for sign, count, sides in self.dice)
+
+    @property
+    def max(self) -> int:
+        return self.constant + sum(count * sides if sign > 0 else -count for sign, count, sides in self.dice)
+
+    @property
+    def mean(self) -> float:
+        return self.constant + sum(sign * count * (sides + 1) / 2 for sign, count, sides in self.dice)
+
+    @property
+    def variance(self) -> float:
+        return sum(count * (sides * sides - 1) / 12 for _, count, sides in self.dice)
+
+    # ---------------------------------------------------------------------
+    #  Exact distribution
+    # ---------------------------------------------------------------------
+    def distribution(self) -> tuple[int, np.ndarray]:
+        """
+        (lowest total, probabilities) where probabilities[i] = P(total == lowest + i).
+        """
+        if "pmf" not in self._cache:
+            offset, pmf = self.constant, np.ones(1)
+            for sign, count, sides in self.dice:
+                term = _sum_of_dice(count, sides)
+                if sign > 0:
+                    offset += count
+                else:
+                    term = term[::-1]
+                    offset -= count * sides
+                pmf = np.convolve(pmf, term)
+            self._cache["pmf"] = (offset, pmf)
+        return self._cache["pmf"]
+
+    def probability(self, total: int) -> float:
+        offset, pmf = self.distribution()
+        index = total - offset
+        return float(pmf[index]) if 0 <= index < len(pmf) else 0.0
+
+    def percentile(self, pct: float) -> int:
+        offset, pmf = self.distribution()
+        return offset + int(np.searchsorted(np.cumsum(pmf), pct / 100, side="left"))
+
+    # ---------------------------------------------------------------------
+    #  Sampling
+    # ---------------------------------------------------------------------
+    def sample(self, size: int, rng: np.random.Generator | None = None) -> np.ndarray:
+        """
+        `size` independent totals as int64, drawn by inverse CDF.
+        """
+        rng = rng if rng is not None else np.random.default_rng()
+        if len(self.dice) == 1 and self.dice[0][:2] == (1, 1):
+            # A single die is cheaper to draw directly than to search for.
+            return self.constant + rng.integers(1, self.dice[0][2] + 1, size=size)
+        if "cdf" not in self._cache:
+            offset, pmf = self.distribution()
+            cdf = np.cumsum(pmf)
+            cdf[-1] = 1.0
+            self._cache["cdf"] = (offset, cdf)
+        offset, cdf = self._cache["cdf"]
+        return offset + np.searchsorted(cdf, rng.random(size), side="right")
+
+    def roll(self, rng: np.random.Generator | None = None) -> int:
+        return int(self.sample(1, rng)[0])
+
+    def __str__(self) -> str:
+        return self.text
+
+
+@lru_cache(maxsize=512)
+def _sum_of_dice(count: int, sides: int) -> np.ndarray:
+    """
+    Distribution of the sum of `count` d`sides` (index 0 = total of `count`),
+    by repeated squaring of the single-die distribution.
+    """
+    result, power = np.ones(1), np.full(sides, 1.0 / sides)
+    while count:
+        if count & 1:
+            result = np.convolve(result, power)
+        count >>= 1
+        if count:
+            power = np.convolve(power, power)
+    result.setflags(write=False)
+    return result
+
+
+@lru_cache(maxsize=4096)
+def parse_dice(text: str) -> DiceExpr:
+    """
+    Parse an expression; raises ValueError when `text` is not one.
+    """
+    position, terms, constant = 0, {}, 0
+    while True:
+        match = _TERM_RE.match(text, position)
+        if match is None or (position and match.group(1) is None):
+            break
+        sign = -1 if match.group(1) == "-" else 1
+        count, sides, number = match.group(2), match.group(3), match.group(4)
+        if sides is not None:
+            count, sides = int(count or 1), int(sides)
+            if not 0 < sides <= MAX_SIDES or not 0 < count <= MAX_DICE:
+                raise ValueError(f"Unsupported dice in {text!r}")
+            terms[(sign, sides)] = terms.get((sign, sides), 0) + count
+        else:
+            constant += sign * int(number)
+        position = match.end()
+
+    if position == 0 or not _LABEL_RE.match(text, position):
+        raise ValueError(f"Not a dice expression: {text!r}")
+    dice = tuple(sorted((sign, count, sides) for (sign, sides), count in terms.items()))
+    return DiceExpr(text.strip(), dice, constant)
+
+
+def try_parse_dice(value) -> DiceExpr | None:
+    """
+    Parsed expression for strings that contain dice, otherwise None.
+    """
+    if not isinstance(value, str) or not re.search(r"\d*[dD]\d", value):
+        return None
+    try:
+        return parse_dice(value)
+    except ValueError:
+        return None
@@ -0,0 +1,184 @@
+# file: ./backend/encounter_sim.py
+"""
+Vectorized encounter simulator for balancing fights before a session.
+
+Thousands of fights between a party and a group of foes run side by side as
+NumPy arrays (fights x combatants); each round loops over the few combatants
+while every fight advances at once. The rules are a deliberately simple model
+of the table's combat, parameterized by CombatRules:
+
+  - every living combatant attacks once per round, at a random living enemy;
+    damage from a round is applied at its end (so both sides can fall together)
+  - hit when d20 + max(Attacco, Mira) >= hit_base + Difesa
+  - critical on a natural roll >= crit_threshold - Critico: damage x crit_multiplier
+  - damage = weapon dice (x crit) - RiduzioneDanni, never below min_damage
+  - HP comes from stats.hpTotal
+
+It is a balancing aid, not a rules engine: spells, tecniche and the critical
+effects table are not modelled.
+"""
+from dataclasses import dataclass
+
+import numpy as np
+
+from dice import DiceExpr, parse_dice, try_parse_dice
+from equipment_bonus import bracket_for_level
+
+DEFAULT_FIGHTS = 10_000
+DEFAULT_MAX_ROUNDS = 50
+DEFAULT_DAMAGE = "1d6"
+WEAPON_SLOTS = ("weaponMain", "weaponOff")
+
+
+@dataclass
+class CombatRules:
+    hit_base: int = 10
+    crit_threshold: int = 20
+    crit_multiplier: int = 2
+    min_damage: int = 0
+    max_rounds: int = DEFAULT_MAX_ROUNDS
+
+
+@dataclass
+class Combatant:
+    name: str
+    hp: float
+    attack: int
+    defense: int
+    crit: int
+    reduction: int
+    damage: DiceExpr
+
+
+def _combat_tot(data: dict, name: str) -> int:
+    param = ((data.get("Parametri") or {}).get("Combattimento") or {}).get(name) or {}
+    value = param.get("Tot") if isinstance(param, dict) else None
+    return int(value) if isinstance(value, (int, float)) else 0
+
+
+def weapon_damage(data: dict) -> DiceExpr | None:
+    """
+    `Danno` of the equipped weapon at the character's level bracket.
+    """
+    bracket = str(bracket_for_level((data.get("stats") or {}).get("level")))
+    for slot in WEAPON_SLOTS:
+        weapon = (data.get("equipped") or {}).get(slot)
+        if not isinstance(weapon, dict):
+            continue
+        levels = ((weapon.get("Parametri") or {}).get("Special") or {}).get("Danno") or {}
+        expr = try_parse_dice(levels.get(bracket)) if isinstance(levels, dict) else None
+        if expr is not None:
+            return expr
+    return None
+
+
+def combatant_from_doc(doc_id: str, data: dict, default_damage: str = DEFAULT_DAMAGE) -> Combatant:
+    """
+    Build a combatant from a `users` or `foes` document.
+    """
+    stats = data.get("stats") or {}
+    return Combatant(
+        name=data.get("characterId") or data.get("name") or doc_id,
+        hp=float(stats.get("hpTotal") or 1),
+        attack=max(_combat_tot(data, "Attacco"), _combat_tot(data, "Mira")),
+        defense=_combat_tot(data, "Difesa"),
+        crit=_combat_tot(data, "Critico"),
+        reduction=_combat_tot(data, "RiduzioneDanni"),
+        damage=weapon_damage(data) or parse_dice(default_damage),
+    )
+
+
+def _percentiles(values: np.ndarray, percentiles=(5, 50, 95)) -> dict:
+    if not len(values):
+        return {}
+    return {f"p{pct}": round(float(np.percentile(values, pct)), 1) for pct in percentiles}
+
+
+def simulate(
+    party: list[Combatant],
+    foes: list[Combatant],
+    fights: int = DEFAULT_FIGHTS,
+    rules: CombatRules | None = None,
+    seed: int | None = None,
+) -> dict:
+    """
+    Run `fights` independent encounters and summarize outcomes.
+    """
+    rules = rules or CombatRules()
+    rng = np.random.default_rng(seed)
+    combatants = party + foes
+    count = len(combatants)
+    side = np.array([0] * len(party) + [1] * len(foes))
+
+    hp = np.tile(np.array([c.hp for c in combatants]), (fights, 1))
+    attack = np.array([c.attack for c in combatants])
+    defense = np.array([c.defense for c in combatants])
+    crit = np.array([c.crit for c in combatants])
+    reduction = np.array([c.reduction for c in combatants])
+
+    dealt = np.zeros((fights, count))
+    taken = np.zeros((fights, count))
+    rounds = np.full(fights, rules.max_rounds)
+    active = np.ones(fights, dtype=bool)
+    fight_index = np.arange(fights)
+
+    for round_number in range(1, rules.max_rounds + 1):
+        alive = hp > 0
+        round_damage = np.zeros((fights, count))
+        for attacker in range(count):
+            acting = active & alive[:, attacker]
+            if not acting.any():
+                continue
+            # Random living enemy per fight: argmax of random keys over valid targets.
+            enemies = alive & (side != side[attacker])
+            keys = np.where(enemies, rng.random((fights, count)), -1.0)
+            target = keys.argmax(axis=1)
+            acting &= enemies[fight_index, target]
+
+            natural = rng.integers(1, 21, size=fights)
+            hits = acting & (natural + attack[attacker] >= rules.hit_base + defense[target])
+            crits = hits & (natural >= rules.crit_threshold - crit[attacker])
+            rolled = combatants[attacker].damage.sample(fights, rng) * np.where(crits, rules.crit_multiplier, 1)
+            damage = np.where(hits, np.maximum(rolled - reduction[target], rules.min_damage), 0)
+
+            np.add.at(round_damage, (fight_index, target), damage)
+            dealt[:, attacker] += damage
+
+        hp -= round_damage
+        taken += round_damage
+        party_up = (hp[:, side == 0] > 0).any(axis=1)
+        foes_up = (hp[:, side == 1] > 0).any(axis=1)
+        finished = active & ~(party_up & foes_up)
+        rounds[finished] = round_number
+        active &= ~finished
+        if not active.any():
+            break
+
+    party_up = (hp[:, side == 0] > 0).any(axis=1)
+    foes_up = (hp[:, side == 1] > 0).any(axis=1)
+    decided = ~(party_up & foes_up)
+    party_wins = decided & party_up
+    foe_wins = decided & foes_up
+
+    return {
+        "fights": fights,
+        "partyWinRate": round(float(party_wins.mean()), 4),
+        "foeWinRate": round(float(foe_wins.mean()), 4),
+        "drawRate": round(float((decided & ~party_up & ~foes_up).mean()), 4),
+        "timeoutRate": round(float((~decided).mean()), 4),
+        "expectedRounds": round(float(rounds[decided].mean()), 2) if decided.any() else None,
+        "rounds": _percentiles(rounds[decided]),
+        "partyDamageTaken": _percentiles(taken[:, side == 0].sum(axis=1)),
+        "combatants": [
+            {
+                "name": combatant.name,
+                "side": "party" if side[index] == 0 else "foes",
+                "damage": combatant.damage.text,
+                "deathRate": round(float((hp[:, index] <= 0).mean()), 4),
+                "meanDamageDealt": round(float(dealt[:, index].mean()), 1),
+                "damageDealt": _percentiles(dealt[:, index]),
+                "meanDamageTaken": round(float(taken[:, index].mean()), 1),
+            }
+            for index, combatant in enumerate(combatants)
+        ],
+    }
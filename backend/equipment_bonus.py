@@ -0,0 +1,352 @@
+# file: ./backend/equipment_bonus.py
+"""
+Compiled equipment bonuses.
+
+Item `Parametri` hold per-bracket values ("1", "4", "7", "10") that are ints,
+numeric strings, dice strings or small formulas such as "-2*MAX(0;3-Forza)".
+Each item is compiled once into a dense table, one row per character level and
+one column per bonus-carrying parameter, with the bracket already resolved.
+Compiled items are cached by (item ID, Parametri content), so a character's
+`Equip` column is a vector sum over their `equipped` slots.
+
+The embedded copy in `equipped` is authoritative, as in the frontend: equip adds
+and unequip subtracts its values. The `items` catalog is only used to report
+embedded copies that have drifted from it (catalog_drift).
+
+Resolution mirrors `buildEquipDeltaFromItem` in EquippedInventory.js:
+the bracket is the highest of 1/4/7/10 not above the level, dice strings add
+nothing, formulas use the character's Base + Combattimento Tot values.
+"""
+import hashlib
+import json
+import re
+import threading
+from dataclasses import dataclass, field
+from functools import lru_cache
+
+import numpy as np
+from cachetools import LRUCache
+
+LEVEL_BRACKETS = (1, 4, 7, 10)
+MAX_LEVEL = 20
+SECTIONS = ("Base", "Combattimento", "Special")
+DICE_RE = re.compile(r"\b\d+d\d+\b", re.IGNORECASE)
+DEFAULT_CACHE_SIZE = 4096
+
+
+def parse_level(level) -> int:
+    """
+    `stats.level` as an int clamped to 0..MAX_LEVEL (missing counts as 1).
+    Raises ValueError when it is not a number.
+    """
+    try:
+        level = int(level or 1)
+    except (TypeError, ValueError, OverflowError):
+        raise ValueError(f"level {level!r} is not a number") from None
+    return min(max(level, 0), MAX_LEVEL)
+
+
+def bracket_for_level(level) -> int:
+    try:
+        level = parse_level(level)
+    except ValueError:
+        level = 1
+    for threshold in reversed(LEVEL_BRACKETS):
+        if level >= threshold:
+            return threshold
+    return LEVEL_BRACKETS[0]
+
+
+# ---------------------------------------------------------------------------
+#  Formula compiler (same grammar as frontend computeFormula.js)
+# ---------------------------------------------------------------------------
+_TOKEN_RE = re.compile(r"\s*(?:(\d+(?:\.\d+)?)|([A-Za-z]+)|(.))")
+
+
+def _tokenize(expr: str) -> list:
+    tokens = []
+    for number, name, symbol in _TOKEN_RE.findall(expr):
+        if number:
+            tokens.append(("num", float(number)))
+        elif name:
+            tokens.append(("name", name))
+        elif symbol.strip():
+            tokens.append(("sym", symbol))
+    return tokens
+
+
+class _FormulaParser:
+    """
+    expr := term (('+'|'-') term)*     term := unary (('*'|'/') unary)*
+    unary := '-' unary | atom          atom := number | name | FN '(' expr (sep expr)* ')' | '(' expr ')'
+    Produces a closure over the character's parameter totals.
+    """
+
+    def __init__(self, expr: str):
+        self.tokens = _tokenize(expr)
+        self.position = 0
+
+    def parse(self):
+        node = self._expr()
+        if self.position != len(self.tokens):
+            raise ValueError("trailing tokens")
+        return node
+
+    def _peek(self):
+        return self.tokens[self.position] if self.position < len(self.tokens) else (None, None)
+
+    def _take(self, symbol=None):
+        token = self._peek()
+        if symbol is not None and token != ("sym", symbol):
+            raise ValueError(f"expected {symbol!r}")
+        self.position += 1
+        return token
+
+    def _expr(self):
+        node = self._term()
+        while self._peek() in (("sym", "+"), ("sym", "-")):
+            op = self._take()[1]
+            left, right = node, self._term()
+            node = (lambda l, r: lambda tots: l(tots) + r(tots))(left, right) if op == "+" else \
+                (lambda l, r: lambda tots: l(tots) - r(tots))(left, right)
+        return node
+
+    def _term(self):
+        node = self._unary()
+        while self._peek() in (("sym", "*"), ("sym", "/")):
+            op = self._take()[1]
+            left, right = node, self._unary()
+            node = (lambda l, r: lambda tots: l(tots) * r(tots))(left, right) if op == "*" else \
+                (lambda l, r: lambda tots: l(tots) / r(tots))(left, right)
+        return node
+
+    def _unary(self):
+        if self._peek() == ("sym", "-"):
+            self._take()
+            operand = self._unary()
+            return lambda tots: -operand(tots)
+        if self._peek() == ("sym", "+"):
+            self._take()
+        return self._atom()
+
+    def _atom(self):
+        kind, value = self._take()
+        if kind == "num":
+            return lambda tots: value
+        if kind == "name" and value.upper() in ("MAX", "MIN") and self._peek() == ("sym", "("):
+            self._take("(")
+            args = [self._expr()]
+            while self._peek() in (("sym", ";"), ("sym", ",")):
+                self._take()
+                args.append(self._expr())
+            self._take(")")
+            fn = max if value.upper() == "MAX" else min
+            return lambda tots: fn(arg(tots) for arg in args)
+        if kind == "name":
+            return lambda tots: tots.get(value, 0)
+        if (kind, value) == ("sym", "("):
+            node = self._expr()
+            self._take(")")
+            return node
+        raise ValueError(f"unexpected token {value!r}")
+
+
+@lru_cache(maxsize=1024)
+def compile_formula(expr: str):
+    """
+    Callable taking {name: Base.Tot + Combattimento.Tot}; None when it does not parse.
+    """
+    try:
+        return _FormulaParser(expr).parse()
+    except (ValueError, TypeError):
+        return None
+
+
+def formula_totals(parametri: dict | None) -> dict:
+    totals = {}
+    for section in ("Base", "Combattimento"):
+        for name, param in ((parametri or {}).get(section) or {}).items():
+            if isinstance(param, dict) and isinstance(param.get("Tot"), (int, float)):
+                totals[name] = totals.get(name, 0) + param["Tot"]
+    return totals
+
+
+# ---------------------------------------------------------------------------
+#  Parameter layout and compiled items
+# ---------------------------------------------------------------------------
+class ParameterSpace:
+    """
+    Append-only (section, name) -> column mapping shared by every compiled item.
+    """
+
+    def __init__(self):
+        self.columns = []
+        self.index = {}
+        self._lock = threading.Lock()
+
+    def column(self, section: str, name: str) -> int:
+        key = (section, name)
+        if key not in self.index:
+            with self._lock:
+                if key not in self.index:
+                    self.index[key] = len(self.columns)
+                    self.columns.append(key)
+        return self.index[key]
+
+    def __len__(self) -> int:
+        return len(self.columns)
+
+
+@dataclass
+class CompiledItem:
+    item_id: str
+    # Columns this item touches and their pre-resolved values per level (0..MAX_LEVEL).
+    columns: np.ndarray
+    by_level: np.ndarray
+    # bracket -> [(column, compiled formula)] for character-dependent values.
+    formulas: dict = field(default_factory=dict)
+
+
+def _resolve_value(raw):
+    """
+    ("const", value) | ("formula", fn) | None for empty, dice and zero values.
+    """
+    if raw is None or isinstance(raw, bool):
+        return None
+    if isinstance(raw, (int, float)):
+        return ("const", float(raw)) if raw else None
+    text = str(raw).strip()
+    if not text or DICE_RE.search(text):
+        return None
+    try:
+        value = float(text)
+        return ("const", value) if value else None
+    except ValueError:
+        pass
+    if re.search(r"[+\-*/()A-Za-z]", text):
+        fn = compile_formula(text)
+        return ("formula", fn) if fn is not None else None
+    return None
+
+
+def compile_item(item_id: str, data: dict, space: ParameterSpace) -> CompiledItem:
+    per_bracket = {bracket: {} for bracket in LEVEL_BRACKETS}
+    formulas = {}
+    for section in SECTIONS:
+        for name, levels in ((data.get("Parametri") or {}).get(section) or {}).items():
+            if not isinstance(levels, dict):
+                continue
+            for bracket in LEVEL_BRACKETS:
+                resolved = _resolve_value(levels.get(str(bracket)))
+                if resolved is None:
+                    continue
+                kind, value = resolved
+                column = space.column(section, name)
+                if kind == "const":
+                    per_bracket[bracket][column] = value
+                else:
+                    formulas.setdefault(bracket, []).append((column, value))
+
+    columns = sorted({column for values in per_bracket.values() for column in values})
+    position = {column: offset for offset, column in enumerate(columns)}
+    bracket_rows = np.zeros((len(LEVEL_BRACKETS), len(columns)))
+    for row, bracket in enumerate(LEVEL_BRACKETS):
+        for column, value in per_bracket[bracket].items():
+            bracket_rows[row, position[column]] = value
+
+    levels = np.arange(MAX_LEVEL + 1)
+    level_to_row = np.searchsorted(np.array(LEVEL_BRACKETS), np.maximum(levels, 1), side="right") - 1
+    return CompiledItem(item_id, np.array(columns, dtype=np.int64), bracket_rows[level_to_row], formulas)
+
+
+# ---------------------------------------------------------------------------
+#  Compiler cache and Equip sums
+# ---------------------------------------------------------------------------
+def _content_key(data: dict) -> str:
+    payload = json.dumps(data.get("Parametri") or {}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class EquipmentCompiler:
+    def __init__(self, maxsize: int = DEFAULT_CACHE_SIZE):
+        self.space = ParameterSpace()
+        self._compiled = LRUCache(maxsize=maxsize)
+        self._lock = threading.Lock()
+        self.compiled = 0
+
+    def get(self, item_id: str, data: dict, update_time=None) -> CompiledItem:
+        """
+        Compiled table for an item, reused while (item_id, update_time) is unchanged.
+        Without an update_time (e.g. an embedded equipped copy) the Parametri
+        content is the version key.
+        """
+        key = (item_id, str(update_time) if update_time is not None else _content_key(data))
+        with self._lock:
+            compiled = self._compiled.get(key)
+        if compiled is None:
+            compiled = compile_item(item_id, data, self.space)
+            with self._lock:
+                self._compiled[key] = compiled
+                self.compiled += 1
+        return compiled
+
+    def equip_vector(self, equipped: dict | None, level, parametri: dict | None = None) -> np.ndarray:
+        """
+        Sum of every equipped item's bonuses at `level`, as a vector over self.space.
+        Uses the embedded copies, like resolveItemDoc in EquippedInventory.js.
+        Raises ValueError when `level` is not a number.
+        """
+        entries = [
+            self.get(_equipped_item_id(entry), entry)
+            for entry in (equipped or {}).values()
+            if isinstance(entry, dict)
+        ]
+
+        level = parse_level(level)
+        bracket = bracket_for_level(level)
+        totals = formula_totals(parametri) if any(item.formulas.get(bracket) for item in entries) else {}
+
+        vector = np.zeros(len(self.space))
+        for item in entries:
+            np.add.at(vector, item.columns, item.by_level[level])
+            for column, fn in item.formulas.get(bracket, ()):
+                try:
+                    value = float(fn(totals))
+                except (ArithmeticError, TypeError, ValueError):
+                    continue
+                if np.isfinite(value):
+                    vector[column] += value
+        return vector
+
+    def equip_values(self, equipped: dict | None, level, parametri: dict | None = None) -> dict:
+        """
+        {(section, name): Equip} for every non-zero contribution.
+        """
+        vector = self.equip_vector(equipped, level, parametri)
+        return {
+            self.space.columns[column]: (int(value) if float(value).is_integer() else float(value))
+            for column, value in enumerate(vector)
+            if value
+        }
+
+
+def _equipped_item_id(entry: dict) -> str:
+    return entry.get("id") or (entry.get("General") or {}).get("Nome") or ""
+
+
+def catalog_drift(equipped: dict | None, catalog: dict) -> list:
+    """
+    [(slot, item_id)] for embedded copies whose Parametri differ from items/<item_id>.
+    `catalog` maps item ID -> item data; items missing from it are not reported.
+    """
+    drifted = []
+    for slot, entry in sorted((equipped or {}).items()):
+        if not isinstance(entry, dict):
+            continue
+        item_id = _equipped_item_id(entry)
+        if item_id in catalog and _content_key(entry) != _content_key(catalog[item_id]):
+            drifted.append((slot, item_id))
+    return drifted
+
+
+equipment_compiler = EquipmentCompiler()
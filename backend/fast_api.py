@@ -1,7 +1,15 @@
 # file ./backend/fast_api.py
-from fastapi import FastAPI
+import re
+from typing import Annotated, Any
+
+from fastapi import Depends, FastAPI, HTTPException, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 
+from catalog_snapshot import CatalogSnapshot, catalog_snapshots, load_items, load_schema, schema_snapshot_ttl
+from firebase_conn import get_async_db, verify_id_token
+from item_index import DEFAULT_PAGE_LIMIT, MAX_PAGE_LIMIT, item_index
+
 app = FastAPI()
 
 origins = [
@@ -16,4 +24,147 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
-)
\ No newline at end of file
+    # Let the frontend read the validator it needs for If-None-Match.
+    expose_headers=["ETag"],
+)
+
+
+# ---------------------------------------------------------------------------
+#  Firestore dependency for async routes
+# ---------------------------------------------------------------------------
+async def get_async_firestore():
+    return get_async_db()
+
+
+# Usage: `async def route(db: AsyncFirestore): doc = await db.document(...).get()`
+# Typed as Any so importing this module does not pull in google.cloud.firestore.
+AsyncFirestore = Annotated[Any, Depends(get_async_firestore)]
+
+
+async def get_signed_in_user(request: Request) -> dict:
+    """
+    Mirror of the `isSignedIn()` Firestore rule: require a valid Firebase ID token.
+    """
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        raise HTTPException(status_code=401, detail="Missing bearer token")
+    try:
+        # verify_id_token may fetch Google's public keys; keep it off the event loop.
+        return await run_in_threadpool(verify_id_token, token)
+    except Exception:
+        raise HTTPException(status_code=401, detail="Invalid ID token")
+
+
+SignedInUser = Annotated[dict, Depends(get_signed_in_user)]
+
+
+async def get_optional_user(request: Request) -> dict | None:
+    """
+    The signed-in user when a bearer token is sent, otherwise None.
+    """
+    if not request.headers.get("authorization"):
+        return None
+    return await get_signed_in_user(request)
+
+
+OptionalUser = Annotated[dict | None, Depends(get_optional_user)]
+
+
+# ---------------------------------------------------------------------------
+#  Public healthcheck route
+# ---------------------------------------------------------------------------
+@app.get("/")
+async def read_root():
+    return {"message": "Hello from FastAPI - DnD Game Backend!"}
+
+
+# ---------------------------------------------------------------------------
+#  Read-only catalog routes (served from in-memory snapshots)
+# ---------------------------------------------------------------------------
+# `items` is world-readable in firestore.rules; `utils` requires a signed-in user,
+# so schema responses may only sit in the browser's own cache.
+ITEMS_CACHE_CONTROL = "public, max-age=60, stale-while-revalidate=300"
+SCHEMA_CACHE_CONTROL = "private, no-cache"
+SCHEMA_NAME_RE = re.compile(r"^[a-z_]+$")
+
+
+def snapshot_response(request: Request, snapshot: CatalogSnapshot, cache_control: str) -> Response:
+    """
+    200 with the (pre-gzipped when accepted) body, or 304 when If-None-Match matches.
+    """
+    use_gzip = "gzip" in request.headers.get("accept-encoding", "").lower()
+    headers = {
+        "ETag": snapshot.gzip_etag if use_gzip else snapshot.etag,
+        "Cache-Control": cache_control,
+        "Vary": "Accept-Encoding",
+    }
+    if snapshot.matches(request.headers.get("if-none-match")):
+        return Response(status_code=304, headers=headers)
+    if use_gzip:
+        headers["Content-Encoding"] = "gzip"
+        return Response(snapshot.gzip_body, media_type="application/json", headers=headers)
+    return Response(snapshot.body, media_type="application/json", headers=headers)
+
+
+@app.get("/catalog/items")
+async def get_items_catalog(request: Request, db: AsyncFirestore):
+    snapshot = await catalog_snapshots.get("items", lambda: load_items(db))
+    return snapshot_response(request, snapshot, ITEMS_CACHE_CONTROL)
+
+
+async def ensure_item_index() -> None:
+    """
+    Start the items listener and wait for its first snapshot, both off the event loop:
+    subscribing connects to Firestore on the first call.
+    """
+    if not item_index.listening:
+        await run_in_threadpool(item_index.start)
+    if not await run_in_threadpool(item_index.wait_ready):
+        raise HTTPException(status_code=503, detail="Item index is still loading")
+
+
+@app.get("/catalog/items/search")
+async def search_items(
+    user: OptionalUser,
+    item_type: str | None = None,
+    slot: str | None = None,
+    min_price: float | None = None,
+    max_price: float | None = None,
+    param: Annotated[list[str], Query()] = [],
+    offset: Annotated[int, Query(ge=0)] = 0,
+    limit: Annotated[int, Query(ge=1, le=MAX_PAGE_LIMIT)] = DEFAULT_PAGE_LIMIT,
+):
+    """
+    Matching item IDs from the listener-maintained index; fetch bodies from /catalog/items.
+    `param` (repeatable) is `<category>.<name>`, e.g. `Base.Forza`, and matches non-zero bonuses.
+    Anonymous callers only see public items; custom items need a token from an allowed user.
+    """
+    await ensure_item_index()
+    return item_index.query(
+        item_type=item_type,
+        slot=slot,
+        min_price=min_price,
+        max_price=max_price,
+        user_id=user["uid"] if user else None,
+        params=tuple(param),
+        offset=offset,
+        limit=limit,
+    )
+
+
+@app.get("/catalog/items/facets")
+async def item_facets():
+    await ensure_item_index()
+    return item_index.facets()
+
+
+@app.get("/catalog/schemas/{name}")
+async def get_schema(name: str, request: Request, user: SignedInUser):
+    if not SCHEMA_NAME_RE.match(name):
+        raise HTTPException(status_code=404, detail="Unknown schema")
+    snapshot = await catalog_snapshots.get(
+        f"schema_{name}", lambda: load_schema(name), ttl=schema_snapshot_ttl()
+    )
+    if snapshot is None:
+        raise HTTPException(status_code=404, detail="Unknown schema")
+    return snapshot_response(request, snapshot, SCHEMA_CACHE_CONTROL)
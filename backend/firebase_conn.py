@@ -1,22 +1,259 @@
 # file ./backend/firebase_conn.py
-# import firebase_admin
-from firebase_admin import credentials, firestore, initialize_app
+# Firebase is initialized on first use, not at import time: `python main.py --help`
+# and dry-run CLI commands never pay for credential parsing or gRPC channel setup.
+import itertools
 import json
+import math
 import os
+import threading
 
 # Determine if running locally or on Render
 run_local = os.getenv("RENDER") is None  # If the RENDER environment variable is not set, assume local
-print(f"Running {'locally' if run_local else 'on Render'}")
 
 # The path to your secret file:
 service_account_path = "/etc/secrets/firestoreServiceAccountKey.json"
 
-if run_local:
-    cred = credentials.Certificate("firestoreServiceAccountKey.json")
-else:
-    with open(service_account_path, "r") as f:
-        service_account_info = json.load(f)
-    cred = credentials.Certificate(service_account_info)
+# gRPC tuning for pooled clients; override through the environment on bigger machines.
+POOL_SIZE = int(os.getenv("FIRESTORE_POOL_SIZE", "4"))
+KEEPALIVE_TIME_MS = int(os.getenv("FIRESTORE_KEEPALIVE_TIME_MS", "30000"))
+KEEPALIVE_TIMEOUT_MS = int(os.getenv("FIRESTORE_KEEPALIVE_TIMEOUT_MS", "10000"))
+# HTTP/2 stream budget per connection; used to size pools for a given worker count.
+MAX_CONCURRENT_STREAMS = int(os.getenv("FIRESTORE_MAX_CONCURRENT_STREAMS", "100"))
 
-initialize_app(cred)
-db = firestore.client()
\ No newline at end of file
+# Offline mode: serve `db` from a JSON backup held in memory (see memory_firestore.py).
+MEMORY_BACKUP = os.getenv("FIRESTORE_MEMORY_BACKUP")
+MEMORY_LATENCY_MS = float(os.getenv("FIRESTORE_MEMORY_LATENCY_MS", "0"))
+
+_init_lock = threading.Lock()
+_db = None
+# Async client for FastAPI routes, created on first use and shared by every request.
+_async_db = None
+
+
+def _ensure_app():
+    import firebase_admin
+    from firebase_admin import credentials, initialize_app
+
+    try:
+        firebase_admin.get_app()
+        return
+    except ValueError:
+        pass
+
+    print(f"Running {'locally' if run_local else 'on Render'}")
+    if run_local:
+        cred = credentials.Certificate("firestoreServiceAccountKey.json")
+    else:
+        with open(service_account_path, "r") as f:
+            service_account_info = json.load(f)
+        cred = credentials.Certificate(service_account_info)
+
+    initialize_app(cred)
+
+
+def use_memory_backend(backup_path: str, latency_ms: float = 0.0):
+    """
+    Replace the sync client with an in-memory copy of `backup_path`.
+    Every `db` user (and pooled_db) sees it from now on; returns the client.
+    """
+    global _db
+    from memory_firestore import MemoryFirestore
+
+    client = MemoryFirestore.from_backup(backup_path, latency_ms)
+    with _init_lock:
+        _db = client
+        _pools.clear()
+    print(f"Using in-memory Firestore from {backup_path} ({latency_ms:g} ms per call)")
+    return client
+
+
+def memory_backend_active() -> bool:
+    return _db is not None and type(_db).__name__ == "MemoryFirestore"
+
+
+def get_db():
+    global _db
+    if _db is None and MEMORY_BACKUP:
+        use_memory_backend(MEMORY_BACKUP, MEMORY_LATENCY_MS)
+    if _db is None:
+        with _init_lock:
+            if _db is None:
+                _ensure_app()
+                from firebase_admin import firestore
+                _db = firestore.client()
+    return _db
+
+
+def get_async_db():
+    global _async_db
+    if _async_db is None:
+        with _init_lock:
+            if _async_db is None:
+                _ensure_app()
+                from firebase_admin import firestore_async
+                _async_db = firestore_async.client()
+    return _async_db
+
+
+def verify_id_token(id_token: str) -> dict:
+    """
+    Decode a Firebase Auth ID token; raises firebase_admin.auth errors when invalid.
+    """
+    _ensure_app()
+    from firebase_admin import auth
+    return auth.verify_id_token(id_token)
+
+
+def channel_options() -> list:
+    return [
+        ("grpc.keepalive_time_ms", KEEPALIVE_TIME_MS),
+        ("grpc.keepalive_timeout_ms", KEEPALIVE_TIMEOUT_MS),
+        ("grpc.keepalive_permit_without_calls", 1),
+        ("grpc.max_send_message_length", -1),
+        ("grpc.max_receive_message_length", -1),
+        # Channels with identical arguments share one TCP connection through the
+        # global subchannel pool; a local pool gives each client its own connection.
+        ("grpc.use_local_subchannel_pool", 1),
+    ]
+
+
+# Pinned in requirements.txt; the tuned channel is attached through the one private
+# slot Client reads its GAPIC API from, checked below so an SDK upgrade fails loudly.
+FIRESTORE_SDK_VERSION = "2.20.0"
+
+
+def _new_client():
+    """
+    Build a sync client on its own gRPC channel with channel_options().
+
+    The GAPIC FirestoreClient and its gRPC transport are built through their public
+    constructors (with the client's client_options and client_info), then handed to
+    a stock Client before its first call.
+    """
+    import firebase_admin
+    from google.api_core.client_options import ClientOptions
+    from google.api_core.gapic_v1.client_info import ClientInfo
+    from google.cloud.firestore_v1 import __version__ as firestore_version
+    from google.cloud.firestore_v1.client import Client
+    from google.cloud.firestore_v1.services.firestore import FirestoreClient
+    from google.cloud.firestore_v1.services.firestore.transports.grpc import FirestoreGrpcTransport
+
+    _ensure_app()
+    app = firebase_admin.get_app()
+    credentials = app.credential.get_credential()
+    client_options = ClientOptions()
+    client_info = ClientInfo(client_library_version=firestore_version)
+    client = Client(
+        credentials=credentials, project=app.project_id,
+        client_info=client_info, client_options=client_options,
+    )
+    if os.getenv("FIRESTORE_EMULATOR_HOST"):
+        return client
+    if getattr(client, "_firestore_api_internal", False) is not None:
+        raise RuntimeError(
+            "google-cloud-firestore no longer exposes Client._firestore_api_internal; "
+            f"pooled clients need google-cloud-firestore=={FIRESTORE_SDK_VERSION} (see requirements.txt)"
+        )
+
+    host = FirestoreClient.DEFAULT_ENDPOINT
+    channel = FirestoreGrpcTransport.create_channel(host, credentials=credentials, options=channel_options())
+    client._firestore_api_internal = FirestoreClient(
+        transport=FirestoreGrpcTransport(host=host, channel=channel),
+        client_options=client_options,
+        client_info=client_info,
+    )
+    return client
+
+
+class FirestoreClientPool:
+    """
+    N independent sync clients, each with its own gRPC channel.
+
+    Worker threads are assigned a client round-robin on first use and keep it,
+    so concurrent bulk jobs spread their streams over several HTTP/2 connections.
+    """
+
+    def __init__(self, size: int):
+        self.size = max(1, size)
+        self._clients = [None] * self.size
+        self._next = itertools.count()
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def _client(self, index: int):
+        if self._clients[index] is None:
+            with self._lock:
+                if self._clients[index] is None:
+                    self._clients[index] = _new_client()
+        return self._clients[index]
+
+    def get(self):
+        """Next client in round-robin order."""
+        return self._client(next(self._next) % self.size)
+
+    def for_current_thread(self):
+        """The client pinned to the calling thread."""
+        index = getattr(self._local, "index", None)
+        if index is None:
+            index = self._local.index = next(self._next) % self.size
+        return self._client(index)
+
+
+_pools = {}
+
+
+def pool_size_for(workers: int) -> int:
+    """
+    Enough channels that `workers` concurrent RPCs stay within one stream budget
+    each, and never fewer than POOL_SIZE when there are that many workers.
+    """
+    return max(min(workers, POOL_SIZE), math.ceil(workers / MAX_CONCURRENT_STREAMS))
+
+
+def get_db_pool(size: int = POOL_SIZE) -> FirestoreClientPool:
+    with _init_lock:
+        if size not in _pools:
+            _pools[size] = FirestoreClientPool(size)
+        return _pools[size]
+
+
+class _PooledFirestoreClient:
+    """
+    Client-shaped proxy that routes each thread to its pinned pool client.
+    Pass it wherever `db` is expected by thread-pool based maintenance jobs.
+    """
+
+    def __init__(self, pool: FirestoreClientPool):
+        self._pool = pool
+
+    def __getattr__(self, name):
+        return getattr(self._pool.for_current_thread(), name)
+
+    def __repr__(self):
+        return f"<pooled Firestore client ({self._pool.size} channels)>"
+
+
+def pooled_db(workers: int):
+    """
+    A `db` for `workers` concurrent threads; plain lazy `db` when one channel is enough.
+    """
+    size = pool_size_for(workers)
+    if size <= 1 or MEMORY_BACKUP or memory_backend_active():
+        return db
+    return _PooledFirestoreClient(get_db_pool(size))
+
+
+class _LazyFirestoreClient:
+    """
+    Module-level stand-in for the sync client; connects on first attribute access.
+    """
+
+    def __getattr__(self, name):
+        return getattr(get_db(), name)
+
+    def __repr__(self):
+        state = "connected" if _db is not None else "not connected"
+        return f"<lazy Firestore client ({state})>"
+
+
+db = _LazyFirestoreClient()
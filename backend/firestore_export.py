@@ -0,0 +1,338 @@
+# file: ./backend/firestore_export.py
+"""
+Streaming Firestore backup helpers used by the local `--export-data` CLI.
+
+Collections are walked with paginated cursors and every document is written to
+disk as soon as its page arrives, so peak memory is bounded by the page size
+instead of by the size of the database.
+"""
+import json
+import math
+import os
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+
+DEFAULT_PAGE_SIZE = 300
+DEFAULT_SHARD_SIZE = 2000
+
+# Firestore auto-IDs draw from this alphabet; splitting it gives evenly sized ID ranges.
+AUTO_ID_ALPHABET = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz"
+
+# Only one user document is ever exported; the rest of `users` stays out of backups.
+EXPORT_USER_DOC_ID = "TQAmmVfIpOeNiRflXKSeL1NX2ak2"
+
+
+# ---------------------------------------------------------------------------
+#  Firestore JSON encoder (unchanged)
+# ---------------------------------------------------------------------------
+class FirestoreEncoder(json.JSONEncoder):
+    def default(self, obj):
+        # Imported lazily to keep google.api_core off the CLI start-up path.
+        from google.api_core.datetime_helpers import DatetimeWithNanoseconds
+
+        if isinstance(obj, DatetimeWithNanoseconds):
+            return obj.isoformat()
+        return super().default(obj)
+
+
+# ---------------------------------------------------------------------------
+#  Paginated readers
+# ---------------------------------------------------------------------------
+def iter_collection_pages(
+    collection,
+    page_size: int = DEFAULT_PAGE_SIZE,
+    start_id: str | None = None,
+    end_id: str | None = None,
+    field_paths: list[str] | None = None,
+    filters: tuple = (),
+    after_id: str | None = None,
+):
+    """
+    Yield lists of document snapshots ordered by document ID.
+    Each page resumes with `start_after` on the last snapshot of the previous one.
+    `start_id` (inclusive) and `end_id` (exclusive) restrict the walk to an ID range;
+    `field_paths=[]` turns it into a keys-only listing that still carries update times.
+    `filters` are extra FieldFilter conditions applied to every page and
+    `after_id` skips everything up to and including that ID (used to resume).
+    """
+    from google.cloud.firestore_v1.base_query import FieldFilter
+
+    query = collection.select(field_paths) if field_paths is not None else collection
+    for field_filter in filters:
+        query = query.where(filter=field_filter)
+    query = query.order_by("__name__")
+    if start_id is not None:
+        query = query.where(filter=FieldFilter("__name__", ">=", collection.document(start_id)))
+    if end_id is not None:
+        query = query.where(filter=FieldFilter("__name__", "<", collection.document(end_id)))
+    if after_id is not None:
+        query = query.where(filter=FieldFilter("__name__", ">", collection.document(after_id)))
+    query = query.limit(page_size)
+    last_snapshot = None
+    while True:
+        page_query = query.start_after(last_snapshot) if last_snapshot is not None else query
+        page = list(page_query.stream())
+        if not page:
+            return
+        yield page
+        if len(page) < page_size:
+            return
+        last_snapshot = page[-1]
+
+
+def iter_export_documents(
+    collection,
+    page_size: int = DEFAULT_PAGE_SIZE,
+    start_id: str | None = None,
+    end_id: str | None = None,
+):
+    """
+    Yield the snapshots of a top-level collection that belong in a backup.
+    """
+    if collection.id == "users":
+        doc = collection.document(EXPORT_USER_DOC_ID).get()
+        if doc.exists:
+            yield doc
+        return
+
+    for page in iter_collection_pages(collection, page_size, start_id, end_id):
+        yield from page
+
+
+def collection_count(collection) -> int | None:
+    """
+    Count documents with a server-side aggregation; None when it is unavailable.
+    """
+    try:
+        return int(collection.count().get()[0][0].value)
+    except Exception as exc:
+        print(f"Could not count {collection.id}: {exc}")
+        return None
+
+
+def id_ranges(shard_count: int) -> list[tuple[str | None, str | None]]:
+    """
+    Split the document-ID space into contiguous [start, end) ranges.
+    The first range is open below and the last open above, so every ID is covered
+    exactly once even when it does not come from the auto-ID alphabet.
+    """
+    shard_count = max(1, min(shard_count, len(AUTO_ID_ALPHABET)))
+    bounds = [
+        AUTO_ID_ALPHABET[(index * len(AUTO_ID_ALPHABET)) // shard_count]
+        for index in range(1, shard_count)
+    ]
+    starts = [None] + bounds
+    ends = bounds + [None]
+    return list(zip(starts, ends))
+
+
+# ---------------------------------------------------------------------------
+#  Streaming JSON writer
+# ---------------------------------------------------------------------------
+class StreamingBackupWriter:
+    """
+    Write `{collection: {doc_id: data}}` incrementally.
+
+    The bytes on disk match `json.dumps(result, indent=2, cls=FirestoreEncoder)`,
+    so streamed backups stay interchangeable with the legacy snapshots.
+    """
+
+    extension = "json"
+    binary = False
+
+    def __init__(self, fp):
+        self.fp = fp
+        self._open_collection = None
+        self._collection_has_docs = False
+        self._has_collections = False
+
+    def __enter__(self):
+        self.fp.write("{")
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        return False
+
+    def begin_collection(self, name: str):
+        if self._open_collection is not None:
+            self.end_collection()
+        prefix = "," if self._has_collections else ""
+        self.fp.write(f"{prefix}\n  {json.dumps(name)}: {{")
+        self._open_collection = name
+        self._collection_has_docs = False
+        self._has_collections = True
+
+    def write_document(self, doc_id: str, data: dict):
+        body = json.dumps(data, indent=2, cls=FirestoreEncoder).replace("\n", "\n    ")
+        prefix = "," if self._collection_has_docs else ""
+        self.fp.write(f"{prefix}\n    {json.dumps(doc_id)}: {body}")
+        self._collection_has_docs = True
+
+    def end_collection(self):
+        self.fp.write("\n  }" if self._collection_has_docs else "}")
+        self._open_collection = None
+
+    def close(self):
+        if self._open_collection is not None:
+            self.end_collection()
+        self.fp.write("\n}" if self._has_collections else "}")
+
+
+def write_documents(writer: StreamingBackupWriter, documents) -> int:
+    count = 0
+    for doc in documents:
+        writer.write_document(doc.id, doc.to_dict())
+        count += 1
+    return count
+
+
+def backup_filepath(output_dir: str, extension: str = "json") -> str:
+    os.makedirs(output_dir, exist_ok=True)
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    return os.path.join(output_dir, f"firestore_backup_{timestamp}.{extension}")
+
+
+def open_backup(path: str, writer_cls):
+    if writer_cls.binary:
+        return open(path, "wb")
+    return open(path, "w", encoding="utf-8")
+
+
+def stream_export(db, output_dir: str, page_size: int = DEFAULT_PAGE_SIZE, writer_cls=StreamingBackupWriter) -> dict:
+    """
+    Stream every top-level collection into a timestamped backup.
+    The file is written under a `.partial` name and renamed once complete.
+    Returns a summary with the backup path and per-collection document counts.
+    """
+    filepath = backup_filepath(output_dir, writer_cls.extension)
+    partial_path = filepath + ".partial"
+    counts = {}
+
+    with open_backup(partial_path, writer_cls) as fp, writer_cls(fp) as writer:
+        for collection in db.collections():
+            col_name = collection.id
+            writer.begin_collection(col_name)
+            counts[col_name] = write_documents(writer, iter_export_documents(collection, page_size))
+            print(f"Exported {counts[col_name]} documents from {col_name}")
+
+    os.replace(partial_path, filepath)
+    return {"path": filepath, "collections": counts}
+
+
+# ---------------------------------------------------------------------------
+#  Parallel sharded export
+# ---------------------------------------------------------------------------
+def plan_export_shards(db, shard_size: int = DEFAULT_SHARD_SIZE) -> list[dict]:
+    """
+    One shard per top-level collection; collections with more than `shard_size`
+    documents are split into document-ID ranges.
+    """
+    shards = []
+    for collection in db.collections():
+        shard_count = 1
+        if collection.id != "users":
+            total = collection_count(collection)
+            if total and total > shard_size:
+                shard_count = math.ceil(total / shard_size)
+
+        for index, (start_id, end_id) in enumerate(id_ranges(shard_count)):
+            shards.append({
+                "collection": collection.id,
+                "index": index,
+                "start_id": start_id,
+                "end_id": end_id,
+            })
+    return shards
+
+
+def export_shard(db, shard: dict, shard_dir: str, page_size: int = DEFAULT_PAGE_SIZE) -> dict:
+    """
+    Write one shard as NDJSON, one `{"id", "data"}` record per line.
+    """
+    collection = db.collection(shard["collection"])
+    filename = f"{shard['collection']}.{shard['index']:03d}.ndjson"
+    count = 0
+    with open(os.path.join(shard_dir, filename), "w", encoding="utf-8") as fp:
+        documents = iter_export_documents(collection, page_size, shard["start_id"], shard["end_id"])
+        for doc in documents:
+            fp.write(json.dumps({"id": doc.id, "data": doc.to_dict()}, cls=FirestoreEncoder))
+            fp.write("\n")
+            count += 1
+    return {**shard, "file": filename, "count": count}
+
+
+def join_shards(shard_dir: str, filepath: str, writer_cls=StreamingBackupWriter) -> dict:
+    """
+    Stream the shards listed in `manifest.json` into a single backup file.
+    """
+    with open(os.path.join(shard_dir, "manifest.json"), encoding="utf-8") as fp:
+        manifest = json.load(fp)
+
+    counts = {}
+    partial_path = filepath + ".partial"
+    with open_backup(partial_path, writer_cls) as out, writer_cls(out) as writer:
+        for col_name in manifest["collections"]:
+            writer.begin_collection(col_name)
+            counts[col_name] = 0
+            for shard in manifest["shards"]:
+                if shard["collection"] != col_name:
+                    continue
+                with open(os.path.join(shard_dir, shard["file"]), encoding="utf-8") as fp:
+                    for line in fp:
+                        record = json.loads(line)
+                        writer.write_document(record["id"], record["data"])
+                        counts[col_name] += 1
+
+    os.replace(partial_path, filepath)
+    return counts
+
+
+def parallel_export(
+    db,
+    output_dir: str,
+    workers: int,
+    page_size: int = DEFAULT_PAGE_SIZE,
+    shard_size: int = DEFAULT_SHARD_SIZE,
+    writer_cls=StreamingBackupWriter,
+) -> dict:
+    """
+    Export shards concurrently on a bounded thread pool, record them in a
+    manifest, then join them into one timestamped backup.
+    The shard directory is removed once the join succeeds.
+    """
+    filepath = backup_filepath(output_dir, writer_cls.extension)
+    shard_dir = os.path.splitext(filepath)[0] + ".shards"
+    os.makedirs(shard_dir, exist_ok=True)
+
+    shards = plan_export_shards(db, shard_size)
+    print(f"Exporting {len(shards)} shards with {workers} workers")
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(export_shard, db, shard, shard_dir, page_size) for shard in shards]
+        results = []
+        for future in futures:
+            result = future.result()
+            print(f"Exported {result['count']} documents from {result['collection']} shard {result['index']}")
+            results.append(result)
+
+    collections = []
+    for shard in results:
+        if shard["collection"] not in collections:
+            collections.append(shard["collection"])
+
+    manifest = {
+        "created_at": datetime.now().isoformat(),
+        "backup": os.path.basename(filepath),
+        "collections": collections,
+        "shards": results,
+    }
+    with open(os.path.join(shard_dir, "manifest.json"), "w", encoding="utf-8") as fp:
+        json.dump(manifest, fp, indent=2)
+
+    counts = join_shards(shard_dir, filepath, writer_cls)
+    shutil.rmtree(shard_dir)
+    return {"path": filepath, "collections": counts, "shards": len(results)}
@@ -0,0 +1,217 @@
+# file: ./backend/incremental_backup.py
+"""
+Incremental Firestore backups keyed on document update times.
+
+The first run writes a full base snapshot. Later runs list document IDs and
+update times with keys-only queries, fetch only the documents whose update time
+changed, and append them (plus deletions) to an NDJSON delta file. The index
+file keeps the last seen update time of every document and the ordered chain of
+backup files, so any point in time can be rebuilt from the base plus its deltas.
+"""
+import json
+import os
+from datetime import datetime
+
+from firestore_export import (
+    DEFAULT_PAGE_SIZE,
+    EXPORT_USER_DOC_ID,
+    FirestoreEncoder,
+    StreamingBackupWriter,
+    iter_collection_pages,
+    iter_export_documents,
+)
+
+INDEX_FILENAME = "firestore_backup_index.json"
+GET_ALL_BATCH_SIZE = 100
+CHECKPOINT_FORMAT = "%Y%m%d_%H%M%S"
+
+
+def timestamp_key(value) -> str | None:
+    """
+    Serialize a snapshot update time without losing nanoseconds.
+    """
+    if value is None:
+        return None
+    rfc3339 = getattr(value, "rfc3339", None)
+    return rfc3339() if callable(rfc3339) else value.isoformat()
+
+
+def load_index(backup_dir: str) -> dict | None:
+    path = os.path.join(backup_dir, INDEX_FILENAME)
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as fp:
+        return json.load(fp)
+
+
+def save_index(backup_dir: str, index: dict):
+    path = os.path.join(backup_dir, INDEX_FILENAME)
+    with open(path + ".partial", "w", encoding="utf-8") as fp:
+        json.dump(index, fp)
+    os.replace(path + ".partial", path)
+
+
+# ---------------------------------------------------------------------------
+#  Change detection
+# ---------------------------------------------------------------------------
+def list_update_times(collection, page_size: int = DEFAULT_PAGE_SIZE) -> dict:
+    """
+    Map document ID -> update time using a keys-only listing.
+    """
+    if collection.id == "users":
+        doc = collection.document(EXPORT_USER_DOC_ID).get()
+        return {doc.id: timestamp_key(doc.update_time)} if doc.exists else {}
+
+    update_times = {}
+    for page in iter_collection_pages(collection, page_size, field_paths=[]):
+        for snap in page:
+            update_times[snap.id] = timestamp_key(snap.update_time)
+    return update_times
+
+
+def fetch_documents(db, collection, doc_ids: list, batch_size: int = GET_ALL_BATCH_SIZE):
+    """
+    Fetch only the listed documents, `batch_size` references per get_all round-trip.
+    """
+    for start in range(0, len(doc_ids), batch_size):
+        refs = [collection.document(doc_id) for doc_id in doc_ids[start:start + batch_size]]
+        yield from db.get_all(refs)
+
+
+# ---------------------------------------------------------------------------
+#  Base and delta writers
+# ---------------------------------------------------------------------------
+def write_base(db, backup_dir: str, checkpoint: str, page_size: int = DEFAULT_PAGE_SIZE) -> tuple[dict, dict]:
+    """
+    Stream a full legacy-format snapshot and collect every document's update time.
+    """
+    filename = f"firestore_backup_{checkpoint}.json"
+    path = os.path.join(backup_dir, filename)
+    documents, counts = {}, {}
+    with open(path + ".partial", "w", encoding="utf-8") as fp, StreamingBackupWriter(fp) as writer:
+        for collection in db.collections():
+            col_name = collection.id
+            writer.begin_collection(col_name)
+            documents[col_name] = {}
+            for doc in iter_export_documents(collection, page_size):
+                writer.write_document(doc.id, doc.to_dict())
+                documents[col_name][doc.id] = timestamp_key(doc.update_time)
+            counts[col_name] = len(documents[col_name])
+            print(f"Base snapshot: {counts[col_name]} documents from {col_name}")
+    os.replace(path + ".partial", path)
+
+    entry = {"type": "base", "checkpoint": checkpoint, "file": filename, "collections": counts}
+    return entry, documents
+
+
+def write_delta(db, backup_dir: str, checkpoint: str, previous: dict, page_size: int = DEFAULT_PAGE_SIZE) -> tuple[dict, dict]:
+    """
+    Append upserts for created/changed documents and deletes for vanished ones.
+    """
+    filename = f"firestore_delta_{checkpoint}.ndjson"
+    path = os.path.join(backup_dir, filename)
+    documents = {}
+    upserts = deletes = 0
+
+    def write_record(fp, record):
+        fp.write(json.dumps(record, cls=FirestoreEncoder))
+        fp.write("\n")
+
+    with open(path + ".partial", "w", encoding="utf-8") as fp:
+        for collection in db.collections():
+            col_name = collection.id
+            seen = previous.get(col_name, {})
+            current = list_update_times(collection, page_size)
+            changed = [doc_id for doc_id, update_time in current.items() if seen.get(doc_id) != update_time]
+
+            for doc in fetch_documents(db, collection, changed):
+                if doc.exists:
+                    write_record(fp, {"op": "upsert", "collection": col_name, "id": doc.id, "data": doc.to_dict()})
+                    current[doc.id] = timestamp_key(doc.update_time)
+                    upserts += 1
+                else:
+                    current.pop(doc.id, None)
+
+            for doc_id in seen:
+                if doc_id not in current:
+                    write_record(fp, {"op": "delete", "collection": col_name, "id": doc_id})
+                    deletes += 1
+
+            documents[col_name] = current
+            print(f"Delta: {len(changed)} changed, {len(current)} tracked in {col_name}")
+
+        for col_name, seen in previous.items():
+            if col_name in documents:
+                continue
+            for doc_id in seen:
+                write_record(fp, {"op": "delete", "collection": col_name, "id": doc_id})
+                deletes += 1
+    os.replace(path + ".partial", path)
+
+    entry = {"type": "delta", "checkpoint": checkpoint, "file": filename, "upserts": upserts, "deletes": deletes}
+    return entry, documents
+
+
+def incremental_backup(db, backup_dir: str, page_size: int = DEFAULT_PAGE_SIZE) -> dict:
+    """
+    Write a base snapshot on the first run and a delta on every run after that.
+    """
+    os.makedirs(backup_dir, exist_ok=True)
+    checkpoint = datetime.now().strftime(CHECKPOINT_FORMAT)
+    index = load_index(backup_dir)
+
+    if index is None:
+        entry, documents = write_base(db, backup_dir, checkpoint, page_size)
+        index = {"chain": []}
+    else:
+        entry, documents = write_delta(db, backup_dir, checkpoint, index["documents"], page_size)
+
+    index["chain"].append(entry)
+    index["checkpoint"] = checkpoint
+    index["documents"] = documents
+    save_index(backup_dir, index)
+    return entry
+
+
+# ---------------------------------------------------------------------------
+#  Point-in-time restore
+# ---------------------------------------------------------------------------
+def restore_point_in_time(backup_dir: str, output_path: str, until: str | None = None) -> dict:
+    """
+    Rebuild a legacy-format snapshot from the base plus every delta up to `until`
+    (a `YYYYMMDD_HHMMSS` checkpoint, inclusive; the latest one when omitted).
+    The output is written locally; nothing is sent back to Firestore.
+    """
+    index = load_index(backup_dir)
+    if index is None:
+        raise FileNotFoundError(f"No {INDEX_FILENAME} in {backup_dir}")
+
+    chain = [entry for entry in index["chain"] if until is None or entry["checkpoint"] <= until]
+    if not chain:
+        raise ValueError(f"No backup at or before {until}")
+
+    with open(os.path.join(backup_dir, chain[0]["file"]), encoding="utf-8") as fp:
+        state = json.load(fp)
+
+    for entry in chain[1:]:
+        with open(os.path.join(backup_dir, entry["file"]), encoding="utf-8") as fp:
+            for line in fp:
+                record = json.loads(line)
+                docs = state.setdefault(record["collection"], {})
+                if record["op"] == "upsert":
+                    docs[record["id"]] = record["data"]
+                else:
+                    docs.pop(record["id"], None)
+
+    counts = {}
+    with open(output_path + ".partial", "w", encoding="utf-8") as fp, StreamingBackupWriter(fp) as writer:
+        for col_name in sorted(state):
+            if not state[col_name]:
+                continue
+            writer.begin_collection(col_name)
+            for doc_id in sorted(state[col_name]):
+                writer.write_document(doc_id, state[col_name][doc_id])
+            counts[col_name] = len(state[col_name])
+    os.replace(output_path + ".partial", output_path)
+
+    return {"path": output_path, "checkpoint": chain[-1]["checkpoint"], "collections": counts}
@@ -0,0 +1,216 @@
+# file: ./backend/item_index.py
+"""
+In-memory inverted index over the `items` collection for Bazaar filtering.
+
+Postings map a term (item type, slot, visibility, allowed user, parameter with a
+non-zero bonus) to the set of item IDs carrying it; prices live in a sorted list
+queried with bisect. A collection listener feeds every added, modified or removed
+item through `upsert`/`remove`, so the index is updated per document instead of
+rebuilt, and a query is a handful of set intersections.
+"""
+import threading
+import time
+from bisect import bisect_left, bisect_right, insort
+
+from firebase_conn import db as default_db
+
+DEFAULT_PAGE_LIMIT = 50
+MAX_PAGE_LIMIT = 500
+READY_TIMEOUT_SECONDS = 10
+
+
+def has_bonus(value) -> bool:
+    """
+    Parametri brackets hold ints, "" or dice strings; anything but empty/zero counts.
+    """
+    if value in (None, "", 0):
+        return False
+    if isinstance(value, str):
+        return value.strip() not in ("", "0")
+    return True
+
+
+def item_terms(data: dict) -> set:
+    terms = {("type", data.get("item_type")), ("slot", (data.get("General") or {}).get("Slot"))}
+    if data.get("visibility") == "custom":
+        terms.update(("user", uid) for uid in data.get("allowed_users") or [])
+    else:
+        # Legacy "private" items are shown to everyone, like VisibilitySelector does.
+        terms.add(("visibility", "all"))
+
+    for category, params in (data.get("Parametri") or {}).items():
+        for name, levels in (params or {}).items():
+            if isinstance(levels, dict) and any(has_bonus(value) for value in levels.values()):
+                terms.add(("param", f"{category}.{name}"))
+    return terms
+
+
+class ItemIndex:
+    def __init__(self, db=None):
+        self.db = db if db is not None else default_db
+        self._postings = {}
+        self._doc_terms = {}
+        self._doc_prices = {}
+        # Sorted (prezzo, doc_id) pairs for range queries.
+        self._prices = []
+        self._lock = threading.RLock()
+        self._watch = None
+        self._resync = False
+        self._ready = threading.Event()
+
+    # ---------------------------------------------------------------------
+    #  Incremental maintenance
+    # ---------------------------------------------------------------------
+    def upsert(self, doc_id: str, data: dict) -> None:
+        with self._lock:
+            self.remove(doc_id)
+            terms = item_terms(data)
+            for term in terms:
+                self._postings.setdefault(term, set()).add(doc_id)
+            self._doc_terms[doc_id] = terms
+
+            price = (data.get("General") or {}).get("prezzo")
+            if isinstance(price, (int, float)):
+                self._doc_prices[doc_id] = price
+                insort(self._prices, (price, doc_id))
+
+    def remove(self, doc_id: str) -> None:
+        with self._lock:
+            for term in self._doc_terms.pop(doc_id, ()):
+                postings = self._postings[term]
+                postings.discard(doc_id)
+                if not postings:
+                    del self._postings[term]
+
+            price = self._doc_prices.pop(doc_id, None)
+            if price is not None:
+                position = bisect_left(self._prices, (price, doc_id))
+                del self._prices[position]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._postings.clear()
+            self._doc_terms.clear()
+            self._doc_prices.clear()
+            self._prices.clear()
+
+    def load(self, documents) -> None:
+        """
+        Index (doc_id, data) pairs, e.g. from a backup, without a listener.
+        """
+        for doc_id, data in documents:
+            self.upsert(doc_id, data)
+        self._ready.set()
+
+    def __len__(self) -> int:
+        return len(self._doc_terms)
+
+    # ---------------------------------------------------------------------
+    #  Queries
+    # ---------------------------------------------------------------------
+    def query(
+        self,
+        item_type: str | None = None,
+        slot: str | None = None,
+        min_price: float | None = None,
+        max_price: float | None = None,
+        user_id: str | None = None,
+        params: tuple = (),
+        offset: int = 0,
+        limit: int = DEFAULT_PAGE_LIMIT,
+    ) -> dict:
+        """
+        Item IDs matching every given filter, sorted by ID and paginated.
+        Items are visible when public or when `user_id` is in their allowed users.
+        """
+        started = time.perf_counter()
+        with self._lock:
+            visible = self._postings.get(("visibility", "all"), set())
+            if user_id:
+                visible = visible | self._postings.get(("user", user_id), set())
+
+            candidates = [visible]
+            if item_type is not None:
+                candidates.append(self._postings.get(("type", item_type), set()))
+            if slot is not None:
+                candidates.append(self._postings.get(("slot", slot), set()))
+            for param in params:
+                candidates.append(self._postings.get(("param", param), set()))
+            if min_price is not None or max_price is not None:
+                low = bisect_left(self._prices, (min_price, "")) if min_price is not None else 0
+                high = bisect_right(self._prices, (max_price, "\uffff")) if max_price is not None else len(self._prices)
+                candidates.append({doc_id for _, doc_id in self._prices[low:high]})
+
+            # Intersect starting from the smallest set.
+            candidates.sort(key=len)
+            matches = set(candidates[0]).intersection(*candidates[1:])
+
+        ids = sorted(matches)
+        limit = max(1, min(limit, MAX_PAGE_LIMIT))
+        return {
+            "ids": ids[offset:offset + limit],
+            "total": len(ids),
+            "offset": offset,
+            "limit": limit,
+            "tookUs": round((time.perf_counter() - started) * 1_000_000, 1),
+        }
+
+    def facets(self) -> dict:
+        """
+        Known filter values, for building the Bazaar filter UI.
+        """
+        with self._lock:
+            values = {}
+            for kind, value in self._postings:
+                if kind in ("type", "slot", "param") and value is not None:
+                    values.setdefault(kind, []).append(value)
+            return {kind: sorted(found) for kind, found in values.items()}
+
+    # ---------------------------------------------------------------------
+    #  Listener
+    # ---------------------------------------------------------------------
+    @property
+    def listening(self) -> bool:
+        return self._watch is not None and self._watch.is_active
+
+    def start(self) -> None:
+        """
+        Watch `items`; the first snapshot indexes the whole collection.
+        """
+        with self._lock:
+            if self.listening:
+                return
+            if self._watch is not None:
+                self._watch.unsubscribe()
+            # Deletions missed while unsubscribed never arrive as changes; rebuild once.
+            self._resync = True
+            self._watch = self.db.collection("items").on_snapshot(self._on_snapshot)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._watch is not None:
+                self._watch.unsubscribe()
+                self._watch = None
+
+    def wait_ready(self, timeout: float = READY_TIMEOUT_SECONDS) -> bool:
+        return self._ready.wait(timeout)
+
+    def _on_snapshot(self, collection_snapshot, changes, read_time) -> None:
+        # Runs on the watch thread.
+        with self._lock:
+            if self._resync:
+                self.clear()
+                for doc in collection_snapshot:
+                    self.upsert(doc.id, doc.to_dict())
+                self._resync = False
+                self._ready.set()
+                return
+            for change in changes:
+                if change.type.name == "REMOVED":
+                    self.remove(change.document.id)
+                else:
+                    self.upsert(change.document.id, change.document.to_dict())
+        self._ready.set()
+
+
+item_index = ItemIndex()
@@ -1,22 +1,25 @@
 # file: ./backend/main.py
 # C:\ProgramData\miniconda3\envs\fatins\Scripts\uvicorn.exe main:app --reload --host 127.0.0.1 --port 8000
-from firebase_conn import db
-from fast_api import app
+from firebase_conn import db, pooled_db
+from firestore_export import (
+    DEFAULT_PAGE_SIZE,
+    DEFAULT_SHARD_SIZE,
+    EXPORT_USER_DOC_ID,
+    FirestoreEncoder,
+    StreamingBackupWriter,
+    backup_filepath,
+    parallel_export,
+    stream_export,
+)
+from incremental_backup import incremental_backup, restore_point_in_time
+from compact_backup import CompactBackupReader, CompactBackupWriter, convert_backup
+from utils_cache import get_util
 import argparse
-import uvicorn
 import json
+import math
 import os
-from datetime import datetime
-from google.api_core.datetime_helpers import DatetimeWithNanoseconds
-
-# ---------------------------------------------------------------------------
-#  Firestore JSON encoder (unchanged)
-# ---------------------------------------------------------------------------
-class FirestoreEncoder(json.JSONEncoder):
-    def default(self, obj):
-        if isinstance(obj, DatetimeWithNanoseconds):
-            return obj.isoformat()
-        return super().default(obj)
+import threading
+import time
 
 
 CANONICAL_ROLES = {"player", "dm", "webmaster"}
@@ -35,16 +38,53 @@ def normalize_role(value: object) -> str:
     return ""
 
 # ---------------------------------------------------------------------------
-#  Public healthcheck route
+#  FastAPI app (imported on demand so CLI commands skip FastAPI start-up)
 # ---------------------------------------------------------------------------
-@app.get("/")
-def read_root():
-    return {"message": "Hello from FastAPI - DnD Game Backend!"}
+def __getattr__(name):
+    # `uvicorn main:app` resolves the app through this hook.
+    if name == "app":
+        from fast_api import app
+        return app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 # ---------------------------------------------------------------------------
 #  Local-only Firestore maintenance helpers
 # ---------------------------------------------------------------------------
+FIRESTORE_BATCH_LIMIT = 500
+
+
+def normalize_user_stats(doc_data: dict) -> bool:
+    """
+    Reset the spendable point counters in `stats`, keeping level/HP/mana.
+    Mutates doc_data in place; returns False when the document has no stats.
+    """
+    if "stats" not in doc_data:
+        return False
+
+    old_stats = doc_data["stats"]
+    doc_data["stats"] = {
+        "level":            old_stats.get("level", 1),
+        "hpTotal":          old_stats.get("hpTotal", 0),
+        "hpCurrent":        old_stats.get("hpCurrent", 0),
+        "manaTotal":        old_stats.get("manaTotal", 0),
+        "manaCurrent":      old_stats.get("manaCurrent", 0),
+        "basePointsAvailable":   4,
+        "basePointsSpent":       0,
+        "combatTokensAvailable": 50,
+        "combatTokensSpent":     0,
+    }
+    return True
+
+
+def print_document(doc_path: str, doc_data: dict):
+    print(f"\nStructure of document at {doc_path}:")
+    print("-----------------------------------")
+    formatted_json = json.dumps(doc_data, indent=2, cls=FirestoreEncoder)
+    print(formatted_json)
+    print("-----------------------------------")
+
+
 def run_call(user_id: str = None, path: str = None, dry_run: bool = True):
     """
     Retrieve, modify and update a document at the specified Firestore path.
@@ -66,55 +106,67 @@ def run_call(user_id: str = None, path: str = None, dry_run: bool = True):
 
         doc_data = doc.to_dict()
 
-        if "stats" in doc_data:
-            old_stats = doc_data["stats"]
-            new_stats = {
-                "level":            old_stats.get("level", 1),
-                "hpTotal":          old_stats.get("hpTotal", 0),
-                "hpCurrent":        old_stats.get("hpCurrent", 0),
-                "manaTotal":        old_stats.get("manaTotal", 0),
-                "manaCurrent":      old_stats.get("manaCurrent", 0),
-                "basePointsAvailable":   4,
-                "basePointsSpent":       0,
-                "combatTokensAvailable": 50,
-                "combatTokensSpent":     0,
-            }
-            doc_data["stats"] = new_stats
+        if normalize_user_stats(doc_data):
             if dry_run:
                 print(f"[DRY RUN] Would update Firestore document: {doc_path}")
             else:
                 doc_ref.set(doc_data)
                 print(f"Document updated in Firestore: {doc_path}")
 
-        print(f"\nStructure of document at {doc_path}:")
-        print("-----------------------------------")
-        formatted_json = json.dumps(doc_data, indent=2, cls=FirestoreEncoder)
-        print(formatted_json)
-        print("-----------------------------------")
+        print_document(doc_path, doc_data)
         return doc_data
     except Exception as e:
         print(f"Error retrieving or updating document: {str(e)}")
         return None
 
 
-def run_call_on_everyone(dry_run: bool = True):
+def run_call_on_everyone(dry_run: bool = True, verbose: bool = False):
     """
     Normalize all users in the 'users' collection. Defaults to dry-run.
+    Reuses the streamed snapshots and commits writes in batches of up to
+    FIRESTORE_BATCH_LIMIT; per-document JSON dumps are printed only when verbose.
     """
     try:
         users_ref = db.collection('users').stream()
         results, user_count = {}, 0
+        summary = {"updated": 0, "withoutStats": 0, "batches": 0}
+        batch, pending = db.batch(), 0
         print("\nProcessing all users in the 'users' collection:")
         print("-----------------------------------")
         for user_doc in users_ref:
             user_id = user_doc.id
-            print(f"Processing user: {user_id}")
-            user_data = run_call(user_id=user_id, dry_run=dry_run)
-            if user_data:
-                results[user_id] = user_data
-                user_count += 1
+            user_data = user_doc.to_dict()
+            if not user_data:
+                continue
+
+            if normalize_user_stats(user_data):
+                summary["updated"] += 1
+                if not dry_run:
+                    batch.set(user_doc.reference, user_data)
+                    pending += 1
+                    if pending >= FIRESTORE_BATCH_LIMIT:
+                        batch.commit()
+                        summary["batches"] += 1
+                        batch, pending = db.batch(), 0
+            else:
+                summary["withoutStats"] += 1
+
+            if verbose:
+                print_document(f"users/{user_id}", user_data)
+            results[user_id] = user_data
+            user_count += 1
+
+        if pending:
+            batch.commit()
+            summary["batches"] += 1
+
+        action = "Would update" if dry_run else "Updated"
         print("-----------------------------------")
         print(f"Total users processed: {user_count}")
+        print(
+            f"{action} {summary['updated']} users in {summary['batches']} batch commits; "
+            f"{summary['withoutStats']} without stats."
+        )
         print("-----------------------------------")
         return results
     except Exception as e:
@@ -122,9 +174,27 @@ def run_call_on_everyone(dry_run: bool = True):
         return {"error": str(e)}
 
 
+BULK_WRITE_MAX_ATTEMPTS = 5
+
+
+def latency_percentiles(samples: list[float], percentiles=(50, 95, 99)) -> dict:
+    """
+    Nearest-rank percentiles of write latencies, in milliseconds.
+    """
+    if not samples:
+        return {}
+    ordered = sorted(samples)
+    return {
+        f"p{pct}": round(ordered[min(len(ordered) - 1, max(0, math.ceil(pct / 100 * len(ordered)) - 1))] * 1000, 1)
+        for pct in percentiles
+    }
+
+
 def normalize_user_roles(dry_run: bool = True):
     """
     Normalize stored user roles to the canonical contract. Defaults to dry-run.
+    Updates are queued on a BulkWriter (rate-limited, exponential backoff) while
+    the stream keeps reading, so no write blocks the next read.
     """
     try:
         users_ref = db.collection('users').stream()
@@ -133,7 +203,33 @@ def normalize_user_roles(dry_run: bool = True):
             "updated": 0,
             "alreadyCanonical": 0,
             "invalid": 0,
+            "failed": 0,
         }
+        from google.cloud.firestore_v1.bulk_writer import BulkRetry, BulkWriterOptions
+
+        enqueued_at, latencies = {}, []
+        lock = threading.Lock()
+        started = time.perf_counter()
+
+        writer = None
+        if not dry_run:
+            writer = db.bulk_writer(BulkWriterOptions(retry=BulkRetry.exponential))
+
+            def on_write_result(reference, result, bulk_writer):
+                with lock:
+                    latencies.append(time.perf_counter() - enqueued_at.pop(reference.path))
+
+            def on_write_error(failure, bulk_writer):
+                if failure.attempts < BULK_WRITE_MAX_ATTEMPTS:
+                    return True
+                with lock:
+                    enqueued_at.pop(failure.operation.reference.path, None)
+                    summary["failed"] += 1
+                print(f"Failed to normalize role for {failure.operation.reference.id}: {failure.message}")
+                return False
+
+            writer.on_write_result(on_write_result)
+            writer.on_write_error(on_write_error)
 
         print("\nChecking user role values:")
         print("-----------------------------------")
@@ -155,16 +251,31 @@ def normalize_user_roles(dry_run: bool = True):
             print(
                 f"{action} role for {user_doc.id}: {raw_role!r} -> {normalized_role!r}"
             )
-            if not dry_run:
-                user_doc.reference.update({"role": normalized_role})
+            if writer is not None:
+                with lock:
+                    enqueued_at[user_doc.reference.path] = time.perf_counter()
+                writer.update(user_doc.reference, {"role": normalized_role})
             summary["updated"] += 1
 
+        if writer is not None:
+            writer.close()
+
+        elapsed = time.perf_counter() - started
+        summary["updated"] -= summary["failed"]
+        summary["docsPerSecond"] = round(summary["checked"] / elapsed, 1) if elapsed else 0.0
+        summary["writeLatencyMs"] = latency_percentiles(latencies)
+
         print("-----------------------------------")
         print(
-            "Checked {checked} users: {updated} updates, {alreadyCanonical} already canonical, {invalid} invalid.".format(
+            "Checked {checked} users: {updated} updates, {alreadyCanonical} already canonical, {invalid} invalid, {failed} failed.".format(
                 **summary
             )
         )
+        print(f"Throughput: {summary['docsPerSecond']} docs/sec over {elapsed:.2f}s")
+        if summary["writeLatencyMs"]:
+            print(
+                "Write latency: " + ", ".join(f"{name} {value} ms" for name, value in summary["writeLatencyMs"].items())
+            )
         print("-----------------------------------")
         return summary
     except Exception as e:
@@ -172,10 +283,44 @@ def normalize_user_roles(dry_run: bool = True):
         return {"error": str(e)}
 
 
-def everything_to_json(output_dir: str | None = None):
+def everything_to_json(
+    output_dir: str | None = None,
+    stream: bool = False,
+    page_size: int = DEFAULT_PAGE_SIZE,
+    parallel: int = 1,
+    shard_size: int = DEFAULT_SHARD_SIZE,
+    backup_format: str = "json",
+):
     """
     Dump Firestore to JSON and optionally save a timestamped local backup.
+    With stream=True documents are paged and written straight to disk instead of
+    being collected and printed; only a summary is returned.
+    parallel > 1 also streams, exporting collections and ID-range shards of large
+    collections concurrently before joining them into the same backup file.
+    backup_format="compact" streams into the indexed msgpack `.fbk` format.
     """
+    writer_cls = BACKUP_WRITERS[backup_format]
+    if stream or parallel > 1 or writer_cls is not StreamingBackupWriter:
+        if not output_dir:
+            print("Streaming export needs --output-dir.")
+            return {"error": "output_dir is required for streaming export"}
+        try:
+            print("\nStreaming all Firestore data:")
+            print("-----------------------------------")
+            if parallel > 1:
+                # One gRPC channel per worker (up to the pool size) instead of all shards on one connection.
+                summary = parallel_export(
+                    pooled_db(parallel), output_dir, parallel, page_size=page_size, shard_size=shard_size, writer_cls=writer_cls
+                )
+            else:
+                summary = stream_export(db, output_dir, page_size=page_size, writer_cls=writer_cls)
+            print(f"Data saved to file: {summary['path']}")
+            print("-----------------------------------")
+            return summary
+        except Exception as e:
+            print(f"Error streaming Firestore data: {str(e)}")
+            return {"error": str(e)}
+
     try:
         result = {}
         collections = db.collections()
@@ -186,10 +331,9 @@ def everything_to_json(output_dir: str | None = None):
             col_name = collection.id
             result[col_name] = {}
             if col_name == "users":
-                specific_doc_id = "TQAmmVfIpOeNiRflXKSeL1NX2ak2"
-                doc = collection.document(specific_doc_id).get()
+                doc = collection.document(EXPORT_USER_DOC_ID).get()
                 if doc.exists:
-                    result[col_name][specific_doc_id] = doc.to_dict()
+                    result[col_name][EXPORT_USER_DOC_ID] = doc.to_dict()
             else:
                 for doc in collection.stream():
                     result[col_name][doc.id] = doc.to_dict()
@@ -199,10 +343,7 @@ def everything_to_json(output_dir: str | None = None):
         print("-----------------------------------")
 
         if output_dir:
-            os.makedirs(output_dir, exist_ok=True)
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = f"firestore_backup_{timestamp}.json"
-            filepath = os.path.join(output_dir, filename)
+            filepath = backup_filepath(output_dir)
             with open(filepath, "w", encoding="utf-8") as fp:
                 fp.write(formatted_json)
             print(f"Data saved to file: {filepath}")
@@ -214,6 +355,254 @@ def everything_to_json(output_dir: str | None = None):
         print(f"Error retrieving Firestore data: {str(e)}")
         return {"error": str(e)}
 
+def convert_backup_file(path: str):
+    """
+    Convert a legacy JSON backup to the compact format, or a compact backup back to JSON.
+    """
+    try:
+        summary = convert_backup(path)
+        print(f"Converted {path} -> {summary['path']}")
+        return summary
+    except Exception as e:
+        print(f"Error converting backup: {str(e)}")
+        return {"error": str(e)}
+
+
+def read_backup_document(path: str, doc_path: str):
+    """
+    Print one document from a compact backup without loading the rest of the dump.
+    """
+    try:
+        collection, doc_id = doc_path.split("/", 1)
+        with CompactBackupReader(path) as reader:
+            doc_data = reader.read_document(collection, doc_id)
+        if doc_data is None:
+            print(f"Document {doc_path} not found in {path}")
+            return None
+        print(json.dumps(doc_data, indent=2, cls=FirestoreEncoder))
+        return doc_data
+    except Exception as e:
+        print(f"Error reading backup document: {str(e)}")
+        return None
+
+
+def incremental_export(output_dir: str, page_size: int = DEFAULT_PAGE_SIZE):
+    """
+    Write a base snapshot the first time, then only documents created, changed or
+    deleted since the last checkpoint recorded in the local backup index.
+    """
+    try:
+        print("\nIncremental Firestore backup:")
+        print("-----------------------------------")
+        entry = incremental_backup(db, output_dir, page_size=page_size)
+        print(f"{entry['type'].capitalize()} saved to file: {os.path.join(output_dir, entry['file'])}")
+        print("-----------------------------------")
+        return entry
+    except Exception as e:
+        print(f"Error writing incremental backup: {str(e)}")
+        return {"error": str(e)}
+
+
+def restore_backup(output_dir: str, until: str | None = None):
+    """
+    Rebuild a point-in-time JSON snapshot from the incremental backups in output_dir.
+    """
+    try:
+        label = until or "latest"
+        output_path = os.path.join(output_dir, f"firestore_restore_{label}.json")
+        summary = restore_point_in_time(output_dir, output_path, until=until)
+        print(f"Restored checkpoint {summary['checkpoint']} to file: {summary['path']}")
+        return summary
+    except Exception as e:
+        print(f"Error restoring backup: {str(e)}")
+        return {"error": str(e)}
+
+def recompute_stats(dry_run: bool = True):
+    """
+    Audit Parametri Tot, hpTotal and manaTotal for every user, and Tot for every
+    foe, in one vectorized pass (see stat_engine). Defaults to dry-run; with
+    dry_run=False the differing fields are written in batches.
+    """
+    try:
+        import stat_engine
+        from google.cloud.firestore_v1.field_path import FieldPath
+
+        varie = get_util("varie") or {}
+        started = time.perf_counter()
+        jobs = (
+            ("users", dict(keep_bare_tot=False, derive_resources=True)),
+            # Foes store bare Tot values and their HP/Mana are set by hand.
+            ("foes", dict(keep_bare_tot=True, derive_resources=False)),
+        )
+        summary = {"checked": 0, "changedDocs": 0, "changedFields": 0, "batches": 0}
+        batch, pending = db.batch(), 0
+
+        print("\nRecomputing character stats:")
+        print("-----------------------------------")
+        for collection_name, options in jobs:
+            snapshots = {doc.id: doc for doc in db.collection(collection_name).stream()}
+            documents = {doc_id: doc.to_dict() or {} for doc_id, doc in snapshots.items()}
+            changes = stat_engine.recompute(documents, varie, **options)
+            summary["checked"] += len(documents)
+
+            for doc_id, fields in changes.items():
+                summary["changedDocs"] += 1
+                summary["changedFields"] += len(fields)
+                for path, (old, new) in fields.items():
+                    print(f"{collection_name}/{doc_id} {'.'.join(path)}: {old!r} -> {new!r}")
+                if not dry_run:
+                    update = {FieldPath(*path).to_api_repr(): new for path, (_, new) in fields.items()}
+                    batch.update(snapshots[doc_id].reference, update)
+                    pending += 1
+                    if pending >= FIRESTORE_BATCH_LIMIT:
+                        batch.commit()
+                        summary["batches"] += 1
+                        batch, pending = db.batch(), 0
+
+        if pending:
+            batch.commit()
+            summary["batches"] += 1
+
+        action = "Would update" if dry_run else "Updated"
+        print("-----------------------------------")
+        print(
+            f"Checked {summary['checked']} documents in {time.perf_counter() - started:.2f}s; "
+            f"{action} {summary['changedFields']} fields on {summary['changedDocs']} documents."
+        )
+        print("-----------------------------------")
+        return summary
+    except Exception as e:
+        print(f"Error recomputing stats: {str(e)}")
+        return {"error": str(e)}
+
+
+def recompute_equip(dry_run: bool = True):
+    """
+    Recompute every user's Parametri Equip from their `equipped` items at the
+    current level bracket (see equipment_bonus). Equip is only adjusted by deltas
+    on equip/unequip, so it drifts after level-ups. Bonuses come from the embedded
+    `equipped` copies, which is what unequip subtracts; copies that differ from
+    `items` are reported, not used. Users with a non-numeric level are skipped.
+    Defaults to dry-run; with dry_run=False the differing fields are written in
+    batches and the Tot trigger picks them up.
+    """
+    try:
+        from equipment_bonus import SECTIONS, catalog_drift, equipment_compiler, parse_level
+        from google.cloud.firestore_v1.field_path import FieldPath
+
+        catalog = {doc.id: doc.to_dict() or {} for doc in db.collection("items").stream()}
+        started = time.perf_counter()
+        summary = {"checked": 0, "changedDocs": 0, "changedFields": 0, "batches": 0, "skipped": 0, "driftedItems": 0}
+        batch, pending = db.batch(), 0
+
+        print("\nRecomputing equipment bonuses:")
+        print("-----------------------------------")
+        for user_doc in db.collection("users").stream():
+            user_data = user_doc.to_dict() or {}
+            parametri = user_data.get("Parametri") or {}
+            try:
+                level = parse_level((user_data.get("stats") or {}).get("level"))
+            except ValueError as exc:
+                print(f"users/{user_doc.id} skipped: {exc}")
+                summary["skipped"] += 1
+                continue
+            for slot, item_id in catalog_drift(user_data.get("equipped"), catalog):
+                print(f"users/{user_doc.id} equipped.{slot}: embedded copy of items/{item_id} differs from the catalog")
+                summary["driftedItems"] += 1
+            computed = equipment_compiler.equip_values(user_data.get("equipped"), level, parametri)
+            summary["checked"] += 1
+
+            update = {}
+            stored_keys = {
+                (section, name)
+                for section in SECTIONS
+                for name, param in (parametri.get(section) or {}).items()
+                if isinstance(param, dict) and param.get("Equip")
+            }
+            for section, name in sorted(stored_keys | set(computed)):
+                old = ((parametri.get(section) or {}).get(name) or {}).get("Equip") or 0
+                new = computed.get((section, name), 0)
+                if old != new:
+                    print(f"users/{user_doc.id} Parametri.{section}.{name}.Equip: {old!r} -> {new!r}")
+                    update[FieldPath("Parametri", section, name, "Equip").to_api_repr()] = new
+
+            if not update:
+                continue
+            summary["changedDocs"] += 1
+            summary["changedFields"] += len(update)
+            if not dry_run:
+                batch.update(user_doc.reference, update)
+                pending += 1
+                if pending >= FIRESTORE_BATCH_LIMIT:
+                    batch.commit()
+                    summary["batches"] += 1
+                    batch, pending = db.batch(), 0
+
+        if pending:
+            batch.commit()
+            summary["batches"] += 1
+
+        action = "Would update" if dry_run else "Updated"
+        print("-----------------------------------")
+        print(
+            f"Checked {summary['checked']} users in {time.perf_counter() - started:.2f}s "
+            f"({equipment_compiler.compiled} items compiled); "
+            f"{action} {summary['changedFields']} fields on {summary['changedDocs']} users; "
+            f"{summary['skipped']} skipped, {summary['driftedItems']} embedded items differ from the catalog."
+        )
+        print("-----------------------------------")
+        return summary
+    except Exception as e:
+        print(f"Error recomputing equipment bonuses: {str(e)}")
+        return {"error": str(e)}
+
+
+def simulate_encounter(party_ids: list[str], foe_ids: list[str], fights: int, seed: int | None = None, foe_damage: str = "1d6"):
+    """
+    Run `fights` simulated encounters between users and foes (see encounter_sim)
+    and print win rates, expected rounds and damage distributions. Read-only.
+    A foe ID may be repeated to add several copies of it.
+    """
+    try:
+        from encounter_sim import DEFAULT_DAMAGE, combatant_from_doc, simulate
+
+        def load(collection_name, doc_ids, default_damage):
+            combatants = []
+            for doc_id in doc_ids:
+                snapshot = db.collection(collection_name).document(doc_id).get()
+                if not snapshot.exists:
+                    raise ValueError(f"{collection_name}/{doc_id} not found")
+                combatants.append(combatant_from_doc(doc_id, snapshot.to_dict(), default_damage))
+            return combatants
+
+        party = load("users", party_ids, DEFAULT_DAMAGE)
+        foes = load("foes", foe_ids, foe_damage)
+        started = time.perf_counter()
+        report = simulate(party, foes, fights=fights, seed=seed)
+        elapsed = time.perf_counter() - started
+
+        print("\nEncounter simulation:")
+        print("-----------------------------------")
+        print(
+            f"{fights} fights in {elapsed:.2f}s: party wins {report['partyWinRate']:.1%}, "
+            f"foes win {report['foeWinRate']:.1%}, draws {report['drawRate']:.1%}, "
+            f"timeouts {report['timeoutRate']:.1%}"
+        )
+        print(f"Expected rounds: {report['expectedRounds']} {report['rounds']}")
+        print(f"Party damage taken: {report['partyDamageTaken']}")
+        for combatant in report["combatants"]:
+            print(
+                f"  [{combatant['side']}] {combatant['name']} ({combatant['damage']}): "
+                f"dies {combatant['deathRate']:.1%}, deals {combatant['meanDamageDealt']} {combatant['damageDealt']}, "
+                f"takes {combatant['meanDamageTaken']}"
+            )
+        print("-----------------------------------")
+        return report
+    except Exception as e:
+        print(f"Error simulating encounter: {str(e)}")
+        return {"error": str(e)}
+
+
 # ---------------------------------------------------------------------------
 #  schema_armatura copy logic
 # ---------------------------------------------------------------------------
@@ -520,6 +909,11 @@ def copy_schema_consumabili() -> dict:
 # ---------------------------------------------------------------------------
 #  Local-only CLI command registry
 # ---------------------------------------------------------------------------
+BACKUP_WRITERS = {
+    "json": StreamingBackupWriter,
+    "compact": CompactBackupWriter,
+}
+
 SCHEMA_COPY_COMMANDS = {
     "armatura": copy_schema_armatura,
     "weapon": copy_schema_weapon,
@@ -532,33 +926,91 @@ def run_admin_cli():
     parser = argparse.ArgumentParser(
         description="Local-only Firestore maintenance tools. No admin operation is exposed as a production HTTP route."
     )
-    parser.add_argument("--serve-local", action="store_true", help="Run the healthcheck-only FastAPI app on 127.0.0.1:8000.")
+    parser.add_argument("--serve-local", action="store_true", help="Run the FastAPI app (healthcheck plus read-only catalog, search, facets and schema routes) on 127.0.0.1:8000.")
     parser.add_argument("--update-all-users", action="store_true", help="Normalize user stats. Dry-run unless --execute is set.")
+    parser.add_argument("--recompute-stats", action="store_true", help="Audit Tot/HP/Mana for users and foes. Dry-run unless --execute is set.")
+    parser.add_argument("--recompute-equip", action="store_true", help="Recompute users' Equip bonuses from equipped items. Dry-run unless --execute is set.")
+    parser.add_argument("--simulate-encounter", action="store_true", help="Simulate fights between --party users and --foes. Read-only.")
     parser.add_argument("--normalize-user-roles", action="store_true", help="Normalize stored user roles. Dry-run unless --execute is set.")
     parser.add_argument("--export-data", action="store_true", help="Export Firestore data to a local ignored backup file.")
+    parser.add_argument("--restore-backup", action="store_true", help="Rebuild a JSON snapshot from the incremental backups in --output-dir.")
+    parser.add_argument("--convert-backup", metavar="PATH", help="Convert a JSON backup to the compact .fbk format or back.")
+    parser.add_argument("--read-backup-doc", nargs=2, metavar=("PATH", "COLLECTION/DOC_ID"), help="Print one document from a compact .fbk backup.")
     parser.add_argument("--seed-schema", choices=sorted(SCHEMA_COPY_COMMANDS), help="Seed one schema document. Dry-run unless --execute is set.")
     parser.add_argument("--execute", action="store_true", help="Actually perform the selected mutating operation.")
+    parser.add_argument("--verbose", action="store_true", help="Print every processed document as JSON.")
     parser.add_argument("--output-dir", default=os.path.dirname(__file__), help="Output directory for --export-data backups.")
+    parser.add_argument("--stream", action="store_true", help="Page through collections and write --export-data backups document by document.")
+    parser.add_argument("--page-size", type=int, default=DEFAULT_PAGE_SIZE, help="Documents fetched per page by --stream exports.")
+    parser.add_argument("--parallel", type=int, default=1, metavar="N", help="Export collections and ID-range shards on N worker threads (implies --stream).")
+    parser.add_argument("--shard-size", type=int, default=DEFAULT_SHARD_SIZE, help="Collections larger than this are split into ID-range shards by --parallel.")
+    parser.add_argument("--format", choices=sorted(BACKUP_WRITERS), default="json", help="Backup file format for --export-data.")
+    parser.add_argument("--incremental", action="store_true", help="Make --export-data write only documents changed since the last checkpoint.")
+    parser.add_argument("--party", nargs="+", default=[], metavar="USER_ID", help="User IDs fighting in --simulate-encounter.")
+    parser.add_argument("--foes", nargs="+", default=[], metavar="FOE_ID", help="Foe IDs for --simulate-encounter; repeat an ID for several copies.")
+    parser.add_argument("--fights", type=int, default=10000, help="Number of fights run by --simulate-encounter.")
+    parser.add_argument("--seed", type=int, default=None, help="Random seed for --simulate-encounter.")
+    parser.add_argument("--foe-damage", default="1d6", help="Damage dice for foes in --simulate-encounter (foes carry no weapon).")
+    parser.add_argument("--until", metavar="YYYYMMDD_HHMMSS", help="Latest checkpoint included by --restore-backup (default: newest).")
     args = parser.parse_args()
 
     if args.serve_local:
-        print("Starting healthcheck-only FastAPI app on 127.0.0.1:8000...")
-        uvicorn.run(app, host="127.0.0.1", port=8000, reload=True)
+        import uvicorn
+        print("Starting FastAPI app (healthcheck, catalog, search, facets, schemas) on 127.0.0.1:8000...")
+        uvicorn.run("main:app", host="127.0.0.1", port=8000, reload=True)
         return
 
     if args.update_all_users:
-        result = run_call_on_everyone(dry_run=not args.execute)
+        result = run_call_on_everyone(dry_run=not args.execute, verbose=args.verbose)
         user_count = len(result) if isinstance(result, dict) and "error" not in result else 0
         mode = "Updated" if args.execute else "Dry-run checked"
         print(f"{mode} {user_count} users.")
         return
 
+    if args.recompute_stats:
+        recompute_stats(dry_run=not args.execute)
+        return
+
+    if args.recompute_equip:
+        recompute_equip(dry_run=not args.execute)
+        return
+
+    if args.simulate_encounter:
+        if not args.party or not args.foes:
+            print("--simulate-encounter needs --party and --foes.")
+            return
+        simulate_encounter(args.party, args.foes, args.fights, seed=args.seed, foe_damage=args.foe_damage)
+        return
+
     if args.normalize_user_roles:
         normalize_user_roles(dry_run=not args.execute)
         return
 
+    if args.export_data and args.incremental:
+        incremental_export(output_dir=args.output_dir, page_size=args.page_size)
+        return
+
     if args.export_data:
-        everything_to_json(output_dir=args.output_dir)
+        everything_to_json(
+            output_dir=args.output_dir,
+            stream=args.stream,
+            page_size=args.page_size,
+            parallel=args.parallel,
+            shard_size=args.shard_size,
+            backup_format=args.format,
+        )
+        return
+
+    if args.convert_backup:
+        convert_backup_file(args.convert_backup)
+        return
+
+    if args.read_backup_doc:
+        read_backup_document(*args.read_backup_doc)
+        return
+
+    if args.restore_backup:
+        restore_backup(output_dir=args.output_dir, until=args.until)
         return
 
     if args.seed_schema:
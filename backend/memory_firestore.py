@@ -0,0 +1,570 @@
+# file: ./backend/memory_firestore.py
+"""
+In-memory stand-in for the sync Firestore client, loaded from a JSON backup.
+
+Implements the subset of google.cloud.firestore used by the local tooling
+(`main.py`, `backfill_npc_nome.py`, exports, migrations):
+
+    client.collections() / collection() / document() / batch() / get_all() / bulk_writer()
+    collection.document() / stream() / count()
+    query.where(filter=FieldFilter) / order_by() / select() / limit() / start_after() / stream()
+    document.get() / set() / update() / delete()
+    batch.set() / update() / delete() / commit()
+
+Every round trip (get, stream, commit, aggregation, ...) sleeps `latency_ms`,
+so bulk jobs can be measured and regression-tested reproducibly without
+production credentials:
+
+    FIRESTORE_MEMORY_BACKUP=firestore_backup_20251028_000539.json \\
+    FIRESTORE_MEMORY_LATENCY_MS=20 python main.py --export-data --stream
+"""
+import copy
+import json
+import random
+import string
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+
+AUTO_ID_LENGTH = 20
+AUTO_ID_CHARS = string.ascii_letters + string.digits
+
+
+# ---------------------------------------------------------------------------
+#  Field paths and value ordering
+# ---------------------------------------------------------------------------
+def split_field_path(path) -> list[str]:
+    """
+    "a.b", "a.`x y`.c" (FieldPath.to_api_repr) or a FieldPath -> segments.
+    """
+    parts = getattr(path, "parts", None)
+    if parts is not None:
+        return list(parts)
+    segments, current, quoted, index = [], [], False, 0
+    while index < len(path):
+        char = path[index]
+        if char == "\\" and quoted and index + 1 < len(path):
+            current.append(path[index + 1])
+            index += 1
+        elif char == "`":
+            quoted = not quoted
+        elif char == "." and not quoted:
+            segments.append("".join(current))
+            current = []
+        else:
+            current.append(char)
+        index += 1
+    segments.append("".join(current))
+    return segments
+
+
+def get_field(data: dict, path) -> tuple[bool, object]:
+    value = data
+    for segment in split_field_path(path):
+        if not isinstance(value, dict) or segment not in value:
+            return False, None
+        value = value[segment]
+    return True, value
+
+
+def set_field(data: dict, path, value) -> None:
+    segments = split_field_path(path)
+    target = data
+    for segment in segments[:-1]:
+        if not isinstance(target.get(segment), dict):
+            target[segment] = {}
+        target = target[segment]
+    target[segments[-1]] = value
+
+
+def _type_rank(value) -> int:
+    # Firestore's cross-type ordering: null < bool < number < timestamp < string < ...
+    if value is None:
+        return 0
+    if isinstance(value, bool):
+        return 1
+    if isinstance(value, (int, float)):
+        return 2
+    if isinstance(value, datetime):
+        return 3
+    if isinstance(value, str):
+        return 4
+    if isinstance(value, (list, tuple)):
+        return 8
+    return 9
+
+
+def sort_key(value):
+    rank = _type_rank(value)
+    if rank in (8, 9):
+        return (rank, json.dumps(value, sort_keys=True, default=str))
+    return (rank, value)
+
+
+# ---------------------------------------------------------------------------
+#  Store
+# ---------------------------------------------------------------------------
+class MemoryStore:
+    """
+    path -> (data, create_time, update_time), plus latency injection and call counters.
+    """
+
+    def __init__(self, latency_ms: float = 0.0):
+        self.documents = {}
+        self.latency = latency_ms / 1000
+        self.calls = Counter()
+        self.lock = threading.RLock()
+
+    def round_trip(self, operation: str) -> None:
+        self.calls[operation] += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def write(self, path: str, data: dict | None) -> datetime:
+        now = datetime.now(timezone.utc)
+        with self.lock:
+            if data is None:
+                self.documents.pop(path, None)
+            else:
+                previous = self.documents.get(path)
+                created = previous[1] if previous else now
+                self.documents[path] = (data, created, now)
+        return now
+
+    def children(self, parent: str) -> list[str]:
+        """
+        Document paths directly inside the collection at `parent`.
+        """
+        prefix = parent + "/"
+        with self.lock:
+            return [path for path in self.documents if path.startswith(prefix) and "/" not in path[len(prefix):]]
+
+    def collection_ids(self, parent: str = "") -> list[str]:
+        depth = parent.count("/") + 1 if parent else 0
+        prefix = parent + "/" if parent else ""
+        with self.lock:
+            ids = {
+                path.split("/")[depth]
+                for path in self.documents
+                if path.startswith(prefix) and path.count("/") > depth
+            }
+        return sorted(ids)
+
+
+# ---------------------------------------------------------------------------
+#  Snapshots and references
+# ---------------------------------------------------------------------------
+class MemoryDocumentSnapshot:
+    def __init__(self, reference, data, create_time=None, update_time=None, field_paths=None):
+        self.reference = reference
+        self.id = reference.id
+        self.exists = data is not None
+        self.create_time = create_time
+        self.update_time = update_time
+        self.read_time = datetime.now(timezone.utc)
+        if data is not None and field_paths is not None:
+            projected = {}
+            for field_path in field_paths:
+                found, value = get_field(data, field_path)
+                if found:
+                    set_field(projected, field_path, copy.deepcopy(value))
+            data = projected
+        self._data = data
+
+    def to_dict(self):
+        return copy.deepcopy(self._data) if self._data is not None else None
+
+    def get(self, field_path):
+        found, value = get_field(self._data or {}, field_path)
+        if not found:
+            raise KeyError(field_path)
+        return copy.deepcopy(value)
+
+
+class MemoryDocumentReference:
+    def __init__(self, client, path: str):
+        self._client = client
+        self.path = path
+        self.id = path.rsplit("/", 1)[-1]
+
+    @property
+    def parent(self):
+        return MemoryCollectionReference(self._client, self.path.rsplit("/", 1)[0])
+
+    def collection(self, collection_id: str):
+        return MemoryCollectionReference(self._client, f"{self.path}/{collection_id}")
+
+    def collections(self):
+        self._client._store.round_trip("list_collections")
+        return [self.collection(cid) for cid in self._client._store.collection_ids(self.path)]
+
+    def _snapshot(self, field_paths=None):
+        entry = self._client._store.documents.get(self.path)
+        if entry is None:
+            return MemoryDocumentSnapshot(self, None)
+        data, created, updated = entry
+        return MemoryDocumentSnapshot(self, data, created, updated, field_paths)
+
+    def get(self, field_paths=None, transaction=None, **kwargs):
+        self._client._store.round_trip("get")
+        return self._snapshot(field_paths)
+
+    def set(self, document_data: dict, merge=False):
+        batch = self._client.batch()
+        batch.set(self, document_data, merge=merge)
+        return batch.commit()[0]
+
+    def update(self, field_updates: dict, option=None):
+        batch = self._client.batch()
+        batch.update(self, field_updates)
+        return batch.commit()[0]
+
+    def delete(self, option=None):
+        batch = self._client.batch()
+        batch.delete(self)
+        return batch.commit()[0]
+
+    def __eq__(self, other):
+        return isinstance(other, MemoryDocumentReference) and other.path == self.path
+
+    def __hash__(self):
+        return hash(self.path)
+
+
+class _WriteResult:
+    def __init__(self, update_time):
+        self.update_time = update_time
+
+
+# ---------------------------------------------------------------------------
+#  Queries
+# ---------------------------------------------------------------------------
+_OPERATORS = {
+    "==": lambda value, target: value == target,
+    "!=": lambda value, target: value != target,
+    "<": lambda value, target: sort_key(value) < sort_key(target),
+    "<=": lambda value, target: sort_key(value) <= sort_key(target),
+    ">": lambda value, target: sort_key(value) > sort_key(target),
+    ">=": lambda value, target: sort_key(value) >= sort_key(target),
+    "in": lambda value, target: value in target,
+    "not-in": lambda value, target: value not in target,
+    "array_contains": lambda value, target: isinstance(value, list) and target in value,
+    "array_contains_any": lambda value, target: isinstance(value, list) and any(item in value for item in target),
+}
+
+
+class MemoryQuery:
+    def __init__(self, collection, filters=(), orders=(), limit=None, cursor=None, field_paths=None):
+        self._collection = collection
+        self._filters = tuple(filters)
+        self._orders = tuple(orders)
+        self._limit = limit
+        self._cursor = cursor
+        self._field_paths = field_paths
+
+    def _copy(self, **changes):
+        state = dict(
+            filters=self._filters, orders=self._orders, limit=self._limit,
+            cursor=self._cursor, field_paths=self._field_paths,
+        )
+        state.update(changes)
+        return MemoryQuery(self._collection, **state)
+
+    def where(self, field_path=None, op_string=None, value=None, *, filter=None):
+        if filter is not None:
+            field_path, op_string, value = filter.field_path, filter.op_string, filter.value
+        if op_string not in _OPERATORS:
+            raise ValueError(f"Unsupported operator {op_string!r}")
+        return self._copy(filters=self._filters + ((field_path, op_string, value),))
+
+    def order_by(self, field_path, direction="ASCENDING"):
+        return self._copy(orders=self._orders + ((field_path, str(direction).upper().startswith("DESC")),))
+
+    def limit(self, count: int):
+        return self._copy(limit=count)
+
+    def select(self, field_paths):
+        return self._copy(field_paths=list(field_paths))
+
+    def start_after(self, document_fields_or_snapshot):
+        return self._copy(cursor=document_fields_or_snapshot)
+
+    def count(self, alias=None):
+        return _MemoryCountQuery(self, alias or "count")
+
+    @staticmethod
+    def _field_value(path: str, doc_id: str, data: dict):
+        if path == "__name__":
+            return doc_id
+        return get_field(data, path)
+
+    def _matches(self, doc_id: str, data: dict) -> bool:
+        for field_path, op_string, target in self._filters:
+            if field_path == "__name__":
+                value, target = doc_id, getattr(target, "id", target)
+                if op_string in ("in", "not-in"):
+                    target = [getattr(item, "id", item) for item in target]
+            else:
+                found, value = get_field(data, field_path)
+                if not found:
+                    return False
+            if not _OPERATORS[op_string](value, target):
+                return False
+        return True
+
+    def _order_key(self, doc_id: str, data: dict) -> tuple:
+        key = []
+        for field_path, descending in self._orders:
+            if field_path == "__name__":
+                value = doc_id
+            else:
+                value = get_field(data, field_path)[1]
+            item = sort_key(value)
+            key.append(_Descending(item) if descending else item)
+        # Document name is always the final tie-breaker.
+        if not any(field_path == "__name__" for field_path, _ in self._orders):
+            key.append(sort_key(doc_id))
+        return tuple(key)
+
+    def _results(self) -> list:
+        store = self._collection._client._store
+        with store.lock:
+            entries = [
+                (path, store.documents[path])
+                for path in store.children(self._collection._path)
+            ]
+        matches = []
+        for path, (data, created, updated) in entries:
+            doc_id = path.rsplit("/", 1)[-1]
+            if not self._matches(doc_id, data):
+                continue
+            # Ordering by a field excludes documents that do not have it.
+            if any(fp != "__name__" and not get_field(data, fp)[0] for fp, _ in self._orders):
+                continue
+            matches.append((self._order_key(doc_id, data), path, data, created, updated))
+        matches.sort(key=lambda match: match[0])
+
+        if self._cursor is not None:
+            cursor = self._cursor
+            cursor_key = self._order_key(cursor.id, cursor._data or {}) if hasattr(cursor, "_data") else \
+                self._order_key(cursor.get("__name__", ""), cursor)
+            matches = [match for match in matches if match[0] > cursor_key]
+        if self._limit is not None:
+            matches = matches[: self._limit]
+        return matches
+
+    def stream(self, transaction=None, **kwargs):
+        store = self._collection._client._store
+        store.round_trip("stream")
+        client = self._collection._client
+        for _, path, data, created, updated in self._results():
+            yield MemoryDocumentSnapshot(MemoryDocumentReference(client, path), data, created, updated, self._field_paths)
+
+    def get(self, transaction=None, **kwargs):
+        return list(self.stream())
+
+
+class _Descending:
+    __slots__ = ("value",)
+
+    def __init__(self, value):
+        self.value = value
+
+    def __lt__(self, other):
+        return other.value < self.value
+
+    def __gt__(self, other):
+        return other.value > self.value
+
+    def __eq__(self, other):
+        return self.value == other.value
+
+
+class _AggregationResult:
+    def __init__(self, alias, value):
+        self.alias = alias
+        self.value = value
+        self.read_time = datetime.now(timezone.utc)
+
+
+class _MemoryCountQuery:
+    def __init__(self, query, alias):
+        self._query = query
+        self._alias = alias
+
+    def get(self, transaction=None, **kwargs):
+        self._query._collection._client._store.round_trip("aggregate")
+        return [[_AggregationResult(self._alias, len(self._query._results()))]]
+
+
+class MemoryCollectionReference(MemoryQuery):
+    def __init__(self, client, path: str):
+        self._client = client
+        self._path = path
+        self.id = path.rsplit("/", 1)[-1]
+        super().__init__(self)
+
+    def document(self, document_id: str | None = None):
+        document_id = document_id or "".join(random.choices(AUTO_ID_CHARS, k=AUTO_ID_LENGTH))
+        return MemoryDocumentReference(self._client, f"{self._path}/{document_id}")
+
+    def add(self, document_data: dict, document_id: str | None = None):
+        reference = self.document(document_id)
+        result = reference.set(document_data)
+        return result.update_time, reference
+
+    def list_documents(self, page_size=None):
+        self._client._store.round_trip("list_documents")
+        return [MemoryDocumentReference(self._client, path) for path in sorted(self._client._store.children(self._path))]
+
+
+# ---------------------------------------------------------------------------
+#  Writes
+# ---------------------------------------------------------------------------
+class MemoryWriteBatch:
+    """
+    Buffered writes applied atomically on commit(), like WriteBatch.
+    """
+
+    def __init__(self, client):
+        self._client = client
+        self._writes = []
+
+    def set(self, reference, document_data: dict, merge=False):
+        self._writes.append(("set", reference, copy.deepcopy(document_data), merge))
+        return self
+
+    def update(self, reference, field_updates: dict):
+        self._writes.append(("update", reference, copy.deepcopy(field_updates), False))
+        return self
+
+    def delete(self, reference, option=None):
+        self._writes.append(("delete", reference, None, False))
+        return self
+
+    def __len__(self):
+        return len(self._writes)
+
+    def commit(self, **kwargs):
+        store = self._client._store
+        store.round_trip("commit")
+        results = []
+        with store.lock:
+            for kind, reference, payload, merge in self._writes:
+                if kind == "update" and reference.path not in store.documents:
+                    raise KeyError(f"No document to update: {reference.path}")
+            for kind, reference, payload, merge in self._writes:
+                if kind == "delete":
+                    results.append(_WriteResult(store.write(reference.path, None)))
+                    continue
+                current = store.documents.get(reference.path)
+                if kind == "set" and not merge:
+                    data = payload
+                else:
+                    data = copy.deepcopy(current[0]) if current else {}
+                    if kind == "set":
+                        _deep_merge(data, payload)
+                    else:
+                        for field_path, value in payload.items():
+                            set_field(data, field_path, value)
+                results.append(_WriteResult(store.write(reference.path, data)))
+        self._writes = []
+        return results
+
+
+def _deep_merge(target: dict, patch: dict) -> None:
+    for key, value in patch.items():
+        if isinstance(value, dict) and isinstance(target.get(key), dict):
+            _deep_merge(target[key], value)
+        else:
+            target[key] = value
+
+
+class MemoryBulkWriter:
+    """
+    Synchronous BulkWriter: each write commits immediately and fires the callbacks.
+    """
+
+    def __init__(self, client):
+        self._client = client
+        self._on_result = None
+        self._on_error = None
+
+    def on_write_result(self, callback):
+        self._on_result = callback
+
+    def on_write_error(self, callback):
+        self._on_error = callback
+
+    def _write(self, operation, reference, *args):
+        batch = self._client.batch()
+        getattr(batch, operation)(reference, *args)
+        result = batch.commit()[0]
+        if self._on_result:
+            self._on_result(reference, result, self)
+
+    def set(self, reference, document_data, merge=False):
+        self._write("set", reference, document_data, merge)
+
+    def update(self, reference, field_updates):
+        self._write("update", reference, field_updates)
+
+    def delete(self, reference):
+        self._write("delete", reference)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+
+# ---------------------------------------------------------------------------
+#  Client
+# ---------------------------------------------------------------------------
+class MemoryFirestore:
+    def __init__(self, latency_ms: float = 0.0):
+        self._store = MemoryStore(latency_ms)
+
+    @classmethod
+    def from_backup(cls, path: str, latency_ms: float = 0.0) -> "MemoryFirestore":
+        """
+        Load a `{collection: {doc_id: data}}` backup (the --export-data JSON layout).
+        """
+        client = cls(latency_ms)
+        with open(path, encoding="utf-8") as fp:
+            backup = json.load(fp)
+        for collection, documents in backup.items():
+            for doc_id, data in documents.items():
+                client._store.write(f"{collection}/{doc_id}", data)
+        return client
+
+    @property
+    def calls(self) -> Counter:
+        """Round trips made so far, by operation."""
+        return self._store.calls
+
+    def collection(self, collection_path: str):
+        return MemoryCollectionReference(self, collection_path)
+
+    def document(self, document_path: str):
+        return MemoryDocumentReference(self, document_path)
+
+    def collections(self):
+        self._store.round_trip("list_collections")
+        return [self.collection(cid) for cid in self._store.collection_ids()]
+
+    def batch(self):
+        return MemoryWriteBatch(self)
+
+    def bulk_writer(self, options=None):
+        return MemoryBulkWriter(self)
+
+    def get_all(self, references, field_paths=None, transaction=None, **kwargs):
+        self._store.round_trip("batch_get")
+        for reference in references:
+            yield reference._snapshot(field_paths)
+
+    def __repr__(self):
+        return f"<in-memory Firestore ({len(self._store.documents)} documents)>"
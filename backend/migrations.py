@@ -0,0 +1,288 @@
+# file: ./backend/migrations.py
+"""
+Reusable engine for collection-wide Firestore backfills and migrations.
+
+A migration declares the collection to read, optional query filters and a pure
+`derive(doc_id, data) -> patch | None` function. The engine pages through the
+collection with cursors, previews the patches in dry-run mode, commits them in
+batches (several in flight when `concurrency` > 1, with exponential backoff on
+contention and quota errors) and prints a progress/throughput readout. Applied
+runs can record the last committed document in a checkpoint file so an
+interrupted run resumes after it instead of re-scanning the collection.
+"""
+from __future__ import annotations
+
+import json
+import os
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Optional
+
+from firestore_export import iter_collection_pages
+
+DEFAULT_PAGE_SIZE = 300
+DEFAULT_BATCH_SIZE = 400
+DEFAULT_PREVIEW_COUNT = 20
+
+MAX_COMMIT_ATTEMPTS = 6
+BASE_BACKOFF_SECONDS = 0.5
+MAX_BACKOFF_SECONDS = 16.0
+
+
+def retryable_commit_errors() -> tuple:
+    # google.api_core pulls in grpc; import it only once a commit is attempted.
+    from google.api_core import exceptions
+
+    return (
+        exceptions.Aborted,
+        exceptions.ResourceExhausted,
+        exceptions.ServiceUnavailable,
+        exceptions.DeadlineExceeded,
+    )
+
+
+@dataclass(frozen=True)
+class Migration:
+    name: str
+    collection: str
+    derive: Callable[[str, Dict], Optional[Dict]]
+    filters: tuple = field(default_factory=tuple)
+
+
+class MigrationProgress:
+    def __init__(self, name: str):
+        self.name = name
+        self.started = time.perf_counter()
+        self.scanned = 0
+        self.patches = 0
+        self.committed = 0
+        self.batches = 0
+        self.retries = 0
+        self._lock = threading.Lock()
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def rate(self, count: int) -> float:
+        elapsed = self.elapsed
+        return count / elapsed if elapsed else 0.0
+
+    def record_retry(self) -> None:
+        with self._lock:
+            self.retries += 1
+
+    def report(self) -> None:
+        print(
+            f"[{self.name}] scanned {self.scanned} ({self.rate(self.scanned):.1f} docs/s), "
+            f"patches {self.patches}, committed {self.committed} ({self.rate(self.committed):.1f} committed/s), "
+            f"retries {self.retries}"
+        )
+
+    def summary(self) -> Dict:
+        return {
+            "scanned": self.scanned,
+            "patches": self.patches,
+            "committed": self.committed,
+            "batches": self.batches,
+            "retries": self.retries,
+            "elapsedSeconds": round(self.elapsed, 2),
+            "docsPerSecond": round(self.rate(self.scanned), 1),
+        }
+
+
+def load_checkpoint(path: Optional[str], migration: Migration) -> Optional[Dict]:
+    if not path or not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as fp:
+        checkpoint = json.load(fp)
+    if checkpoint.get("migration") != migration.name:
+        raise ValueError(f"Checkpoint {path} belongs to {checkpoint.get('migration')!r}, not {migration.name!r}")
+    return checkpoint
+
+
+def save_checkpoint(path: Optional[str], migration: Migration, last_doc_id: str, progress: MigrationProgress) -> None:
+    """
+    Record that every document up to `last_doc_id` has been handled.
+    Written to a temporary file and renamed so a crash never leaves half a checkpoint.
+    """
+    if not path:
+        return
+    checkpoint = {
+        "migration": migration.name,
+        "collection": migration.collection,
+        "last_committed_id": last_doc_id,
+        "scanned": progress.scanned,
+        "committed": progress.committed,
+        "updated_at": datetime.now().isoformat(),
+    }
+    with open(path + ".partial", "w", encoding="utf-8") as fp:
+        json.dump(checkpoint, fp, indent=2)
+    os.replace(path + ".partial", path)
+
+
+def clear_checkpoint(path: Optional[str]) -> None:
+    if path and os.path.exists(path):
+        os.remove(path)
+
+
+def commit_patches(db, collection: str, patches: list) -> None:
+    batch = db.batch()
+    for doc_id, patch in patches:
+        batch.update(db.collection(collection).document(doc_id), patch)
+    batch.commit()
+
+
+def commit_with_retry(db, collection: str, patches: list, progress: MigrationProgress) -> int:
+    """
+    Commit one batch, retrying contention and quota errors with exponential backoff.
+    The updates are idempotent, so replaying a whole batch is safe.
+    """
+    retryable = retryable_commit_errors()
+    for attempt in range(MAX_COMMIT_ATTEMPTS):
+        try:
+            commit_patches(db, collection, patches)
+            return len(patches)
+        except retryable as exc:
+            if attempt == MAX_COMMIT_ATTEMPTS - 1:
+                raise
+            delay = min(MAX_BACKOFF_SECONDS, BASE_BACKOFF_SECONDS * 2 ** attempt) * random.uniform(0.5, 1.0)
+            progress.record_retry()
+            print(f"[{progress.name}] batch commit failed ({exc.__class__.__name__}), retrying in {delay:.2f}s")
+            time.sleep(delay)
+    return 0
+
+
+class CommitPipeline:
+    """
+    Keep up to `concurrency` batch commits in flight on a thread pool.
+
+    Batches can finish out of order, so the checkpoint only advances over the
+    contiguous prefix of committed batches; a crash never skips an unwritten one.
+    """
+
+    def __init__(self, db, migration: Migration, progress: MigrationProgress, concurrency: int, checkpoint_path: Optional[str]):
+        self.db = db
+        self.migration = migration
+        self.progress = progress
+        self.concurrency = max(1, concurrency)
+        self.checkpoint_path = checkpoint_path
+        self.pool = ThreadPoolExecutor(max_workers=self.concurrency)
+        # (future or None, batch size, last document ID covered), in scan order.
+        self.marks = deque()
+
+    def submit(self, patches: list, last_doc_id: str) -> None:
+        while sum(1 for future, _, _ in self.marks if future is not None) >= self.concurrency:
+            self.drain(wait_for_head=True)
+        future = self.pool.submit(commit_with_retry, self.db, self.migration.collection, patches, self.progress)
+        self.marks.append((future, len(patches), last_doc_id))
+
+    def mark(self, last_doc_id: str) -> None:
+        self.marks.append((None, 0, last_doc_id))
+        self.drain()
+
+    def drain(self, wait_for_head: bool = False) -> None:
+        advanced_to = None
+        while self.marks:
+            future, size, last_doc_id = self.marks[0]
+            if future is not None:
+                if not future.done() and not wait_for_head:
+                    break
+                future.result()
+                wait_for_head = False
+                self.progress.committed += size
+                self.progress.batches += 1
+            self.marks.popleft()
+            advanced_to = last_doc_id
+
+        if advanced_to is not None:
+            save_checkpoint(self.checkpoint_path, self.migration, advanced_to, self.progress)
+
+    def close(self) -> None:
+        try:
+            while self.marks:
+                self.drain(wait_for_head=True)
+        finally:
+            self.pool.shutdown(wait=True)
+
+
+def run_migration(
+    db,
+    migration: Migration,
+    apply_changes: bool = False,
+    page_size: int = DEFAULT_PAGE_SIZE,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    preview_count: int = DEFAULT_PREVIEW_COUNT,
+    checkpoint_path: Optional[str] = None,
+    concurrency: int = 1,
+) -> Dict:
+    """
+    Stream the collection page by page and preview or commit derived patches.
+    Memory is bounded by one page plus `concurrency` batches in flight.
+
+    With `checkpoint_path`, applied runs resume after the recorded document and
+    advance the checkpoint as batches commit (and after every page that needed
+    no writes). The file is removed once the migration completes.
+    """
+    progress = MigrationProgress(migration.name)
+    pending = []
+    checkpoint_path = checkpoint_path if apply_changes else None
+
+    resume_after = None
+    checkpoint = load_checkpoint(checkpoint_path, migration)
+    if checkpoint:
+        resume_after = checkpoint["last_committed_id"]
+        print(
+            f"[{migration.name}] resuming after {resume_after} "
+            f"({checkpoint['committed']} writes committed by the previous run)"
+        )
+
+    pipeline = CommitPipeline(db, migration, progress, concurrency, checkpoint_path) if apply_changes else None
+    pages = iter_collection_pages(
+        db.collection(migration.collection),
+        page_size,
+        filters=migration.filters,
+        after_id=resume_after,
+    )
+    try:
+        for page in pages:
+            for snap in page:
+                progress.scanned += 1
+                patch = migration.derive(snap.id, snap.to_dict() or {})
+                if not patch:
+                    continue
+
+                progress.patches += 1
+                if not apply_changes:
+                    if progress.patches <= preview_count:
+                        print(f" - {snap.id}: {patch}")
+                    continue
+
+                pending.append((snap.id, patch))
+                if len(pending) >= batch_size:
+                    pipeline.submit(pending, snap.id)
+                    pending = []
+
+            if pipeline is not None and not pending:
+                pipeline.mark(page[-1].id)
+            progress.report()
+
+        if pending:
+            pipeline.submit(pending, pending[-1][0])
+    finally:
+        if pipeline is not None:
+            pipeline.close()
+
+    if apply_changes:
+        progress.report()
+    clear_checkpoint(checkpoint_path)
+
+    if not apply_changes and progress.patches > preview_count:
+        print(f" ... and {progress.patches - preview_count} more")
+
+    return progress.summary()
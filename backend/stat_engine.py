@@ -0,0 +1,193 @@
+# file: ./backend/stat_engine.py
+"""
+Vectorized character stat engine mirroring the `updateTotParameters`,
+`updateHpTotal` and `updateManaTotal` Cloud Functions.
+
+Documents are laid out as arrays with one row per character and one column per
+parameter across the Base/Combattimento/Special sections:
+
+    components  (rows, 4, params)   Base, Anima, Equip, Mod (missing -> 0)
+    stored_tot  (rows, params)      current Tot, NaN where absent
+
+so Tot, HP and Mana for a whole roster come out of a handful of array operations
+instead of three trigger invocations per edited user.
+
+    Tot       = Base + Anima + Equip + Mod
+    hpTotal   = hpMultByLevel[level]   (default 5) * Salute.Tot     + 8
+    manaTotal = manaMultByLevel[level] (default 7) * Disciplina.Tot + 5
+"""
+from dataclasses import dataclass
+
+import numpy as np
+
+SECTIONS = ("Base", "Combattimento", "Special")
+COMPONENTS = ("Base", "Anima", "Equip", "Mod")
+DEFAULT_HP_MULT = 5
+DEFAULT_MANA_MULT = 7
+HP_FLAT = 8
+MANA_FLAT = 5
+
+
+def _number(value) -> float:
+    # Matches `(param.X || 0)` for the numeric values the frontend stores.
+    return float(value) if isinstance(value, (int, float)) and not isinstance(value, bool) else 0.0
+
+
+def _plain(value: float):
+    # Firestore ints stay ints after a round trip through float64.
+    return int(value) if float(value).is_integer() else float(value)
+
+
+def parameter_columns(documents) -> list[tuple[str, str]]:
+    """
+    Union of (section, name) pairs across the documents, in section order.
+    """
+    found = {section: set() for section in SECTIONS}
+    for data in documents:
+        parametri = data.get("Parametri") or {}
+        for section in SECTIONS:
+            found[section].update((parametri.get(section) or {}).keys())
+    return [(section, name) for section in SECTIONS for name in sorted(found[section])]
+
+
+def multiplier_table(by_level: dict | None, default: float, max_level: int) -> np.ndarray:
+    """
+    Dense level -> multiplier lookup; like the triggers, unlisted levels use the default.
+    """
+    table = np.full(max_level + 1, float(default))
+    for level, multiplier in (by_level or {}).items():
+        if str(level).isdigit() and int(level) <= max_level and multiplier:
+            table[int(level)] = float(multiplier)
+    return table
+
+
+@dataclass
+class StatMatrix:
+    ids: list
+    columns: list
+    components: np.ndarray
+    has_components: np.ndarray
+    stored_tot: np.ndarray
+    levels: np.ndarray
+    stored_hp: np.ndarray
+    stored_mana: np.ndarray
+
+    @classmethod
+    def from_documents(cls, documents: dict, columns: list | None = None) -> "StatMatrix":
+        """
+        Build the arrays from `{doc_id: data}`.
+        """
+        ids = list(documents)
+        columns = columns if columns is not None else parameter_columns(documents.values())
+        column_index = {column: position for position, column in enumerate(columns)}
+        rows, width = len(ids), len(columns)
+
+        components = np.zeros((rows, len(COMPONENTS), width))
+        has_components = np.zeros((rows, width), dtype=bool)
+        stored_tot = np.full((rows, width), np.nan)
+        levels = np.zeros(rows, dtype=np.int64)
+        stored_hp = np.full(rows, np.nan)
+        stored_mana = np.full(rows, np.nan)
+
+        for row, doc_id in enumerate(ids):
+            data = documents[doc_id] or {}
+            parametri = data.get("Parametri") or {}
+            for section in SECTIONS:
+                for name, param in (parametri.get(section) or {}).items():
+                    if not isinstance(param, dict):
+                        continue
+                    column = column_index[(section, name)]
+                    for position, component in enumerate(COMPONENTS):
+                        if component in param:
+                            components[row, position, column] = _number(param[component])
+                            has_components[row, column] = True
+                    if isinstance(param.get("Tot"), (int, float)):
+                        stored_tot[row, column] = param["Tot"]
+
+            stats = data.get("stats") or {}
+            level = stats.get("level")
+            levels[row] = level if isinstance(level, int) and level > 0 else 0
+            if isinstance(stats.get("hpTotal"), (int, float)):
+                stored_hp[row] = stats["hpTotal"]
+            if isinstance(stats.get("manaTotal"), (int, float)):
+                stored_mana[row] = stats["manaTotal"]
+
+        return cls(ids, columns, components, has_components, stored_tot, levels, stored_hp, stored_mana)
+
+    def column(self, section: str, name: str) -> int | None:
+        try:
+            return self.columns.index((section, name))
+        except ValueError:
+            return None
+
+
+def compute_totals(matrix: StatMatrix, keep_bare_tot: bool = False) -> np.ndarray:
+    """
+    Tot for every cell; NaN where the parameter is absent.
+    `keep_bare_tot` keeps the stored Tot of entries without components (foes store
+    only Tot); the user trigger would reset those to 0.
+    """
+    totals = matrix.components.sum(axis=1)
+    present = matrix.has_components | ~np.isnan(matrix.stored_tot)
+    if keep_bare_tot:
+        totals = np.where(matrix.has_components, totals, matrix.stored_tot)
+    return np.where(present, totals, np.nan)
+
+
+def compute_resource(matrix: StatMatrix, totals: np.ndarray, section: str, name: str, by_level: dict | None, default: float, flat: float) -> np.ndarray:
+    """
+    mult[level] * <section>.<name>.Tot + flat, NaN where the trigger would skip
+    the update (level or Tot missing/zero).
+    """
+    column = matrix.column(section, name)
+    if column is None:
+        return np.full(len(matrix.ids), np.nan)
+    source = totals[:, column]
+    table = multiplier_table(by_level, default, max(int(matrix.levels.max(initial=0)), 1))
+    resource = table[matrix.levels] * source + flat
+    skip = (matrix.levels == 0) | np.isnan(source) | (source == 0)
+    return np.where(skip, np.nan, resource)
+
+
+def recompute(documents: dict, varie: dict | None = None, keep_bare_tot: bool = False, derive_resources: bool = True) -> dict:
+    """
+    Recompute Tot (and HP/Mana when `derive_resources`) for `{doc_id: data}` in
+    one vectorized pass. Returns `{doc_id: {field_path: (old, new)}}` for values
+    that differ from what is stored; field paths are dotted segments
+    ("Parametri", section, name, "Tot") or ("stats", "hpTotal").
+    """
+    varie = varie or {}
+    matrix = StatMatrix.from_documents(documents)
+    totals = compute_totals(matrix, keep_bare_tot)
+
+    changed_cells = ~np.isnan(totals) & ~np.isclose(totals, matrix.stored_tot, equal_nan=False)
+    changes = {}
+    for row, column in zip(*np.nonzero(changed_cells)):
+        section, name = matrix.columns[column]
+        old = matrix.stored_tot[row, column]
+        changes.setdefault(matrix.ids[row], {})[("Parametri", section, name, "Tot")] = (
+            None if np.isnan(old) else _plain(old),
+            _plain(totals[row, column]),
+        )
+
+    if derive_resources:
+        resources = (
+            ("hpTotal", compute_resource(matrix, totals, "Combattimento", "Salute", varie.get("hpMultByLevel"), DEFAULT_HP_MULT, HP_FLAT), matrix.stored_hp),
+            ("manaTotal", compute_resource(matrix, totals, "Combattimento", "Disciplina", varie.get("manaMultByLevel"), DEFAULT_MANA_MULT, MANA_FLAT), matrix.stored_mana),
+        )
+        for field, computed, stored in resources:
+            differs = ~np.isnan(computed) & ~np.isclose(computed, stored, equal_nan=False)
+            for row in np.nonzero(differs)[0]:
+                old = stored[row]
+                changes.setdefault(matrix.ids[row], {})[("stats", field)] = (
+                    None if np.isnan(old) else _plain(old),
+                    _plain(computed[row]),
+                )
+    return changes
+
+
+def recompute_character(data: dict, varie: dict | None = None) -> dict:
+    """
+    Single-document convenience wrapper, e.g. after a level-up.
+    """
+    return recompute({"_": data}, varie).get("_", {})
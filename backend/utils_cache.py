@@ -0,0 +1,189 @@
+# file: ./backend/utils_cache.py
+"""
+Process-local read-through cache for slowly changing Firestore documents.
+
+The `utils` collection (varie, codex, possible_lists, schema_*, spells_common,
+tecniche_common, ...) is read by every rules feature but changes a few times a
+season. Documents are kept in a cachetools LRU and refreshed by a single
+`on_snapshot` listener on the collection, so lookups are memory reads.
+
+While the listener is live, cached entries are authoritative. If it stops
+(network drop, credentials expiry) entries older than `ttl` are re-read on
+access, so data can never be more than `ttl` seconds stale.
+
+Every document has a version the listener bumps; a direct read only fills the
+cache if no listener update for that document arrived while it was in flight,
+so a slow read can never overwrite a newer snapshot. Lookups return deep
+copies, so callers may mutate what they get.
+"""
+import copy
+import threading
+import time
+
+from cachetools import LRUCache
+
+from firebase_conn import db as default_db
+
+DEFAULT_TTL_SECONDS = 600
+DEFAULT_MAXSIZE = 128
+
+
+class DocumentCache:
+    """
+    Read-through cache over one collection, kept current by a collection listener.
+    """
+
+    def __init__(self, collection: str, db=None, ttl: float = DEFAULT_TTL_SECONDS, maxsize: int = DEFAULT_MAXSIZE, listen: bool = True):
+        self.collection = collection
+        self.db = db if db is not None else default_db
+        self.ttl = ttl
+        self.listen = listen
+        # doc_id -> (data or None when the document does not exist, loaded_at)
+        self._entries = LRUCache(maxsize=maxsize)
+        # doc_id -> number of listener updates/invalidations seen; outlives evictions.
+        # _epoch moves on full invalidations, which touch every document at once.
+        self._versions = {}
+        self._epoch = 0
+        self._lock = threading.RLock()
+        self._watch = None
+        # Called with each doc_id the listener changes, after the cache is updated.
+        self._subscribers = []
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.listener_updates = 0
+
+    # ---------------------------------------------------------------------
+    #  Lookups
+    # ---------------------------------------------------------------------
+    def get(self, doc_id: str) -> dict | None:
+        """
+        Return a copy of the document data (None when it does not exist).
+        """
+        self._ensure_listener()
+        with self._lock:
+            entry = self._entries.get(doc_id)
+            if entry is not None:
+                data, loaded_at = entry
+                if self.listening or time.monotonic() - loaded_at < self.ttl:
+                    self.hits += 1
+                    return copy.deepcopy(data)
+                self.stale += 1
+            else:
+                self.misses += 1
+            version = self._version(doc_id)
+
+        snapshot = self.db.collection(self.collection).document(doc_id).get()
+        data = snapshot.to_dict() if snapshot.exists else None
+        with self._lock:
+            if self._version(doc_id) == version:
+                self._store(doc_id, data)
+            else:
+                # The listener delivered (or invalidated) this document while we were
+                # reading; its copy is at least as new as ours.
+                entry = self._entries.get(doc_id)
+                if entry is not None:
+                    data = entry[0]
+        return copy.deepcopy(data)
+
+    def invalidate(self, doc_id: str | None = None) -> None:
+        with self._lock:
+            if doc_id is None:
+                self._entries.clear()
+                self._epoch += 1
+            else:
+                self._entries.pop(doc_id, None)
+                self._bump(doc_id)
+
+    def stats(self) -> dict:
+        with self._lock:
+            now = time.monotonic()
+            ages = [now - loaded_at for _, loaded_at in self._entries.values()]
+            lookups = self.hits + self.misses + self.stale
+            return {
+                "collection": self.collection,
+                "entries": len(ages),
+                "hits": self.hits,
+                "misses": self.misses,
+                "stale": self.stale,
+                "hitRate": round(self.hits / lookups, 4) if lookups else None,
+                "listening": self.listening,
+                "listenerUpdates": self.listener_updates,
+                "oldestEntrySeconds": round(max(ages), 1) if ages else None,
+            }
+
+    # ---------------------------------------------------------------------
+    #  Listener
+    # ---------------------------------------------------------------------
+    @property
+    def listening(self) -> bool:
+        return self._watch is not None and self._watch.is_active
+
+    def start(self) -> None:
+        """
+        Subscribe to the collection; the initial snapshot warms every document.
+        """
+        with self._lock:
+            if self.listening:
+                return
+            if self._watch is not None:
+                self._watch.unsubscribe()
+            self._watch = self.db.collection(self.collection).on_snapshot(self._on_snapshot)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._watch is not None:
+                self._watch.unsubscribe()
+                self._watch = None
+
+    def subscribe(self, callback) -> None:
+        """
+        Call `callback(doc_id)` on the watch thread whenever the listener changes a document.
+        """
+        self._subscribers.append(callback)
+
+    def _ensure_listener(self) -> None:
+        if self.listen and not self.listening:
+            try:
+                self.start()
+            except Exception as exc:
+                # Fall back to TTL-bounded reads; the next lookup retries the subscription.
+                print(f"Could not watch {self.collection}: {exc}")
+
+    def _on_snapshot(self, collection_snapshot, changes, read_time) -> None:
+        # Runs on the watch thread.
+        changed = []
+        with self._lock:
+            for change in changes:
+                doc_id = change.document.id
+                self._bump(doc_id)
+                if change.type.name == "REMOVED":
+                    self._store(doc_id, None)
+                else:
+                    self._store(doc_id, change.document.to_dict())
+                self.listener_updates += 1
+                changed.append(doc_id)
+        for doc_id in changed:
+            for callback in self._subscribers:
+                callback(doc_id)
+
+    def _version(self, doc_id: str) -> tuple:
+        return self._epoch, self._versions.get(doc_id, 0)
+
+    def _bump(self, doc_id: str) -> None:
+        with self._lock:
+            self._versions[doc_id] = self._versions.get(doc_id, 0) + 1
+
+    def _store(self, doc_id: str, data: dict | None) -> None:
+        with self._lock:
+            self._entries[doc_id] = (data, time.monotonic())
+
+
+utils_cache = DocumentCache("utils")
+
+
+def get_util(doc_id: str) -> dict | None:
+    """
+    Cached read of `utils/<doc_id>`, e.g. get_util("varie"); the result is a copy.
+    """
+    return utils_cache.get(doc_id)
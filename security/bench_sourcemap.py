@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+Benchmark for sourcemap handling in frontend_mapper_previews.py.
+
+Builds a synthetic webpack-style sourcemap (default 20 MB) whose sourcesContent
+entries are minified bundles with URLs and key-like strings, then compares the
+previous handling (json.loads in classify_response, parse_sourcemap and
+reconstruct_sourcemap_sources on the whole text) with one SourcemapReader pass
+over 64 KB chunks. Reports CPU time and peak traced memory for each, and checks
+that the classification, report and reconstructed files are the same.
+
+Both sides scan every sourcesContent entry with the same scan_text, which
+dominates CPU, so expect CPU near parity; the gain is peak memory.
+
+    python3 bench_sourcemap.py
+    python3 bench_sourcemap.py --size 60000000
+"""
+
+import argparse
+import codecs
+import hashlib
+import json
+import random
+import shutil
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import frontend_mapper_previews as mapper
+from bench_scan_text import synthetic_bundle
+
+SOURCEMAP_URL = "https://example.test/static/js/main.js.map"
+
+
+def synthetic_sourcemap(size, seed=0):
+    rnd = random.Random(seed)
+    sources = []
+    contents = []
+    total = 0
+
+    while total < size:
+        index = len(sources)
+        content = synthetic_bundle(rnd.randint(500, 60_000), seed=seed + index).replace(";", ";\n\t")
+        sources.append(f"webpack:///./src/components/mod{index}/File{index}.jsx")
+        contents.append(content)
+        total += len(content)
+
+    return json.dumps({
+        "version": 3,
+        "file": "main.js",
+        "mappings": "AAAA,SAASA,CAACC;" * (size // 60),
+        "sources": sources,
+        "sourcesContent": contents,
+        "names": [f"n{index}" for index in range(20_000)],
+        "sourceRoot": "",
+    })
+
+
+def legacy_handle(path, report, out_sources):
+    """The handling before SourcemapReader, kept as the reference."""
+    text = Path(path).read_bytes().decode("utf-8")
+
+    classification = "sourcemap_url_readable_but_not_valid_sourcemap"
+    try:
+        obj = json.loads(text)
+        if isinstance(obj, dict) and obj.get("version") and obj.get("sources") is not None:
+            if obj.get("sourcesContent"):
+                classification = "readable_sourcemap_with_sourcesContent"
+            else:
+                classification = "readable_sourcemap_without_sourcesContent"
+    except Exception:
+        pass
+
+    # parse_sourcemap
+    obj = json.loads(text)
+    sources = obj.get("sources") or []
+    sources_content = obj.get("sourcesContent") or []
+    if sources:
+        report["sourcemaps"].append({
+            "url": SOURCEMAP_URL,
+            "version": obj.get("version"),
+            "file": obj.get("file"),
+            "source_count": len(sources),
+            "sources_sample": sources[:80],
+            "has_sources_content": bool(sources_content),
+            "sources_content_count": len(sources_content),
+        })
+    for index, content in enumerate(sources_content):
+        if isinstance(content, str):
+            name = sources[index] if index < len(sources) else f"sourcesContent[{index}]"
+            mapper.scan_text(f"{SOURCEMAP_URL} :: {name}", content, report)
+
+    # reconstruct_sourcemap_sources
+    obj = json.loads(text)
+    sources = obj.get("sources") or []
+    extracted = []
+    for index, content in enumerate(obj.get("sourcesContent") or []):
+        if not isinstance(content, str):
+            continue
+        original_name = sources[index] if index < len(sources) else f"sourcesContent_{index}.txt"
+        dest = out_sources / mapper.sanitize_source_path(original_name).lstrip("/")
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        if dest.exists():
+            h = hashlib.sha256((SOURCEMAP_URL + original_name).encode()).hexdigest()[:8]
+            dest = dest.with_name(dest.stem + f"__{h}" + dest.suffix)
+        dest.write_text(content, encoding="utf-8", errors="replace")
+        extracted.append({"source_name": original_name, "saved_path": str(dest)})
+    if extracted:
+        report["reconstructed_sources"].append({
+            "sourcemap": SOURCEMAP_URL,
+            "count": len(extracted),
+            "sample": extracted[:80],
+        })
+
+    return classification
+
+
+def streamed_handle(path, report, out_sources):
+    staging = Path(tempfile.mkdtemp(dir=out_sources.parent))
+    reader = mapper.SourcemapReader(SOURCEMAP_URL, staging)
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    for chunk in mapper.read_chunks(path):
+        reader.feed(decoder.decode(chunk))
+    sourcemap = reader.close()
+
+    classification = mapper.classify_response(SOURCEMAP_URL, "sourcemap_guess", 200, "", b"{", "utf-8", sourcemap)
+    if sourcemap is not None:
+        mapper.parse_sourcemap(SOURCEMAP_URL, sourcemap, report)
+        mapper.reconstruct_sourcemap_sources(SOURCEMAP_URL, sourcemap, report, out_sources)
+
+    shutil.rmtree(staging, ignore_errors=True)
+    return classification
+
+
+def empty_report():
+    return {"sourcemaps": [], "reconstructed_sources": [], **mapper.new_scan_report()}
+
+
+def run(handle, path, workdir, traced):
+    out_sources = workdir / "reconstructed_sources"
+    out_sources.mkdir(parents=True)
+    report = empty_report()
+
+    if traced:
+        tracemalloc.start()
+    started = time.process_time()
+    classification = handle(path, report, out_sources)
+    seconds = time.process_time() - started
+    peak = 0
+    if traced:
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    for group in report["reconstructed_sources"]:
+        for entry in group["sample"]:
+            entry["saved_path"] = str(Path(entry["saved_path"]).relative_to(out_sources))
+    files = {
+        str(file.relative_to(out_sources)): file.read_bytes()
+        for file in sorted(out_sources.rglob("*"))
+        if file.is_file()
+    }
+    return seconds, peak, (classification, report, files)
+
+
+def measure(handle, path, workdir, name):
+    # CPU is timed without tracemalloc, which slows allocation-heavy code.
+    seconds, _, result = run(handle, path, workdir / f"{name}-cpu", traced=False)
+    _, peak, _ = run(handle, path, workdir / f"{name}-mem", traced=True)
+    return seconds, peak, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark single-pass sourcemap reading against three json.loads passes")
+    parser.add_argument("--size", type=int, default=20_000_000, help="Approximate sourcesContent size in characters")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    workdir = Path(tempfile.mkdtemp(prefix="bench_sourcemap_"))
+    try:
+        path = workdir / "main.js.map"
+        path.write_text(synthetic_sourcemap(args.size, args.seed), encoding="utf-8")
+        print(f"Synthetic sourcemap: {path.stat().st_size:,} bytes")
+
+        legacy_seconds, legacy_peak, legacy_result = measure(legacy_handle, path, workdir, "legacy")
+        seconds, peak, result = measure(streamed_handle, path, workdir, "streamed")
+
+        print(f"    json.loads x3     {legacy_seconds:8.3f} s cpu   {legacy_peak / 1e6:8.1f} MB peak")
+        print(
+            f"    SourcemapReader   {seconds:8.3f} s cpu   {peak / 1e6:8.1f} MB peak"
+            f"   ({legacy_seconds / seconds:.1f}x cpu, {legacy_peak / peak:.1f}x memory)"
+        )
+        print(f"    findings {len(result[1]['findings'])}, reconstructed files {len(result[2])}")
+
+        if result != legacy_result:
+            raise SystemExit("[FAIL] SourcemapReader results differ from the json.loads handling")
+        print("    results identical")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -15,24 +15,46 @@ Purpose:
 Default run:
     python3 frontend_mapper_fatins_previews.py
 
+Fetches run on a small thread pool (--workers); each origin gets at most
+--per-origin requests in flight, started at least --delay seconds apart.
+Reports are identical to a serial crawl (--workers 1).
+
+Connections are kept alive and reused per origin. Validators of complete 200
+responses are kept in <out>/http_cache.json, so re-runs into the same output
+directory send If-None-Match / If-Modified-Since and reuse the saved copy on
+304 (--no-cache to disable).
+
+Bodies are streamed: each chunk is written to disk, hashed and fed to the
+secret/URL scanner as it arrives, so only a bounded window of a large bundle
+is held in memory. Sourcemaps are parsed in the same pass: their sourcesContent
+entries are scanned and reconstructed one at a time.
+
 Outputs:
     fatins_public_resource_check/report.md
     fatins_public_resource_check/report.json
     fatins_public_resource_check/files/
     fatins_public_resource_check/reconstructed_sources/
+    fatins_public_resource_check/http_cache.json
 """
 
 import argparse
+import codecs
 import hashlib
+import http.client
 import json
 import re
+import shutil
+import ssl
+import tempfile
+import threading
 import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
 from html.parser import HTMLParser
 from pathlib import Path
-from urllib.error import HTTPError, URLError
+from urllib.error import URLError
 from urllib.parse import urljoin, urlparse, urldefrag
-from urllib.request import Request, urlopen
 
 
 # =========================
@@ -46,6 +68,8 @@ DEFAULT_PROBE_COMMON = True
 DEFAULT_ALLOW_CROSS_ORIGIN_ASSETS = False
 DEFAULT_TIMEOUT_SECONDS = 12
 DEFAULT_DELAY_SECONDS = 0.15
+DEFAULT_WORKERS = 8
+DEFAULT_PER_ORIGIN_CONCURRENCY = 4
 DEFAULT_MAX_FILES = 180
 DEFAULT_MAX_BYTES_PER_FILE = 8_000_000
 DEFAULT_USER_AGENT = "authorized-passive-public-resource-verifier/1.0"
@@ -113,6 +137,61 @@ FIREBASE_KEYS = [
 ABS_URL_RE = re.compile(r"https?://[^\s'\"<>\\)]+")
 SOURCEMAP_RE = re.compile(r"sourceMappingURL=([^\s*]+)")
 
+# Lowercase literal anchors for the prefilter in scan_text. Every
+# match of a pattern starts with one of its anchors (case-insensitively),
+# except SUFFIX_ANCHORED ones, whose matches end with it.
+SECRET_ANCHORS = {
+    "critical_private_key": ["-----begin"],
+    "critical_google_service_account": ['"type"', 'client_email"'],
+    "critical_aws_access_key": ["akia", "asia"],
+    "critical_stripe_secret": ["sk_live_", "sk_test_"],
+    "critical_sendgrid_key": ["sg."],
+    "critical_slack_token": ["xox"],
+    "critical_github_token": ["ghp_", "gho_", "ghu_", "ghs_", "ghr_", "github_pat_"],
+    "critical_openai_like_key": ["sk-"],
+    "high_google_api_key": ["aiza"],
+    "high_jwt_token": ["eyj"],
+    "info_stripe_publishable": ["pk_live_", "pk_test_"],
+    "info_firebase_database": [".firebaseio.com"],
+}
+SUFFIX_ANCHORED = {"info_firebase_database": re.compile(r"[a-z0-9\-]", re.IGNORECASE)}
+
+SECRET_RES = [(name, severity, re.compile(pattern, re.IGNORECASE)) for name, severity, pattern in SECRET_PATTERNS]
+SECRET_RES_BY_NAME = {name: regex for name, _, regex in SECRET_RES}
+SCAN_RES = {"url": ABS_URL_RE, "sourcemap": SOURCEMAP_RE}
+FIREBASE_KEY_RES = {
+    key: re.compile(re.escape(key) + r'["\']?\s*:\s*["\']([^"\']+)["\']')
+    for key in FIREBASE_KEYS
+}
+
+
+def build_anchor_index():
+    targets = {}
+    for name, anchors in SECRET_ANCHORS.items():
+        for anchor in anchors:
+            targets.setdefault(anchor, []).append(("secret", name))
+    for key in FIREBASE_KEYS:
+        targets.setdefault(key.lower(), []).append(("firebase", key))
+    targets.setdefault("http", []).append(("url", None))
+    targets.setdefault("sourcemappingurl=", []).append(("sourcemap", None))
+    return targets
+
+
+ANCHOR_TARGETS = build_anchor_index()
+ANCHORS = list(ANCHOR_TARGETS)
+MAX_ANCHOR_LENGTH = max(len(anchor) for anchor in ANCHOR_TARGETS)
+
+# Lookahead kept by the streaming scanner: matches up to this many characters
+# are found exactly even when they cross chunk boundaries.
+SCAN_WINDOW_CHARS = 256 * 1024
+SCAN_BATCH_CHARS = 64 * 1024
+
+# Tokens for the incremental sourcemap reader.
+JSON_WS_RE = re.compile(r"[ \t\n\r]*")
+JSON_STRUCTURE_RE = re.compile(r'[^"\[\]{}]*')
+JSON_SCALAR_RE = re.compile(r"[^\s,\]}]*")
+SOURCEMAP_ARRAYS = ("sources", "sourcesContent")
+
 
 class AssetParser(HTMLParser):
     def __init__(self, base_url):
@@ -163,10 +242,6 @@ def redact(value):
     return value[:6] + "..." + value[-4:]
 
 
-def sha256_hex(data):
-    return hashlib.sha256(data).hexdigest()
-
-
 def looks_binary(data):
     if not data:
         return False
@@ -182,14 +257,21 @@ def decode_text(data):
     return data.decode("utf-8", errors="replace")
 
 
-def preview_lines(data, max_lines):
+def decode_head(head, encoding):
+    """
+    Decode the first bytes of a body; a character cut at the end is dropped.
+    """
+    return head.decode(encoding, errors="ignore") if encoding else decode_text(head)
+
+
+def preview_lines(data, max_lines, encoding=None):
     if not data:
         return []
 
     if looks_binary(data):
         return ["<binary content omitted>"]
 
-    text = decode_text(data)
+    text = decode_head(data, encoding)
     lines = text.splitlines()
 
     if not lines and text:
@@ -207,7 +289,12 @@ def should_fetch_asset(url):
     return not path.endswith(blocked_ext)
 
 
-def classify_response(url, reason, status, content_type, data):
+def classify_response(url, reason, status, content_type, data, encoding=None, sourcemap=None):
+    """
+    `data` may be just the first bytes of the body (decoded with `encoding`);
+    sourcemaps are classified from the SourcemapReader result `sourcemap`
+    (None when the body is not a JSON object).
+    """
     path = urlparse(url).path
 
     if status is None:
@@ -231,14 +318,14 @@ def classify_response(url, reason, status, content_type, data):
     if looks_binary(data):
         return "readable_binary"
 
-    text = decode_text(data).lstrip().lower()
+    start = decode_head(data, encoding).lstrip().lower()[:300]
     content_type = (content_type or "").lower()
 
     # Firebase/SPA hosting often returns index.html for unknown paths with 200.
     # This is not proof that the requested file exists.
     if reason == "probe" and (
-        "<!doctype html" in text[:300]
-        or "<html" in text[:300]
+        "<!doctype html" in start
+        or "<html" in start
     ):
         suspicious_file_ext = Path(path).suffix.lower()
         if suspicious_file_ext not in [".html", ".htm", ""]:
@@ -246,89 +333,510 @@ def classify_response(url, reason, status, content_type, data):
         return "readable_html"
 
     if path.endswith(".map") or reason.startswith("sourcemap"):
-        try:
-            obj = json.loads(decode_text(data))
-            if isinstance(obj, dict) and obj.get("version") and obj.get("sources") is not None:
-                if obj.get("sourcesContent"):
-                    return "readable_sourcemap_with_sourcesContent"
-                return "readable_sourcemap_without_sourcesContent"
-        except Exception:
-            pass
+        if sourcemap is not None and sourcemap["version"] and sourcemap["sources"] is not None:
+            if sourcemap["has_sources_content"]:
+                return "readable_sourcemap_with_sourcesContent"
+            return "readable_sourcemap_without_sourcesContent"
         return "sourcemap_url_readable_but_not_valid_sourcemap"
 
     return "readable_text"
 
 
-def fetch(url, timeout, max_bytes, user_agent):
-    req = Request(url, headers={"User-Agent": user_agent})
+REDIRECT_STATUSES = (301, 302, 303, 307, 308)
+MAX_REDIRECTS = 5
+ERROR_BODY_BYTES = 65536
+READ_CHUNK_BYTES = 65536
+HEAD_BYTES = 65536
+
+
+class HTTPPool:
+    """
+    Keep-alive connections per (scheme, host, port), shared by the fetch workers.
+
+    A connection is checked out for one request and returned once its body has
+    been read to the end; connections that were cut short (--max-bytes) or that
+    the server wants closed are dropped instead.
+    """
+
+    def __init__(self, timeout):
+        self.timeout = timeout
+        self.lock = threading.Lock()
+        self.idle = {}
+        self.ssl_context = ssl.create_default_context()
+
+    def _connect(self, key):
+        scheme, host, port = key
+        if scheme == "https":
+            return http.client.HTTPSConnection(host, port, timeout=self.timeout, context=self.ssl_context)
+        return http.client.HTTPConnection(host, port, timeout=self.timeout)
+
+    def request(self, url, headers):
+        """
+        Send a GET and return (key, connection, response); the caller reads the
+        body and then calls release() or discard().
+        """
+        p = urlparse(url)
+        if p.scheme not in ("http", "https"):
+            raise URLError(f"unsupported scheme: {p.scheme}")
+
+        key = (p.scheme, p.hostname, p.port)
+        target = (p.path or "/") + ("?" + p.query if p.query else "")
+
+        with self.lock:
+            idle = self.idle.get(key)
+            conn = idle.pop() if idle else None
+
+        if conn is not None:
+            try:
+                conn.request("GET", target, headers=headers)
+                return key, conn, conn.getresponse()
+            except (http.client.HTTPException, OSError):
+                # The server closed an idle keep-alive connection; retry on a fresh one.
+                conn.close()
+
+        conn = self._connect(key)
+        try:
+            conn.request("GET", target, headers=headers)
+            return key, conn, conn.getresponse()
+        except Exception:
+            conn.close()
+            raise
+
+    def release(self, key, conn, resp):
+        if resp.will_close or not resp.isclosed():
+            conn.close()
+            return
+
+        with self.lock:
+            self.idle.setdefault(key, []).append(conn)
+
+    def discard(self, conn):
+        conn.close()
+
+    def close(self):
+        with self.lock:
+            for conns in self.idle.values():
+                for conn in conns:
+                    conn.close()
+            self.idle.clear()
+
+
+class ResponseCache:
+    """
+    On-disk validators for conditional requests, keyed by URL.
+
+    Each entry keeps the ETag / Last-Modified of a complete 200 response, its
+    headers, and the path and SHA-256 of the saved body. A 304 is only trusted
+    while the saved file still hashes to the recorded SHA-256.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.entries = {}
+        self.updated = {}
+
+        if path and path.exists():
+            try:
+                self.entries = json.loads(path.read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                self.entries = {}
+
+    def get(self, url):
+        entry = self.entries.get(url)
+        if not entry or not entry.get("saved_path") or not Path(entry["saved_path"]).exists():
+            return None
+        return entry
+
+    def verify(self, entry):
+        digest = hashlib.sha256()
+        try:
+            for chunk in read_chunks(entry["saved_path"]):
+                digest.update(chunk)
+        except OSError:
+            return False
+        return digest.hexdigest() == entry.get("sha256")
+
+    def store(self, item):
+        headers = {k.lower(): v for k, v in item["headers"].items()}
+        etag = headers.get("etag")
+        last_modified = headers.get("last-modified")
+        body = item["body"]
+
+        if item["status"] != 200 or item["truncated"] or not body["saved_path"] or not (etag or last_modified):
+            return
+
+        self.updated[item["url"]] = {
+            "etag": etag,
+            "last_modified": last_modified,
+            "status": item["status"],
+            "headers": item["headers"],
+            "sha256": body["sha256"],
+            "size": body["size"],
+            "saved_path": body["saved_path"],
+        }
+
+    def save(self):
+        if not self.path:
+            return
+
+        self.entries.update(self.updated)
+        tmp = self.path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(self.entries, indent=2, sort_keys=True), encoding="utf-8")
+        tmp.replace(self.path)
+
+
+def read_chunks(path, size=READ_CHUNK_BYTES):
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(size)
+            if not chunk:
+                break
+            yield chunk
+
+
+class BodyPipeline:
+    """
+    Consumes one response body chunk by chunk.
+
+    Chunks are written to `path` and hashed as they arrive, and the first
+    HEAD_BYTES are kept for classification and previews. The readable text of
+    a 2xx response is decoded incrementally and fed to a TextScanner (and to
+    an AssetParser for HTML, or a SourcemapReader for sourcemaps), so memory
+    per file is bounded by HEAD_BYTES and the scanner window instead of
+    --max-bytes.
+
+    Like decode_text, the body is read as UTF-8 when all of it is valid UTF-8
+    and as Latin-1 otherwise; when that only shows up part-way through, the
+    text is rescanned from the saved file.
+    """
+
+    def __init__(self, url, path=None, scan=False, parse_html=False, sourcemap=False, staging=None):
+        self.url = url
+        self.path = path
+        self.source = path
+        self.file = None
+        self.digest = hashlib.sha256()
+        self.size = 0
+        self.head = bytearray()
+
+        self.scan = scan
+        self.parse_html = parse_html
+        self.read_sourcemap = sourcemap
+        self.staging = staging
+        self.started = False
+        self.undecided = b""
+        self.encoding = "utf-8"
+        self.decoder = codecs.getincrementaldecoder("utf-8")()
+        self.partial = None
+        self.scanner = None
+        self.html_parser = None
+        self.html_failed = False
+        self.sourcemap = None
+
+    def write(self, chunk):
+        if not chunk:
+            return
+
+        if self.path is not None:
+            if self.file is None:
+                self.file = open(self.path, "wb")
+            self.file.write(chunk)
+
+        self.digest.update(chunk)
+        self.size += len(chunk)
+        if len(self.head) < HEAD_BYTES:
+            self.head += chunk[:HEAD_BYTES - len(self.head)]
+
+        if not self.scan:
+            return
+
+        if not self.started:
+            # looks_binary() inspects the first 2048 bytes.
+            self.undecided += chunk
+            if len(self.undecided) >= 2048:
+                self._start()
+            return
+
+        self._decode(chunk)
+
+    def consume_file(self, path):
+        self.source = path
+        for chunk in read_chunks(path):
+            self.write(chunk)
+
+    def _start(self):
+        data, self.undecided = self.undecided, b""
+        if looks_binary(data):
+            self.scan = False
+            return
+
+        self.started = True
+        self._reset_consumers()
+        self._decode(data)
+
+    def _reset_consumers(self):
+        self.partial = new_scan_report()
+        self.scanner = TextScanner(self.url, self.partial)
+        self.html_parser = AssetParser(self.url) if self.parse_html else None
+        self.html_failed = False
+
+        if self.sourcemap is not None:
+            self.sourcemap.discard()
+        self.sourcemap = SourcemapReader(self.url, self.staging) if self.read_sourcemap else None
+
+    def _decode(self, data, final=False):
+        if self.encoding != "utf-8":
+            return
+
+        try:
+            text = self.decoder.decode(data, final)
+        except UnicodeDecodeError:
+            self.encoding = "latin-1"
+            return
+
+        self._consume(text)
+
+    def _consume(self, text):
+        self.scanner.feed(text)
+
+        if self.html_parser is not None and not self.html_failed:
+            try:
+                self.html_parser.feed(text)
+            except Exception:
+                # Keep the assets found so far, as a failed feed() of the whole page did.
+                self.html_failed = True
+
+        if self.sourcemap is not None:
+            self.sourcemap.feed(text)
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+
+        if self.scan and not self.started and self.undecided:
+            self._start()
+
+        if self.started:
+            self._decode(b"", final=True)
+
+            if self.encoding != "utf-8":
+                self._reset_consumers()
+                for chunk in read_chunks(self.source):
+                    self._consume(chunk.decode("latin-1"))
+
+            self.scanner.close()
+
+        return {
+            "saved_path": str(self.source) if self.size and self.source else None,
+            "size": self.size,
+            "sha256": self.digest.hexdigest() if self.size else None,
+            "head": bytes(self.head),
+            "encoding": self.encoding,
+            "scan": self.partial if self.started else None,
+            "assets": self.html_parser.assets if self.started and self.html_parser is not None else None,
+            "sourcemap": self.sourcemap.close() if self.started and self.sourcemap is not None else None,
+        }
+
+    def abort(self):
+        if self.file is not None:
+            self.file.close()
+        if self.sourcemap is not None:
+            self.sourcemap.discard()
+
+
+EMPTY_BODY = {
+    "saved_path": None,
+    "size": 0,
+    "sha256": None,
+    "head": b"",
+    "encoding": "utf-8",
+    "scan": None,
+    "assets": None,
+    "sourcemap": None,
+}
+
+
+def fetch(url, pool, max_bytes, user_agent, open_body, cache=None):
+    """
+    GET `url` and stream its body into open_body(status, headers[, save]).
+    """
+    entry = cache.get(url) if cache else None
+    headers = {"User-Agent": user_agent, "Accept-Encoding": "identity"}
+
+    if entry:
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+
+    current = url
+    body = None
     try:
-        with urlopen(req, timeout=timeout) as resp:
-            status = getattr(resp, "status", 200)
-            headers = dict(resp.headers)
-            chunks = []
-            total = 0
-            truncated = False
-
-            while True:
-                chunk = resp.read(65536)
-                if not chunk:
-                    break
-
-                total += len(chunk)
-
-                if total > max_bytes:
-                    truncated = True
-                    already = sum(len(c) for c in chunks)
-                    remaining = max_bytes - already
-                    if remaining > 0:
-                        chunks.append(chunk[:remaining])
-                    break
-
-                chunks.append(chunk)
+        for _ in range(MAX_REDIRECTS + 1):
+            key, conn, resp = pool.request(current, headers)
+            location = resp.getheader("Location")
+
+            if resp.status in REDIRECT_STATUSES and location:
+                resp.read()
+                pool.release(key, conn, resp)
+                current = resolve(current, location)
+                continue
+
+            break
+        else:
+            pool.discard(conn)
+            return fetch_error(url, f"too many redirects (> {MAX_REDIRECTS})")
+
+        if resp.status == 304 and entry:
+            resp.read()
+            pool.release(key, conn, resp)
+
+            if not cache.verify(entry):
+                # Saved copy vanished or changed: fetch the body unconditionally.
+                return fetch(url, pool, max_bytes, user_agent, open_body)
+
+            body = open_body(entry["status"], entry["headers"], save=False)
+            body.consume_file(entry["saved_path"])
 
             return {
                 "url": url,
-                "status": status,
-                "headers": headers,
-                "data": b"".join(chunks),
-                "truncated": truncated,
+                "status": entry["status"],
+                "headers": entry["headers"],
+                "body": body.close(),
+                "truncated": False,
+                "not_modified": True,
                 "error": None,
             }
 
-    except HTTPError as e:
-        body = b""
-        try:
-            body = e.read(65536)
-        except Exception:
-            pass
+        status = resp.status
+        response_headers = dict(resp.headers)
+        body = open_body(status, response_headers)
 
-        return {
-            "url": url,
-            "status": e.code,
-            "headers": dict(e.headers),
-            "data": body,
-            "truncated": False,
-            "error": str(e),
-        }
+        if not (200 <= status < 300):
+            body.write(resp.read(ERROR_BODY_BYTES))
+            if resp.isclosed():
+                pool.release(key, conn, resp)
+            else:
+                pool.discard(conn)
+
+            return {
+                "url": url,
+                "status": status,
+                "headers": response_headers,
+                "body": body.close(),
+                "truncated": False,
+                "not_modified": False,
+                "error": f"HTTP Error {status}: {resp.reason}",
+            }
+
+        total = 0
+        truncated = False
+
+        while True:
+            chunk = resp.read(READ_CHUNK_BYTES)
+            if not chunk:
+                break
+
+            if total + len(chunk) > max_bytes:
+                truncated = True
+                body.write(chunk[:max_bytes - total])
+                break
+
+            total += len(chunk)
+            body.write(chunk)
+
+        if truncated:
+            pool.discard(conn)
+        else:
+            pool.release(key, conn, resp)
 
-    except URLError as e:
         return {
             "url": url,
-            "status": None,
-            "headers": {},
-            "data": b"",
-            "truncated": False,
-            "error": str(e),
+            "status": status,
+            "headers": response_headers,
+            "body": body.close(),
+            "truncated": truncated,
+            "not_modified": False,
+            "error": None,
         }
 
+    except (http.client.HTTPException, OSError, URLError) as e:
+        if body is not None:
+            body.abort()
+        return fetch_error(url, str(e))
+
+
+def fetch_error(url, error):
+    return {
+        "url": url,
+        "status": None,
+        "headers": {},
+        "body": EMPTY_BODY,
+        "truncated": False,
+        "not_modified": False,
+        "error": error,
+    }
 
-def save_response(out_files, item):
-    if not item["data"]:
-        return None
 
-    path = out_files / safe_name(item["url"])
-    path.write_bytes(item["data"])
-    return str(path)
+class OriginLimiter:
+    """
+    Politeness limiter shared by the fetch workers.
+
+    Per origin: at most `concurrency` requests in flight, and request starts
+    spaced at least `delay` seconds apart. Different origins do not wait on
+    each other.
+    """
+
+    def __init__(self, delay, concurrency):
+        self.delay = max(0.0, delay)
+        self.concurrency = max(1, concurrency)
+        self.lock = threading.Lock()
+        self.slots = {}
+        self.next_start = {}
+
+    def _slot(self, key):
+        with self.lock:
+            if key not in self.slots:
+                self.slots[key] = threading.Semaphore(self.concurrency)
+            return self.slots[key]
+
+    def acquire(self, url):
+        key = origin(url)
+        self._slot(key).acquire()
+
+        with self.lock:
+            now = time.monotonic()
+            start = max(now, self.next_start.get(key, now))
+            self.next_start[key] = start + self.delay
+
+        if start > now:
+            time.sleep(start - now)
+
+    def release(self, url):
+        self._slot(origin(url)).release()
+
+
+def is_sourcemap_url(url, reason):
+    return urlparse(url).path.lower().endswith(".map") or reason.startswith("sourcemap")
+
+
+def fetch_and_save(url, reason, limiter, pool, cache, out_files, staging, args):
+    def open_body(status, headers, save=True):
+        content_type = headers.get("Content-Type", "")
+        return BodyPipeline(
+            url,
+            out_files / safe_name(url) if save else None,
+            scan=200 <= status < 300,
+            parse_html=reason == "root" or "text/html" in content_type,
+            sourcemap=is_sourcemap_url(url, reason),
+            staging=staging,
+        )
+
+    limiter.acquire(url)
+    try:
+        return fetch(url, pool, args.max_bytes, args.user_agent, open_body, cache)
+    finally:
+        limiter.release(url)
 
 
 def sanitize_source_path(source_name):
@@ -368,103 +876,593 @@ def sanitize_source_path(source_name):
     return clean[:240]
 
 
-def scan_text(source_url, text, report):
-    for name, severity, pattern in SECRET_PATTERNS:
-        for match in re.finditer(pattern, text, flags=re.IGNORECASE):
-            value = match.group(0)
-            line = text.count("\n", 0, match.start()) + 1
-
-            finding = {
-                "source": source_url,
-                "name": name,
-                "severity": severity,
-                "line": line,
-                "match_redacted": redact(value),
-            }
+def fold_case(text):
+    """
+    Lowercase copy of `text` with the same length, for the anchor prefilter.
+    Also folds the non-ASCII characters that re.IGNORECASE matches to ASCII
+    letters (Kelvin sign, long s, dotted/dotless i).
+    """
+    if text.isascii():
+        return text.lower()
+    return text.replace("İ", "i").lower().replace("ſ", "s").replace("ı", "i")
 
-            dedupe_key = json.dumps(finding, sort_keys=True)
-            if dedupe_key not in report["_seen_findings"]:
-                report["_seen_findings"].add(dedupe_key)
-                report["findings"].append(finding)
 
-    firebase_config = {}
-    for key in FIREBASE_KEYS:
-        rgx = r'["\']?' + re.escape(key) + r'["\']?\s*:\s*["\']([^"\']+)["\']'
-        match = re.search(rgx, text)
-        if match:
-            value = match.group(1)
-            firebase_config[key] = redact(value) if key == "apiKey" else value
-
-    if firebase_config:
-        report["firebase_configs"].append({
-            "source": source_url,
-            "config": firebase_config,
-        })
+def new_scan_report():
+    return {
+        "findings": [],
+        "firebase_configs": [],
+        "sourcemap_hints": {},
+        "absolute_urls": {},
+        "_seen_findings": set(),
+    }
 
-    for match in ABS_URL_RE.finditer(text):
-        url = match.group(0).rstrip(".,);]'\"")
-        if len(url) <= 300:
-            report["absolute_urls"].setdefault(url, set()).add(source_url)
 
-    for match in SOURCEMAP_RE.finditer(text):
-        sourcemap = match.group(1).strip().strip("'\"")
-        if sourcemap and not sourcemap.startswith("data:"):
-            report["sourcemap_hints"].setdefault(resolve(source_url, sourcemap), set()).add(source_url)
+def merge_scan_report(report, partial):
+    """
+    Add a per-file scan result to the crawl report, in the order scan_text
+    would have added it.
+    """
+    for finding in partial["findings"]:
+        dedupe_key = json.dumps(finding, sort_keys=True)
+        if dedupe_key not in report["_seen_findings"]:
+            report["_seen_findings"].add(dedupe_key)
+            report["findings"].append(finding)
 
+    report["firebase_configs"].extend(partial["firebase_configs"])
 
-def parse_sourcemap(source_url, text, report):
-    try:
-        obj = json.loads(text)
-    except Exception:
-        return
+    for key in ["absolute_urls", "sourcemap_hints"]:
+        for value, sources in partial[key].items():
+            report[key].setdefault(value, set()).update(sources)
+
+
+class TextScanner:
+    """
+    Incremental scan_text: feed() decoded text in chunks, then close().
+
+    The case-folded text is searched for every literal anchor (AKIA, sk_,
+    AIza, http, sourceMappingURL=, config keys, ...); the full patterns are
+    only tried at those offsets, in text order, keeping finditer's
+    non-overlapping semantics per pattern.
+
+    An anchor is resolved once `window` characters follow it (or at close),
+    and text more than `window` characters behind the oldest unresolved anchor
+    is dropped, so memory is bounded by the window and matches shorter than
+    it are found exactly as in a scan of the whole text, across chunk
+    boundaries included.
+    """
+
+    def __init__(self, source_url, report, window=SCAN_WINDOW_CHARS):
+        self.source_url = source_url
+        self.report = report
+        self.window = window
+
+        self.unscanned = []
+        self.unscanned_size = 0
+        self.buffer = ""
+        self.folded = ""
+        self.base = 0
+        self.lines_before = 0
+        self.line_at = 0
+        self.line_number = 1
+
+        self.anchor_from = 0
+        self.pending = deque()
+        self.last_end = {}
+        self.matches = {name: [] for name, _, _ in SECRET_RES}
+        self.firebase_config = {}
+
+    def feed(self, text):
+        if text:
+            self.unscanned.append(text)
+            self.unscanned_size += len(text)
+            if self.unscanned_size >= SCAN_BATCH_CHARS:
+                self._scan(final=False)
+
+    def close(self):
+        self._scan(final=True)
+        self._emit()
+
+    # -------------------------------------------------------------------------
+
+    def _scan(self, final):
+        # Small feeds are batched so the buffer is not copied for every chunk.
+        text = "".join(self.unscanned)
+        self.unscanned = []
+        self.unscanned_size = 0
+        self.buffer += text
+        self.folded += fold_case(text)
+
+        end = self.base + len(self.buffer)
+
+        # 1. Anchors; one that may still be cut off at the end waits for more text.
+        limit = end if final else end - MAX_ANCHOR_LENGTH + 1
+        find = self.folded.find
+        pos = self.anchor_from - self.base
+        stop = limit - self.base
+
+        # str.find per anchor beats one alternation regex: the anchors start
+        # with common letters, which the regex has to try at almost every
+        # offset (base64 sourcemap mappings especially).
+        found = []
+        for rank, anchor in enumerate(ANCHORS):
+            start = find(anchor, pos)
+            while 0 <= start < stop:
+                found.append((start, rank))
+                start = find(anchor, start + 1)
+        found.sort()
+
+        for start, rank in found:
+            for target in ANCHOR_TARGETS[ANCHORS[rank]]:
+                self.pending.append((start + self.base, target))
+
+        self.anchor_from = max(self.anchor_from, min(limit, end))
+
+        # 2. Anchors with enough lookahead, in text order.
+        while self.pending and (final or self.pending[0][0] + self.window <= end):
+            position, target = self.pending.popleft()
+            self._resolve(position, target)
+
+        # 3. Drop text nothing can refer to any more.
+        oldest = self.pending[0][0] if self.pending else self.anchor_from
+        keep_from = max(self.base, min(oldest, self.anchor_from) - self.window)
+        if keep_from > self.base:
+            cut = keep_from - self.base
+            self.lines_before += self.buffer.count("\n", 0, cut)
+            self.buffer = self.buffer[cut:]
+            self.folded = self.folded[cut:]
+            self.base = keep_from
+
+    def _line(self, position):
+        # Matches come roughly in text order: count newlines from the last one.
+        if self.line_at < self.base:
+            self.line_at = self.base
+            self.line_number = self.lines_before + 1
+
+        at = self.line_at - self.base
+        offset = position - self.base
+        if offset >= at:
+            self.line_number += self.buffer.count("\n", at, offset)
+        else:
+            self.line_number -= self.buffer.count("\n", offset, at)
+        self.line_at = position
+        return self.line_number
+
+    def _resolve(self, position, target):
+        kind, name = target
+        if position < self.last_end.get(target, 0):
+            return
 
-    if not isinstance(obj, dict):
-        return
+        if kind == "firebase":
+            if name not in self.firebase_config:
+                match = FIREBASE_KEY_RES[name].match(self.buffer, position - self.base)
+                if match:
+                    self.firebase_config[name] = match.group(1)
+            return
 
-    sources = obj.get("sources") or []
-    sources_content = obj.get("sourcesContent") or []
+        if kind == "secret" and name in SUFFIX_ANCHORED:
+            # <charset>+<anchor>: walk back to where the run starts.
+            charset = SUFFIX_ANCHORED[name]
+            floor = max(self.last_end.get(target, 0), self.base)
+            start = position
+            while start > floor and charset.match(self.buffer, start - 1 - self.base):
+                start -= 1
+            candidates = range(start, position)
+        else:
+            candidates = (position,)
+
+        regex = SECRET_RES_BY_NAME[name] if kind == "secret" else SCAN_RES[kind]
+        for candidate in candidates:
+            match = regex.match(self.buffer, candidate - self.base)
+            if match:
+                break
+        else:
+            return
 
-    if sources:
-        report["sourcemaps"].append({
-            "url": source_url,
-            "version": obj.get("version"),
-            "file": obj.get("file"),
-            "source_count": len(sources),
-            "sources_sample": sources[:80],
-            "has_sources_content": bool(sources_content),
-            "sources_content_count": len(sources_content),
-        })
+        match_start = match.start() + self.base
+        self.last_end[target] = max(match.end() + self.base, match_start + 1)
+
+        if kind == "secret":
+            self.matches[name].append((self._line(match_start), match.group(0)))
+
+        elif kind == "url":
+            url = match.group(0).rstrip(".,);]'\"")
+            if len(url) <= 300:
+                self.report["absolute_urls"].setdefault(url, set()).add(self.source_url)
+
+        elif kind == "sourcemap":
+            sourcemap = match.group(1).strip().strip("'\"")
+            if sourcemap and not sourcemap.startswith("data:"):
+                self.report["sourcemap_hints"].setdefault(resolve(self.source_url, sourcemap), set()).add(self.source_url)
+
+    def _emit(self):
+        for name, severity, _ in SECRET_RES:
+            for line, value in self.matches[name]:
+                finding = {
+                    "source": self.source_url,
+                    "name": name,
+                    "severity": severity,
+                    "line": line,
+                    "match_redacted": redact(value),
+                }
+
+                dedupe_key = json.dumps(finding, sort_keys=True)
+                if dedupe_key not in self.report["_seen_findings"]:
+                    self.report["_seen_findings"].add(dedupe_key)
+                    self.report["findings"].append(finding)
+
+        firebase_config = {}
+        for key in FIREBASE_KEYS:
+            if key in self.firebase_config:
+                value = self.firebase_config[key]
+                firebase_config[key] = redact(value) if key == "apiKey" else value
+
+        if firebase_config:
+            self.report["firebase_configs"].append({
+                "source": self.source_url,
+                "config": firebase_config,
+            })
+
+
+def scan_text(source_url, text, report):
+    scanner = TextScanner(source_url, report)
+    scanner.feed(text)
+    scanner.close()
+
+
+class JSONValueReader:
+    """
+    Finds the end of one JSON value in text fed piece by piece.
+
+    Strings are only kept when `keep` is set; skipped ones are still checked
+    piece by piece with json's scanstring. Arrays, objects and literals are
+    always kept and decoded, so the value is validated as json.loads would.
+    """
+
+    def __init__(self, keep):
+        self.keep = keep
+        self.pieces = []
+        self.started = False
+        self.scalar = False
+        self.in_string = False
+        self.depth = 0
+        self.tail = ""
+        self.value = None
+
+    def feed(self, text, pos):
+        """
+        Consume text[pos:]; return where the value ends, or None if it goes on.
+        """
+        offset = 0
+        if self.tail:
+            # An escape sequence cut off at the end of the previous piece.
+            offset = pos - len(self.tail)
+            text = self.tail + text[pos:]
+            pos = 0
+            self.tail = ""
+
+        start = pos
+        n = len(text)
+
+        if not self.started:
+            self.started = True
+            char = text[pos]
+            if char == '"':
+                self.in_string = True
+                pos += 1
+            elif char in "[{":
+                self.keep = True
+                self.depth = 1
+                pos += 1
+            else:
+                self.keep = True
+                self.scalar = True
+
+        string_start = pos
+
+        while True:
+            if self.scalar:
+                pos = JSON_SCALAR_RE.match(text, pos).end()
+                if pos == n:
+                    return self._more(text, start, n)
+                return self._done(text, start, pos) + offset
+
+            if self.in_string:
+                quote = text.find('"', pos)
+                if quote < 0:
+                    return self._more(text, start, n - len(self._escape_tail(text, string_start)), string_start)
+
+                backslash = quote
+                while backslash > string_start and text[backslash - 1] == "\\":
+                    backslash -= 1
+                pos = quote + 1
+                if (quote - backslash) % 2:
+                    continue
+
+                self.in_string = False
+                if not self.keep:
+                    check_json_string(text, string_start, quote)
+                if not self.depth:
+                    return self._done(text, start, pos) + offset
+                continue
+
+            pos = JSON_STRUCTURE_RE.match(text, pos).end()
+            if pos == n:
+                return self._more(text, start, n)
+
+            char = text[pos]
+            pos += 1
+            if char == '"':
+                self.in_string = True
+                string_start = pos
+            elif char in "[{":
+                self.depth += 1
+            else:
+                self.depth -= 1
+                if not self.depth:
+                    return self._done(text, start, pos) + offset
+
+    def _escape_tail(self, text, string_start):
+        # An odd run of backslashes near the end starts an escape that may
+        # continue in the next piece (up to 6 characters, as in \u00e9).
+        backslash = text.rfind("\\", max(string_start, len(text) - 5))
+        if backslash < 0:
+            return ""
+        first = backslash
+        while first > string_start and text[first - 1] == "\\":
+            first -= 1
+        if (backslash - first) % 2:
+            return ""
+        self.tail = text[backslash:]
+        return self.tail
+
+    def _more(self, text, start, end, string_start=None):
+        if self.keep:
+            self.pieces.append(text[start:end])
+        elif string_start is not None:
+            check_json_string(text, string_start, end)
+        return None
+
+    def _done(self, text, start, end):
+        if self.keep:
+            self.pieces.append(text[start:end])
+            self.value = json.loads("".join(self.pieces))
+            self.pieces = []
+        return end
+
+
+def check_json_string(text, start, end):
+    """
+    Raise ValueError unless text[start:end] is valid inside a JSON string.
+    """
+    if start < end:
+        json.decoder.scanstring('"' + text[start:end] + '"', 1)
+
+
+class SourcemapReader:
+    """
+    Single-pass sourcemap parser, fed decoded text in chunks.
+
+    The top-level object is walked key by key. `sources` and `sourcesContent`
+    arrays are read one entry at a time: every sourcesContent string is
+    scanned (as parse_sourcemap did) and written to `staging` for
+    reconstruct_sourcemap_sources as soon as it is decoded, and then dropped.
+    Other values are validated and only `version` and `file` are kept, so
+    memory is bounded by the largest single entry instead of the whole map.
+
+    Entries that arrive before `sources` wait for it, since their names come
+    from there. close() returns None when the text is not a JSON object.
+    """
+
+    def __init__(self, url, staging=None):
+        self.url = url
+        self.staging_root = staging
+        self.staging = None
+
+        self.state = "start"
+        self.key = None
+        self.value = None
+        self.index = 0
+        self.names = None
+        self.failed = False
+
+        self.version = None
+        self.file = None
+        self.sources = None
+        self.sources_content = None
+        self.content_count = 0
+        self.deferred = []
+        self.report = new_scan_report()
+        self.extracted = []
+
+    def feed(self, text):
+        if self.failed or not text:
+            return
+
+        try:
+            self._parse(text)
+        except (ValueError, RecursionError):
+            self.failed = True
+            self.discard()
+
+    def close(self):
+        if not self.failed and (self.state != "done" or self.value is not None):
+            self.failed = True
+        if self.failed:
+            self.discard()
+            return None
 
-    for index, content in enumerate(sources_content):
+        self._sources_done()
+
+        return {
+            "version": self.version,
+            "file": self.file,
+            "sources": self.sources,
+            "has_sources_content": bool(self.sources_content),
+            "sources_content_count": self.content_count,
+            "scan": self.report,
+            "extracted": self.extracted,
+        }
+
+    def discard(self):
+        if self.staging is not None:
+            shutil.rmtree(self.staging, ignore_errors=True)
+            self.staging = None
+        self.deferred = []
+        self.extracted = []
+
+    # -------------------------------------------------------------------------
+
+    def _parse(self, text):
+        pos = 0
+        n = len(text)
+
+        while True:
+            if self.value is not None:
+                end = self.value.feed(text, pos)
+                if end is None:
+                    return
+                pos = end
+                self._value(self.value.value)
+                self.value = None
+
+            pos = JSON_WS_RE.match(text, pos).end()
+            if pos == n:
+                return
+
+            char = text[pos]
+            state = self.state
+
+            if state == "start" and char == "{":
+                self.state = "first_key"
+            elif state in ("first_key", "key") and char == '"':
+                self.value = JSONValueReader(keep=True)
+                continue
+            elif state == "first_key" and char == "}":
+                self.state = "done"
+            elif state == "colon" and char == ":":
+                self.state = "value"
+            elif state == "value":
+                if self.key in SOURCEMAP_ARRAYS and char == "[":
+                    self.state = "first_entry"
+                    self.index = 0
+                    if self.key == "sources":
+                        self.names = []
+                    else:
+                        self.sources_content = False
+                        self.content_count = 0
+                else:
+                    self.value = JSONValueReader(keep=self.key in ("version", "file", *SOURCEMAP_ARRAYS))
+                    continue
+            elif state == "first_entry" and char == "]":
+                self._array_done()
+            elif state in ("first_entry", "entry"):
+                self.value = JSONValueReader(keep=True)
+                continue
+            elif state == "after_entry" and char in ",]":
+                if char == ",":
+                    self.state = "entry"
+                else:
+                    self._array_done()
+            elif state == "after_value" and char in ",}":
+                self.state = "key" if char == "," else "done"
+            else:
+                raise ValueError(f"unexpected {char!r} in sourcemap ({state})")
+
+            pos += 1
+
+    def _value(self, value):
+        if self.state in ("first_key", "key"):
+            if not isinstance(value, str):
+                raise ValueError("object key is not a string")
+            self.key = value
+            self.state = "colon"
+            return
+
+        if self.state in ("first_entry", "entry"):
+            if self.key == "sources":
+                self.names.append(value)
+            else:
+                self._content(self.index, value)
+            self.index += 1
+            self.state = "after_entry"
+            return
+
+        if self.key == "version":
+            self.version = value
+        elif self.key == "file":
+            self.file = value
+        elif self.key == "sources":
+            # Not an array: nothing to name entries by.
+            self.sources = None if value is None else []
+            self._sources_done()
+        elif self.key == "sourcesContent":
+            self.sources_content = bool(value)
+            self.content_count = 0
+        self.state = "after_value"
+
+    def _array_done(self):
+        if self.key == "sources":
+            self.sources = self.names
+            self.names = None
+            self._sources_done()
+        self.state = "after_value"
+
+    def _content(self, index, content):
+        self.sources_content = True
+        self.content_count += 1
         if not isinstance(content, str):
-            continue
+            return
 
+        if self.names is not None or self.sources is None:
+            self.deferred.append((index, content))
+            return
+
+        self._use(index, content)
+
+    def _sources_done(self):
+        deferred, self.deferred = self.deferred, []
+        for index, content in deferred:
+            self._use(index, content)
+
+    def _use(self, index, content):
+        sources = self.sources or []
         name = sources[index] if index < len(sources) else f"sourcesContent[{index}]"
-        virtual_source = f"{source_url} :: {name}"
-        scan_text(virtual_source, content, report)
+        scan_text(f"{self.url} :: {name}", content, self.report)
 
+        if sources and self.staging_root is not None:
+            if self.staging is None:
+                self.staging = Path(tempfile.mkdtemp(dir=self.staging_root))
+            staged = self.staging / str(index)
+            staged.write_text(content, encoding="utf-8", errors="replace")
+            self.extracted.append((index, staged))
 
-def reconstruct_sourcemap_sources(source_url, text, report, out_sources):
-    try:
-        obj = json.loads(text)
-    except Exception:
-        return
 
-    if not isinstance(obj, dict):
-        return
+def parse_sourcemap(source_url, sourcemap, report):
+    sources = sourcemap["sources"] or []
 
-    sources = obj.get("sources") or []
-    sources_content = obj.get("sourcesContent") or []
+    if sources:
+        report["sourcemaps"].append({
+            "url": source_url,
+            "version": sourcemap["version"],
+            "file": sourcemap["file"],
+            "source_count": len(sources),
+            "sources_sample": sources[:80],
+            "has_sources_content": sourcemap["has_sources_content"],
+            "sources_content_count": sourcemap["sources_content_count"],
+        })
 
-    if not sources or not sources_content:
-        return
+    merge_scan_report(report, sourcemap["scan"])
 
-    extracted = []
 
-    for index, content in enumerate(sources_content):
-        if not isinstance(content, str):
-            continue
+def reconstruct_sourcemap_sources(source_url, sourcemap, report, out_sources):
+    """
+    Move the sourcesContent entries staged by SourcemapReader into place.
+    Runs in crawl order, so names that collide are suffixed deterministically.
+    """
+    sources = sourcemap["sources"] or []
+    extracted = []
 
+    for index, staged in sourcemap["extracted"]:
         original_name = sources[index] if index < len(sources) else f"sourcesContent_{index}.txt"
         clean_path = sanitize_source_path(original_name).lstrip("/")
         dest = out_sources / clean_path
@@ -474,7 +1472,7 @@ def reconstruct_sourcemap_sources(source_url, text, report, out_sources):
             h = hashlib.sha256((source_url + original_name).encode()).hexdigest()[:8]
             dest = dest.with_name(dest.stem + f"__{h}" + dest.suffix)
 
-        dest.write_text(content, encoding="utf-8", errors="replace")
+        staged.replace(dest)
 
         extracted.append({
             "source_name": original_name,
@@ -647,10 +1645,13 @@ def main():
     parser.add_argument("--allow-cross-origin-assets", action="store_true", default=DEFAULT_ALLOW_CROSS_ORIGIN_ASSETS)
     parser.add_argument("--no-guess-sourcemaps", action="store_true")
     parser.add_argument("--timeout", type=int, default=DEFAULT_TIMEOUT_SECONDS)
-    parser.add_argument("--delay", type=float, default=DEFAULT_DELAY_SECONDS)
+    parser.add_argument("--delay", type=float, default=DEFAULT_DELAY_SECONDS, help="Minimum seconds between request starts to the same origin")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="Concurrent fetches in total. 1 = serial")
+    parser.add_argument("--per-origin", type=int, default=DEFAULT_PER_ORIGIN_CONCURRENCY, help="Concurrent fetches per origin")
     parser.add_argument("--max-files", type=int, default=DEFAULT_MAX_FILES)
     parser.add_argument("--max-bytes", type=int, default=DEFAULT_MAX_BYTES_PER_FILE)
     parser.add_argument("--user-agent", default=DEFAULT_USER_AGENT)
+    parser.add_argument("--no-cache", action="store_true", help="Ignore and do not update <out>/http_cache.json")
 
     args = parser.parse_args()
 
@@ -709,7 +1710,39 @@ def main():
         for probe_path in COMMON_PROBES:
             enqueue(resolve(target, probe_path), "probe")
 
+    # Fetches run ahead on the worker pool, but results are processed strictly in
+    # queue order, so the report is the same as a serial crawl. Only queue
+    # entries that a serial crawl is certain to reach (the first unseen URLs
+    # within the --max-files budget) are prefetched; later discoveries are only
+    # ever appended behind them.
+    limiter = OriginLimiter(args.delay, args.per_origin)
+    http_pool = HTTPPool(args.timeout)
+    cache = ResponseCache(None if args.no_cache else out / "http_cache.json")
+    pool = ThreadPoolExecutor(max_workers=max(1, args.workers))
+    pending = {}
+
+    # sourcesContent entries are written here while their sourcemap streams
+    # in, then moved into out_sources when the sourcemap is processed.
+    staging = Path(tempfile.mkdtemp(prefix=".sourcemap_staging_", dir=out))
+
+    def prefetch():
+        budget = args.max_files - len(seen)
+        counted = set()
+
+        for queued_url, queued_reason in queue:
+            if len(counted) >= budget:
+                break
+            if queued_url in seen or queued_url in counted:
+                continue
+
+            counted.add(queued_url)
+            if queued_url not in pending:
+                pending[queued_url] = pool.submit(
+                    fetch_and_save, queued_url, queued_reason, limiter, http_pool, cache, out_files, staging, args
+                )
+
     while queue and len(seen) < args.max_files:
+        prefetch()
         url, reason = queue.pop(0)
 
         if url in seen:
@@ -717,12 +1750,21 @@ def main():
 
         seen.add(url)
 
-        item = fetch(url, args.timeout, args.max_bytes, args.user_agent)
-        saved_path = save_response(out_files, item)
+        item = pending.pop(url).result()
+        body = item["body"]
+        saved_path = body["saved_path"]
+        cache.store(item)
 
         content_type = item["headers"].get("Content-Type", "")
-        data = item["data"]
-        classification = classify_response(url, reason, item["status"], content_type, data)
+        path_lower = urlparse(url).path.lower()
+        is_sourcemap = is_sourcemap_url(url, reason)
+
+        # body["scan"] is only set for non-empty, non-binary 2xx bodies.
+        readable = body["scan"] is not None
+
+        classification = classify_response(
+            url, reason, item["status"], content_type, body["head"], body["encoding"], body["sourcemap"]
+        )
 
         rec = {
             "url": url,
@@ -731,12 +1773,13 @@ def main():
             "status": item["status"],
             "classification": classification,
             "content_type": content_type,
-            "size": len(data),
-            "sha256": sha256_hex(data) if data else None,
+            "size": body["size"],
+            "sha256": body["sha256"],
             "truncated": item["truncated"],
+            "not_modified": item["not_modified"],
             "saved_path": saved_path,
             "error": item["error"],
-            "preview_lines": preview_lines(data, args.preview_lines)
+            "preview_lines": preview_lines(body["head"], args.preview_lines, body["encoding"])
             if reason == "probe" or reason.startswith("sourcemap") or url.endswith(".map")
             else [],
         }
@@ -752,20 +1795,11 @@ def main():
                     clean = clean[:140] + " ..."
                 print(f"    | {clean}")
 
-        if item["status"] and 200 <= item["status"] < 300 and data and not looks_binary(data):
-            text = decode_text(data)
-            scan_text(url, text, report)
-
-            path_lower = urlparse(url).path.lower()
-
-            if reason == "root" or "text/html" in content_type:
-                html_parser = AssetParser(url)
-                try:
-                    html_parser.feed(text)
-                except Exception:
-                    pass
+        if readable:
+            merge_scan_report(report, body["scan"])
 
-                for asset in sorted(html_parser.assets):
+            if body["assets"] is not None:
+                for asset in sorted(body["assets"]):
                     enqueue(asset, "linked_asset")
 
             if path_lower.endswith((".js", ".css")) or "javascript" in content_type or "text/css" in content_type:
@@ -775,11 +1809,14 @@ def main():
                 if not args.no_guess_sourcemaps:
                     enqueue(url + ".map", "sourcemap_guess")
 
-            if path_lower.endswith(".map") or reason.startswith("sourcemap"):
-                parse_sourcemap(url, text, report)
-                reconstruct_sourcemap_sources(url, text, report, out_sources)
+            if is_sourcemap and body["sourcemap"] is not None:
+                parse_sourcemap(url, body["sourcemap"], report)
+                reconstruct_sourcemap_sources(url, body["sourcemap"], report, out_sources)
 
-        time.sleep(args.delay)
+    pool.shutdown()
+    shutil.rmtree(staging, ignore_errors=True)
+    http_pool.close()
+    cache.save()
 
     normalized = normalize_report(report)
 